@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미 Gradio 앱의 승인 제어
+세션별 요청 속도 제한(토큰 버킷)과 동시에 실행 중인 Runner 호출 수 제한을 적용하고,
+한도를 넘으면 대기열에 쌓지 않고 바로 거절합니다.
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+# 승인 제어 설정
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+ADMISSION_RATE_PER_MINUTE = float(os.getenv("ADMISSION_RATE_PER_MINUTE", "10"))
+ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "3"))
+# 동시 실행 한도에 걸렸을 때 자리가 날 때까지 기다리는 최대 시간(초), 0이면 즉시 거절
+ADMISSION_WAIT_TIMEOUT = float(os.getenv("ADMISSION_WAIT_TIMEOUT", "0"))
+# 추적할 세션 수가 이 값을 넘으면 오래된 세션 버킷을 정리
+MAX_TRACKED_SESSIONS = 10000
+
+
+class AdmissionRejected(Exception):
+    """요청이 속도 제한이나 동시 실행 한도로 거절되었을 때 발생합니다."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """세션별 토큰 버킷과 전역 동시 실행 한도를 관리합니다."""
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, rate_per_minute=ADMISSION_RATE_PER_MINUTE,
+                 burst=ADMISSION_BURST, wait_timeout=ADMISSION_WAIT_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst
+        self.wait_timeout = wait_timeout
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.buckets = {}
+        self.in_flight = 0
+        self.stats = {"admitted": 0, "rejected_rate": 0, "rejected_busy": 0}
+
+    def take_token(self, session_id):
+        """세션 버킷에서 토큰 하나를 꺼냅니다. 남은 토큰이 없으면 False를 반환합니다."""
+        if self.rate_per_second <= 0:
+            return True
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(session_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate_per_second)
+        if tokens < 1:
+            self.buckets[session_id] = (tokens, now)
+            return False
+        self.buckets[session_id] = (tokens - 1, now)
+
+        if len(self.buckets) > MAX_TRACKED_SESSIONS:
+            # 버킷이 가득 찰 만큼 오래된 세션은 기본 상태와 같으므로 지워도 됩니다
+            idle = self.burst / self.rate_per_second
+            self.buckets = {sid: state for sid, state in self.buckets.items() if now - state[1] < idle}
+        return True
+
+    @asynccontextmanager
+    async def admit(self, session_id):
+        """
+        요청을 승인하고 실행이 끝나면 자리를 반환합니다. 거절되면 AdmissionRejected가 발생합니다.
+
+        Args:
+            session_id: Gradio 세션 식별자
+        """
+        if not self.take_token(session_id):
+            self.stats["rejected_rate"] += 1
+            raise AdmissionRejected("rate")
+
+        if self.semaphore.locked() and self.wait_timeout <= 0:
+            self.stats["rejected_busy"] += 1
+            raise AdmissionRejected("busy")
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.wait_timeout or None)
+        except asyncio.TimeoutError:
+            self.stats["rejected_busy"] += 1
+            raise AdmissionRejected("busy")
+
+        self.stats["admitted"] += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
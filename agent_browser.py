@@ -3,9 +3,31 @@ import time
 import base64
 import logging
 import asyncio
+import hashlib
+from io import BytesIO
+from typing import Any, List, Literal, Optional, Union
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright
-from agents import Agent, Runner, function_tool
+from pydantic import BaseModel
+from agents import Agent, Runner, RunConfig, function_tool, ToolOutputImage, ToolOutputText
+from agents.run_config import ModelInputData
+from model_tiers import model_kwargs
+from site_profiles import (
+    WARM_POOL_SIZE,
+    WARM_PAGE_MAX_AGE,
+    PrewarmStats,
+    match_site,
+    default_site,
+    prewarm_sites,
+    should_block,
+    settle_hints,
+)
+
+# 스크린샷 축소/변화 감지용 (선택 사항, 없으면 JPEG 압축만 사용)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # 로깅 설정
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,9 +41,171 @@ if not api_key:
     logging.error("OpenAI API key not set or invalid.")
     raise ValueError("Please set a valid OpenAI API key in your .env file")
 
+# 시각 피드백 설정 (상태를 바꾸는 도구 호출 후 축소된 스크린샷을 모델에 전달)
+VISION_FEEDBACK = os.getenv("AGENT_VISION_FEEDBACK", "false").lower() == "true"
+# 모델 입력에 남겨 둘 최근 스크린샷 수 (더 오래된 스크린샷은 짧은 텍스트로 대체)
+VISION_MAX_IMAGES = int(os.getenv("AGENT_VISION_MAX_IMAGES", "4"))
+VISION_WIDTH = int(os.getenv("AGENT_VISION_WIDTH", "512"))
+VISION_JPEG_QUALITY = int(os.getenv("AGENT_VISION_JPEG_QUALITY", "50"))
+# 썸네일 픽셀 평균 차이(0~255)가 이 값 이하이면 화면이 바뀌지 않은 것으로 간주
+VISION_CHANGE_THRESHOLD = float(os.getenv("AGENT_VISION_CHANGE_THRESHOLD", "2.0"))
+# detail="low" 이미지 한 장의 입력 토큰 수
+LOW_DETAIL_IMAGE_TOKENS = 85
+
+# 도구 결과 타입: 텍스트 또는 텍스트 + 이미지 목록
+ToolResult = Union[str, List[Any]]
+
+# 요소 맵 캐시 (페이지 상태가 바뀔 때만 다시 만듭니다)
+element_map = []
+element_map_dirty = True
+# 요소 맵을 다시 만들 때마다 증가 (이전 맵의 인덱스를 거부하는 데 사용)
+element_map_epoch = 0
+
+
+class StaleElementMap(Exception):
+    """이전 요소 맵의 인덱스이거나, 인덱스가 가리키던 요소가 페이지에서 사라진 경우"""
+
+# 상호작용 가능한 요소를 수집하고 data-agent-index 속성으로 번호를 매기는 스크립트
+ELEMENT_MAP_SCRIPT = """
+() => {
+    const selector = 'a[href], button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="tab"], [onclick], [contenteditable="true"]';
+    document.querySelectorAll('[data-agent-index]').forEach(el => el.removeAttribute('data-agent-index'));
+    const items = [];
+    for (const el of document.querySelectorAll(selector)) {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        if (rect.width === 0 || rect.height === 0 || style.visibility === 'hidden' || style.display === 'none') {
+            continue;
+        }
+        if (el.type === 'hidden' || el.disabled) {
+            continue;
+        }
+        const index = items.length;
+        el.setAttribute('data-agent-index', String(index));
+        const label = el.getAttribute('aria-label') || el.getAttribute('placeholder') || el.getAttribute('title')
+            || el.getAttribute('alt') || el.value || el.innerText || '';
+        items.push({
+            index: index,
+            tag: el.tagName.toLowerCase(),
+            type: el.getAttribute('type') || '',
+            label: label.replace(/\\s+/g, ' ').trim().slice(0, 80),
+        });
+    }
+    return items;
+}
+"""
+
+# DOM 변경을 감지하면 파이썬 쪽에 알리는 초기화 스크립트 (연속 변경은 한 번으로 묶음)
+DOM_MUTATION_SCRIPT = """
+(() => {
+    let pending = false;
+    const notify = () => {
+        if (pending) return;
+        pending = true;
+        setTimeout(() => {
+            pending = false;
+            if (window.__agentDomChanged) window.__agentDomChanged();
+        }, 100);
+    };
+    const start = () => {
+        new MutationObserver(notify).observe(document.documentElement, {childList: true, subtree: true});
+    };
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener('DOMContentLoaded', start);
+    }
+})();
+"""
+
+def invalidate_element_map(*args):
+    """요소 맵을 무효화합니다. 다음 get_element_map 호출 시 한 번만 다시 만들어집니다."""
+    global element_map_dirty
+    element_map_dirty = True
+
+def on_main_frame_navigated():
+    """페이지 이동 시 요소 맵을 무효화합니다."""
+    invalidate_element_map()
+
+async def attach_element_tracking(page):
+    """
+    페이지 이동과 DOM 변경 이벤트에 요소 맵 무효화를 연결합니다.
+    미리 로딩 중인 페이지의 이벤트는 현재 작업 페이지가 아니므로 무시합니다.
+    
+    Args:
+        page: Playwright 페이지
+    """
+    await page.expose_function("__agentDomChanged", lambda *args: invalidate_element_map() if page is browser_page else None)
+    await page.add_init_script(DOM_MUTATION_SCRIPT)
+    page.on("framenavigated", lambda frame: on_main_frame_navigated()
+            if frame == page.main_frame and page is browser_page else None)
+    # 이미 로드된 문서에도 감시자를 설치
+    await page.evaluate(DOM_MUTATION_SCRIPT)
+
+async def ensure_element_map():
+    """요소 맵이 무효화된 경우에만 다시 만들고 (요소 목록, epoch)를 반환합니다."""
+    global browser_page, element_map, element_map_dirty, element_map_epoch
+    if element_map_dirty:
+        # 수집 도중 발생한 변경이 다시 무효화할 수 있도록 먼저 플래그를 내림
+        element_map_dirty = False
+        element_map = await browser_page.evaluate(ELEMENT_MAP_SCRIPT)
+        element_map_epoch += 1
+        logging.debug(f"요소 맵 생성: {len(element_map)}개 요소 (epoch {element_map_epoch})")
+    return element_map, element_map_epoch
+
+def format_element_map(elements, epoch) -> str:
+    """요소 맵을 모델이 읽기 쉬운 간단한 텍스트로 변환합니다."""
+    lines = [f"Element map epoch {epoch} (pass this epoch with the indices below):"]
+    for item in elements:
+        kind = item["tag"] + (f"[{item['type']}]" if item["type"] else "")
+        lines.append(f"[{item['index']}] {kind} {item['label']}".rstrip())
+    return "\n".join(lines) if len(lines) > 1 else "상호작용 가능한 요소가 없습니다."
+
+def element_locator(index: int):
+    """인덱스에 해당하는 요소의 로케이터를 반환합니다."""
+    global browser_page
+    return browser_page.locator(f'[data-agent-index="{index}"]')
+
+async def resolve_element(index: int, epoch: Optional[int] = None):
+    """
+    인덱스를 요소로 한 번에 해석합니다. 맵에 없는 인덱스이면 None을 반환합니다.
+    맵을 만들 때 요소에 붙인 data-agent-index로 찾으므로, 페이지의 다른 곳이 바뀌어도
+    그 요소가 남아 있으면 그대로 사용합니다. 요소 맵은 get_element_map에서만 다시 만듭니다.
+    맵이 그 사이 다시 만들어졌거나 요소가 사라졌으면 StaleElementMap을 발생시킵니다.
+    
+    Args:
+        index: 요소 맵의 인덱스
+        epoch: 인덱스를 받은 요소 맵의 epoch (생략하면 epoch 확인 없이 요소가 남아 있는지만 확인)
+    """
+    if epoch is not None and epoch != element_map_epoch:
+        raise StaleElementMap(f"Element index {index} is from element map epoch {epoch}, but the map has been "
+                              f"rebuilt since (current epoch {element_map_epoch}). Use the indices from the latest "
+                              f"get_element_map result.")
+    if index < 0 or index >= len(element_map):
+        return None
+    locator = element_locator(index)
+    if await locator.count() == 0:
+        raise StaleElementMap(f"Element [{index}] is no longer on the page. Call get_element_map to refresh the element map.")
+    return locator
+
+def scroll_offsets(direction: str, amount: int):
+    """스크롤 방향과 양을 (x, y) 오프셋으로 변환합니다."""
+    scroll_x = 0
+    scroll_y = 0
+    
+    if direction.lower() == 'down':
+        scroll_y = amount
+    elif direction.lower() == 'up':
+        scroll_y = -amount
+    elif direction.lower() == 'right':
+        scroll_x = amount
+    elif direction.lower() == 'left':
+        scroll_x = -amount
+    return scroll_x, scroll_y
+
 # 브라우저 동작 도구 정의
 @function_tool
-async def navigate_to_url(url: str) -> str:
+async def navigate_to_url(url: str) -> ToolResult:
     """
     지정된 URL로 브라우저를 이동합니다.
     
@@ -35,12 +219,12 @@ async def navigate_to_url(url: str) -> str:
             url = "https://" + url
         
         await browser_page.goto(url)
-        return f"Successfully navigated to {url}"
+        return await with_visual_feedback(f"Successfully navigated to {url}")
     except Exception as e:
         return f"Failed to navigate to {url}: {str(e)}"
 
 @function_tool
-async def click_element(x: int, y: int) -> str:
+async def click_element(x: int, y: int) -> ToolResult:
     """
     브라우저에서 지정된 좌표를 클릭합니다.
     
@@ -51,12 +235,12 @@ async def click_element(x: int, y: int) -> str:
     global browser_page
     try:
         await browser_page.mouse.click(x, y)
-        return f"Successfully clicked at coordinates ({x}, {y})"
+        return await with_visual_feedback(f"Successfully clicked at coordinates ({x}, {y})")
     except Exception as e:
         return f"Failed to click at coordinates ({x}, {y}): {str(e)}"
 
 @function_tool
-async def type_text(text: str) -> str:
+async def type_text(text: str) -> ToolResult:
     """
     브라우저에서 텍스트를 입력합니다.
     
@@ -66,12 +250,12 @@ async def type_text(text: str) -> str:
     global browser_page
     try:
         await browser_page.keyboard.type(text)
-        return f"Successfully typed: {text}"
+        return await with_visual_feedback(f"Successfully typed: {text}")
     except Exception as e:
         return f"Failed to type text: {str(e)}"
 
 @function_tool
-async def press_key(key: str) -> str:
+async def press_key(key: str) -> ToolResult:
     """
     브라우저에서 특정 키를 누릅니다.
     
@@ -81,12 +265,12 @@ async def press_key(key: str) -> str:
     global browser_page
     try:
         await browser_page.keyboard.press(key)
-        return f"Successfully pressed key: {key}"
+        return await with_visual_feedback(f"Successfully pressed key: {key}")
     except Exception as e:
         return f"Failed to press key: {str(e)}"
 
 @function_tool
-async def scroll_page(direction: str, amount: int = 300) -> str:
+async def scroll_page(direction: str, amount: int = 300) -> ToolResult:
     """
     브라우저 페이지를 스크롤합니다.
     
@@ -96,23 +280,13 @@ async def scroll_page(direction: str, amount: int = 300) -> str:
     """
     global browser_page
     try:
-        scroll_x = 0
-        scroll_y = 0
-        
-        if direction.lower() == 'down':
-            scroll_y = amount
-        elif direction.lower() == 'up':
-            scroll_y = -amount
-        elif direction.lower() == 'right':
-            scroll_x = amount
-        elif direction.lower() == 'left':
-            scroll_x = -amount
-        
+        scroll_x, scroll_y = scroll_offsets(direction, amount)
         await browser_page.evaluate(f"window.scrollBy({scroll_x}, {scroll_y})")
-        return f"Successfully scrolled {direction} by {amount} pixels"
+        return await with_visual_feedback(f"Successfully scrolled {direction} by {amount} pixels")
     except Exception as e:
         return f"Failed to scroll: {str(e)}"
 
+# 메모리에 있는 속성을 읽기만 하므로 캐시하지 않음 (캐시하면 이동 후 이전 URL을 반환할 수 있음)
 @function_tool
 async def get_current_url() -> str:
     """현재 브라우저 URL을 반환합니다."""
@@ -122,6 +296,208 @@ async def get_current_url() -> str:
     except Exception as e:
         return f"Failed to get current URL: {str(e)}"
 
+@function_tool
+async def get_element_map() -> str:
+    """
+    현재 페이지에서 클릭하거나 입력할 수 있는 요소 목록을 인덱스와 함께 반환합니다.
+    페이지가 바뀌지 않았다면 이전에 만든 맵을 그대로 사용합니다.
+    """
+    try:
+        elements, epoch = await ensure_element_map()
+        return format_element_map(elements, epoch)
+    except Exception as e:
+        return f"Failed to build element map: {str(e)}"
+
+@function_tool
+async def click_index(index: int, epoch: int) -> ToolResult:
+    """
+    요소 맵의 인덱스로 요소를 클릭합니다.
+    
+    Args:
+        index: get_element_map에서 받은 요소 인덱스
+        epoch: get_element_map에서 받은 요소 맵 epoch
+    """
+    try:
+        locator = await resolve_element(index, epoch)
+        if locator is None:
+            return f"Element index {index} not found. Call get_element_map to refresh indices."
+        await locator.click(timeout=5000)
+        return await with_visual_feedback(f"Successfully clicked element [{index}] {element_map[index]['label']}")
+    except StaleElementMap as e:
+        invalidate_element_map()
+        return str(e)
+    except Exception as e:
+        invalidate_element_map()
+        return f"Failed to click element [{index}]: {str(e)}"
+
+@function_tool
+async def fill_index(index: int, epoch: int, text: str) -> ToolResult:
+    """
+    요소 맵의 인덱스로 입력 필드를 찾아 텍스트를 채웁니다. 기존 값은 대체됩니다.
+    
+    Args:
+        index: get_element_map에서 받은 요소 인덱스
+        epoch: get_element_map에서 받은 요소 맵 epoch
+        text: 입력할 텍스트
+    """
+    try:
+        locator = await resolve_element(index, epoch)
+        if locator is None:
+            return f"Element index {index} not found. Call get_element_map to refresh indices."
+        await locator.fill(text, timeout=5000)
+        return await with_visual_feedback(f"Successfully filled element [{index}] with: {text}")
+    except StaleElementMap as e:
+        invalidate_element_map()
+        return str(e)
+    except Exception as e:
+        invalidate_element_map()
+        return f"Failed to fill element [{index}]: {str(e)}"
+
+@function_tool
+async def select_option(index: int, epoch: int, value: str) -> ToolResult:
+    """
+    요소 맵의 인덱스로 select 요소를 찾아 옵션을 선택합니다.
+    
+    Args:
+        index: get_element_map에서 받은 select 요소 인덱스
+        epoch: get_element_map에서 받은 요소 맵 epoch
+        value: 선택할 옵션의 값 또는 표시 텍스트
+    """
+    try:
+        locator = await resolve_element(index, epoch)
+        if locator is None:
+            return f"Element index {index} not found. Call get_element_map to refresh indices."
+        try:
+            selected = await locator.select_option(value=value, timeout=5000)
+        except Exception:
+            selected = await locator.select_option(label=value, timeout=5000)
+        return await with_visual_feedback(f"Successfully selected {selected} in element [{index}]")
+    except StaleElementMap as e:
+        invalidate_element_map()
+        return str(e)
+    except Exception as e:
+        invalidate_element_map()
+        return f"Failed to select option in element [{index}]: {str(e)}"
+
+# perform_actions 사용 통계 (run_browser_agent 실행마다 초기화)
+action_stats = {"macro_calls": 0, "actions": 0, "turns_saved": 0}
+
+class BrowserAction(BaseModel):
+    """perform_actions에서 실행할 단일 동작"""
+    type: Literal["navigate", "click", "type", "key", "scroll", "wait_for_selector"]
+    url: Optional[str] = None
+    index: Optional[int] = None
+    # index를 받은 요소 맵의 epoch (생략하면 요소가 아직 페이지에 있는지만 확인)
+    epoch: Optional[int] = None
+    x: Optional[int] = None
+    y: Optional[int] = None
+    selector: Optional[str] = None
+    text: Optional[str] = None
+    key: Optional[str] = None
+    direction: Optional[str] = None
+    amount: Optional[int] = None
+    timeout_ms: Optional[int] = None
+
+async def run_action(action: BrowserAction) -> str:
+    """
+    단일 동작을 실행하고 짧은 결과 설명을 반환합니다. 실패하면 예외를 발생시킵니다.
+    
+    Args:
+        action: 실행할 동작
+    """
+    global browser_page
+    if action.type == "navigate":
+        if not action.url:
+            raise ValueError("navigate requires url")
+        url = action.url if action.url.startswith("http") else "https://" + action.url
+        await browser_page.goto(url)
+        return url
+    
+    if action.type == "click":
+        if action.index is not None:
+            locator = await resolve_element(action.index, action.epoch)
+            if locator is None:
+                raise ValueError(f"element index {action.index} not found")
+            await locator.click(timeout=5000)
+            return f"[{action.index}]"
+        if action.selector:
+            await browser_page.click(action.selector, timeout=5000)
+            return action.selector
+        if action.x is not None and action.y is not None:
+            await browser_page.mouse.click(action.x, action.y)
+            return f"({action.x}, {action.y})"
+        raise ValueError("click requires index, selector or x/y")
+    
+    if action.type == "type":
+        if action.text is None:
+            raise ValueError("type requires text")
+        if action.index is not None:
+            locator = await resolve_element(action.index, action.epoch)
+            if locator is None:
+                raise ValueError(f"element index {action.index} not found")
+            await locator.fill(action.text, timeout=5000)
+        elif action.selector:
+            await browser_page.fill(action.selector, action.text, timeout=5000)
+        else:
+            await browser_page.keyboard.type(action.text)
+        return action.text
+    
+    if action.type == "key":
+        if not action.key:
+            raise ValueError("key requires key")
+        await browser_page.keyboard.press(action.key)
+        return action.key
+    
+    if action.type == "scroll":
+        direction = action.direction or "down"
+        amount = action.amount or 300
+        scroll_x, scroll_y = scroll_offsets(direction, amount)
+        await browser_page.evaluate(f"window.scrollBy({scroll_x}, {scroll_y})")
+        return f"{direction} {amount}px"
+    
+    if action.type == "wait_for_selector":
+        if not action.selector:
+            raise ValueError("wait_for_selector requires selector")
+        await browser_page.wait_for_selector(action.selector, timeout=action.timeout_ms or 10000)
+        return action.selector
+    
+    raise ValueError(f"unknown action type: {action.type}")
+
+@function_tool
+async def perform_actions(actions: List[BrowserAction]) -> ToolResult:
+    """
+    여러 브라우저 동작을 순서대로 한 번에 실행합니다. 동작이 실패하면 그 자리에서 멈춥니다.
+    예: 사이트 이동 → 검색창 입력 → Enter를 하나의 호출로 처리합니다.
+    
+    Args:
+        actions: 실행할 동작 목록. type은 navigate(url), click(index(+epoch)/selector/x,y),
+            type(text, 선택적으로 index(+epoch)/selector), key(key), scroll(direction, amount),
+            wait_for_selector(selector, timeout_ms) 중 하나입니다.
+    """
+    lines = []
+    completed = 0
+    for i, action in enumerate(actions, start=1):
+        try:
+            detail = await run_action(action)
+            lines.append(f"{i}. {action.type} ok: {detail}")
+            completed += 1
+        except Exception as e:
+            invalidate_element_map()
+            lines.append(f"{i}. {action.type} FAILED: {str(e)}")
+            skipped = len(actions) - i
+            if skipped:
+                lines.append(f"Stopped early; {skipped} remaining action(s) skipped.")
+            break
+    
+    # 개별 도구로 실행했다면 필요했을 추가 모델 턴 수
+    action_stats["macro_calls"] += 1
+    action_stats["actions"] += completed
+    action_stats["turns_saved"] += max(completed - 1, 0)
+    lines.insert(0, f"{completed}/{len(actions)} actions completed")
+    if completed:
+        return await with_visual_feedback("\n".join(lines))
+    return "\n".join(lines)
+
 @function_tool
 async def wait(seconds: int = 2) -> str:
     """
@@ -136,15 +512,97 @@ async def wait(seconds: int = 2) -> str:
     except Exception as e:
         return f"Failed to wait: {str(e)}"
 
-async def get_screenshot() -> str:
-    """현재 브라우저 화면의 스크린샷을 base64로 인코딩하여 반환합니다."""
+# 시각 피드백 상태 (run_browser_agent 실행마다 초기화)
+vision_stats = {"images": 0, "bytes": 0, "tokens": 0, "skipped_unchanged": 0, "dropped": 0}
+# 모델 입력에서 빠진 오래된 스크린샷을 대신하는 텍스트
+DROPPED_IMAGE_TEXT = "(Earlier screenshot removed; only the most recent screenshots are kept.)"
+last_visual_signature = None
+
+async def capture_feedback_image():
+    """
+    축소·압축한 JPEG 스크린샷과 화면 변화 비교용 시그니처를 반환합니다.
+    Pillow가 없으면 원본 크기 JPEG와 바이트 해시를 사용합니다.
+    """
     global browser_page
+    jpeg_bytes = await browser_page.screenshot(full_page=False, type="jpeg", quality=VISION_JPEG_QUALITY)
+    if Image is None:
+        return jpeg_bytes, hashlib.sha1(jpeg_bytes).hexdigest()
+    
+    image = Image.open(BytesIO(jpeg_bytes))
+    signature = list(image.convert("L").resize((32, 24)).getdata())
+    if image.width > VISION_WIDTH:
+        image = image.resize((VISION_WIDTH, int(image.height * VISION_WIDTH / image.width)))
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), signature
+
+def visual_changed(previous, current) -> bool:
+    """이전 시그니처와 비교해 화면이 실제로 바뀌었는지 판단합니다."""
+    if previous is None:
+        return True
+    if isinstance(current, str):
+        return previous != current
+    diff = sum(abs(a - b) for a, b in zip(previous, current)) / len(current)
+    return diff > VISION_CHANGE_THRESHOLD
+
+async def with_visual_feedback(message: str) -> ToolResult:
+    """
+    시각 피드백 모드일 때 도구 결과에 스크린샷을 덧붙입니다.
+    화면이 바뀌지 않았으면 텍스트만 반환합니다.
+    
+    Args:
+        message: 도구 결과 텍스트
+    """
+    global last_visual_signature
+    if not VISION_FEEDBACK:
+        return message
     try:
-        screenshot_bytes = await browser_page.screenshot(full_page=False)
-        return base64.b64encode(screenshot_bytes).decode("utf-8")
+        image_bytes, signature = await capture_feedback_image()
     except Exception as e:
-        logging.error(f"스크린샷 캡처 실패: {e}")
-        return ""
+        logging.error(f"피드백 스크린샷 캡처 실패: {e}")
+        return message
+    
+    if not visual_changed(last_visual_signature, signature):
+        vision_stats["skipped_unchanged"] += 1
+        return message + "\n(Screen unchanged since the last screenshot.)"
+    
+    last_visual_signature = signature
+    vision_stats["images"] += 1
+    vision_stats["bytes"] += len(image_bytes)
+    image_url = "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("utf-8")
+    return [ToolOutputText(text=message), ToolOutputImage(image_url=image_url, detail="low")]
+
+def keep_recent_images(call_data) -> ModelInputData:
+    """
+    모델 호출 직전에 입력의 스크린샷 중 최근 VISION_MAX_IMAGES장만 남기고
+    더 오래된 스크린샷은 짧은 텍스트로 대체합니다 (RunConfig.call_model_input_filter).
+    
+    Args:
+        call_data: 이번 모델 호출의 입력 (CallModelData)
+    """
+    items = call_data.model_data.input
+    # (항목 위치, 내용 목록 키, 내용 위치) 목록
+    images = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        key = "output" if item.get("type") == "function_call_output" else "content"
+        parts = item.get(key)
+        if isinstance(parts, list):
+            images.extend((i, key, j) for j, part in enumerate(parts)
+                          if isinstance(part, dict) and part.get("type") == "input_image")
+    
+    dropped = images[:max(len(images) - VISION_MAX_IMAGES, 0)]
+    if dropped:
+        # 실행 기록의 원본 항목은 바꾸지 않도록 복사본을 수정
+        items = list(items)
+        for i, key, j in dropped:
+            if items[i] is call_data.model_data.input[i]:
+                items[i] = {**items[i], key: list(items[i][key])}
+            items[i][key][j] = {"type": "input_text", "text": DROPPED_IMAGE_TEXT}
+    vision_stats["dropped"] = max(vision_stats["dropped"], len(dropped))
+    vision_stats["tokens"] += (len(images) - len(dropped)) * LOW_DETAIL_IMAGE_TOKENS
+    return ModelInputData(input=items, instructions=call_data.model_data.instructions)
 
 async def run_browser_agent(user_task: str):
     """
@@ -161,6 +619,10 @@ async def run_browser_agent(user_task: str):
         instructions="""당신은 웹 브라우저를 자동화하는 도우미입니다.
 사용자의 요청에 따라 웹 브라우저를 제어하고 작업을 수행합니다.
 제공된 도구를 사용하여 웹 페이지 방문, 클릭, 텍스트 입력, 스크롤 등의 작업을 할 수 있습니다.
+여러 단계를 연달아 수행할 수 있다면 perform_actions로 묶어서 한 번에 실행하세요.
+요소를 다룰 때는 먼저 get_element_map으로 요소 인덱스와 epoch를 확인하고 click_index, fill_index, select_option에 함께 전달하세요.
+요소가 페이지에서 사라졌다는 결과를 받으면 get_element_map을 다시 호출하세요.
+좌표 기반 click_element는 인덱스로 찾을 수 없는 요소에만 사용하세요.
 작업이 복잡한 경우 단계별로 실행하고 각 단계의 결과를 설명하세요.
 사용자의 개인정보를 보호하고 안전한 브라우징을 최우선으로 생각하세요.""",
         tools=[
@@ -170,15 +632,18 @@ async def run_browser_agent(user_task: str):
             press_key,
             scroll_page,
             get_current_url,
+            get_element_map,
+            click_index,
+            fill_index,
+            select_option,
+            perform_actions,
             wait
         ],
-        model="gpt-4o"  # 최신 모델 사용
+        **model_kwargs("browser", default_model="gpt-4o")  # 기본값은 최신 모델, AGENT_MODEL_BROWSER로 변경 가능
     )
     
     print(f"\n브라우저 자동화 에이전트를 시작합니다. 요청: {user_task}")
     
-    # 현재 스크린샷 설명
-    screenshot_base64 = await get_screenshot()
     current_url = browser_page.url
     
     # 스크린샷 정보를 포함한 태스크 생성
@@ -187,13 +652,162 @@ async def run_browser_agent(user_task: str):
 
 위 작업을 수행하기 위해 필요한 브라우저 동작을 실행해주세요."""
     
+    global last_visual_signature
+    for key in action_stats:
+        action_stats[key] = 0
+    for key in vision_stats:
+        vision_stats[key] = 0
+    last_visual_signature = None
+    
+    # 시각 피드백 모드에서는 현재 화면을 첫 입력에 함께 전달
+    agent_input = task_with_context
+    if VISION_FEEDBACK:
+        try:
+            image_bytes, last_visual_signature = await capture_feedback_image()
+            vision_stats["images"] += 1
+            vision_stats["bytes"] += len(image_bytes)
+            agent_input = [{
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": task_with_context},
+                    {
+                        "type": "input_image",
+                        "image_url": "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("utf-8"),
+                        "detail": "low",
+                    },
+                ],
+            }]
+        except Exception as e:
+            logging.error(f"초기 스크린샷 캡처 실패: {e}")
+    
     # 에이전트 실행
-    result = await Runner.run(browser_agent, task_with_context)
+    # 시각 피드백 모드에서는 모델 입력에 최근 스크린샷만 남김
+    run_config = RunConfig(call_model_input_filter=keep_recent_images) if VISION_FEEDBACK else None
+    result = await Runner.run(browser_agent, agent_input, run_config=run_config)
     
     print("\n에이전트 응답:")
     print(result.final_output)
+    if action_stats["macro_calls"]:
+        print(f"\nperform_actions: {action_stats['macro_calls']}회 호출, "
+              f"{action_stats['actions']}개 동작 실행, 절약된 모델 턴 {action_stats['turns_saved']}회")
+    if VISION_FEEDBACK:
+        print(f"시각 피드백: 이미지 {vision_stats['images']}장, {vision_stats['bytes'] / 1024:.1f}KB, "
+              f"모델 호출에 보낸 이미지 약 {vision_stats['tokens']} 토큰 (변화 없음 생략 {vision_stats['skipped_unchanged']}회, "
+              f"입력에서 뺀 오래된 이미지 {vision_stats['dropped']}장)")
     return result.final_output
 
+async def navigate_to_site(page, site):
+    """
+    사이트의 시작 URL로 이동하고 사이트 프로필의 대기 힌트(wait_until, 대기 셀렉터, 안정화 시간)를 적용합니다.
+    
+    Args:
+        page: Playwright 페이지
+        site: 사이트 프로필
+    """
+    wait_until, selector, settle_ms = settle_hints(site)
+    logging.debug(f"페이지 이동: {site['start_url']} ({site['name']})")
+    await page.goto(site["start_url"], wait_until=wait_until)
+    if selector:
+        await page.wait_for_selector(selector, timeout=5000)
+    if settle_ms:
+        await page.wait_for_timeout(settle_ms)
+
+async def open_site_page(browser, site):
+    """
+    사이트 프로필의 차단 규칙과 대기 힌트를 적용하여 새 페이지를 열고 시작 URL로 이동합니다.
+    
+    Returns:
+        (페이지, 이동에 걸린 시간(초))
+    """
+    page = await browser.new_page(viewport={"width": 1024, "height": 768})
+    await attach_element_tracking(page)
+    if site.get("block_resources") or site.get("block_url_patterns"):
+        await page.route("**/*", lambda route: route.abort()
+                         if should_block(site, route.request.resource_type, route.request.url) else route.continue_())
+    started = time.monotonic()
+    try:
+        await navigate_to_site(page, site)
+    except Exception as e:
+        logging.error(f"사이트 로딩 중 오류 ({site['name']}): {e}")
+    return page, time.monotonic() - started
+
+class WarmPagePool:
+    """
+    자주 쓰는 시작 사이트를 백그라운드에서 미리 열어 두는 페이지 풀
+    작업이 사이트와 매칭되면 이동 없이 미리 로딩된 페이지로 바로 시작합니다.
+    """
+    
+    def __init__(self, browser, sites=None, size=WARM_POOL_SIZE):
+        self.browser = browser
+        self.sites = sites if sites is not None else prewarm_sites()
+        self.size = size
+        # 사이트 이름 -> 로딩 중이거나 로딩된 페이지 태스크 목록
+        self.pages = {}
+        self.stats = PrewarmStats()
+    
+    async def warm(self, site):
+        page, navigation = await open_site_page(self.browser, site)
+        self.stats.counts["warmed"] += 1
+        return {"page": page, "navigation": navigation, "warmed_at": time.monotonic()}
+    
+    def fill(self):
+        """사이트별 풀 크기만큼 백그라운드 로딩을 시작합니다."""
+        for site in self.sites:
+            tasks = self.pages.setdefault(site["name"], [])
+            while len(tasks) < self.size:
+                tasks.append(asyncio.create_task(self.warm(site)))
+    
+    async def acquire(self, site):
+        """
+        사이트의 미리 로딩된 페이지를 꺼냅니다 (아직 로딩 중이면 완료를 기다림).
+        
+        Returns:
+            페이지, 풀에 없으면 None
+        """
+        tasks = self.pages.get(site["name"])
+        if not tasks:
+            self.stats.miss()
+            return None
+        try:
+            entry = await tasks.pop(0)
+        except Exception as e:
+            logging.error(f"미리 로딩된 페이지 사용 실패 ({site['name']}): {e}")
+            self.stats.miss()
+            return None
+        stale = time.monotonic() - entry["warmed_at"] > WARM_PAGE_MAX_AGE
+        if stale:
+            await entry["page"].reload()
+        self.stats.hit(entry["navigation"], stale=stale)
+        return entry["page"]
+    
+    async def close(self):
+        for tasks in self.pages.values():
+            for task in tasks:
+                task.cancel()
+        self.pages.clear()
+
+async def switch_to_site(pool, site):
+    """
+    작업 페이지를 사이트의 미리 로딩된 페이지로 바꿉니다. 풀에 없으면 현재 페이지에서 이동합니다.
+    """
+    global browser_page
+    page = await pool.acquire(site) if pool else None
+    if page is None:
+        print(f"{site['name']} 페이지로 이동합니다...")
+        # 현재 페이지에는 이 사이트의 차단 규칙이 없으므로 대기 힌트만 적용
+        try:
+            await navigate_to_site(browser_page, site)
+        except Exception as e:
+            logging.error(f"사이트 로딩 중 오류 ({site['name']}): {e}")
+        return
+    print(f"미리 로딩된 {site['name']} 페이지에서 시작합니다.")
+    previous, browser_page = browser_page, page
+    on_main_frame_navigated()
+    await page.bring_to_front()
+    if previous is not None:
+        await previous.close()
+    pool.fill()
+
 async def main():
     """메인 함수"""
     global browser_page
@@ -209,17 +823,19 @@ async def main():
     
     # Playwright 브라우저 시작
     browser = None
+    pool = None
     
     try:
         async with async_playwright() as playwright:
             # 브라우저 실행
             browser = await playwright.chromium.launch(headless=False)
-            browser_page = await browser.new_page(viewport={"width": 1024, "height": 768})
             
-            # 기본 시작 페이지로 이동
-            start_url = os.getenv("DEFAULT_START_URL", "https://www.google.com")
-            logging.debug(f"시작 URL: {start_url}")
-            await browser_page.goto(start_url)
+            # 기본 시작 사이트를 열고, 자주 쓰는 사이트는 백그라운드에서 미리 로딩
+            pool = WarmPagePool(browser) if WARM_POOL_SIZE > 0 else None
+            browser_page, _ = await open_site_page(browser, default_site())
+            if pool:
+                pool.fill()
+            current_site = default_site()["name"]
             
             while True:
                 # 사용자 입력 받기
@@ -235,13 +851,17 @@ async def main():
                     print("유효한 작업을 입력해주세요.")
                     continue
                 
-                # 한국어 작업에서 네이버로 시작하기
-                if ("네이버" in user_task.lower() or "naver" in user_task.lower()) and "google.com" in browser_page.url:
-                    print("네이버 관련 태스크를 감지했습니다. 네이버로 이동합니다...")
-                    await browser_page.goto("https://www.naver.com")
+                # 작업에 사이트가 명시되어 있으면 그 사이트에서 시작
+                # (명시되지 않으면 이전 작업이 끝난 페이지에서 계속)
+                site, matched = match_site(user_task)
+                if matched and site["name"] != current_site:
+                    await switch_to_site(pool, site)
+                    current_site = site["name"]
                 
                 # 에이전트 실행
                 await run_browser_agent(user_task)
+                if pool:
+                    print(f"페이지 사전 로딩: {pool.stats.summary()}")
     
     except KeyboardInterrupt:
         print("\n프로그램이 중단되었습니다. 종료합니다.")
@@ -251,6 +871,8 @@ async def main():
         traceback.print_exc()
     finally:
         # 브라우저 종료
+        if pool:
+            await pool.close()
         if browser:
             await browser.close()
 
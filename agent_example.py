@@ -1,13 +1,15 @@
 import os
 from dotenv import load_dotenv
 from agents import Agent, Runner, function_tool
+from tool_cache import cached_tool, tool_cache_stats
 import asyncio
 
 # 환경 변수 로드
 load_dotenv()
 
-# 함수 도구 정의 (데코레이터 사용)
+# 함수 도구 정의 (데코레이터 사용, 같은 위치의 날씨는 10분간 캐시)
 @function_tool
+@cached_tool(ttl=600)
 def get_current_weather(location: str) -> str:
     """
     특정 위치의 현재 날씨를 반환합니다.
@@ -44,6 +46,7 @@ async def main():
     result = await Runner.run(agent, user_query)
     print("\n에이전트 응답:")
     print(result.final_output)
+    print(f"\n도구 캐시 통계: {tool_cache_stats()}")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
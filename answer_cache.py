@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미 답변 캐시
+triage_agent 실행 결과를 로컬 SQLite 파일에 저장하여 여러 Gradio 워커 프로세스가 함께 사용합니다.
+정규화된 질문의 완전 일치와 MinHash(단어 n-gram) 기반 유사 질문 검색을 지원합니다.
+유사 질문은 핵심 단어(언어, 인물, 지명 등 질문 틀을 이루는 표현을 뺀 단어)가 모두 같아야
+적중으로 인정합니다. 전문 에이전트의 답변만 저장하고, 되묻는 답변은 저장하지 않습니다.
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from guardrail_cache import normalize_question
+
+# 캐시 설정
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+# 실시간 정보 답변(웹 검색 등)의 TTL, 0이면 캐시하지 않음
+ANSWER_CACHE_REALTIME_TTL = float(os.getenv("ANSWER_CACHE_REALTIME_TTL", "0"))
+# 유사 질문으로 인정할 추정 Jaccard 유사도
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.9"))
+
+# 단어 n-gram(1~NGRAM_SIZE) 집합으로 유사도 계산
+NGRAM_SIZE = 2
+# 단어 끝에서 떼어낼 조사 (긴 것부터)
+PARTICLES = ("에서는", "에서", "에게", "으로", "와", "과", "로", "에", "의", "을", "를", "은", "는", "이", "가", "도")
+# 질문의 틀을 이루는 표현 (핵심 단어 비교에서 제외)
+FRAME_WORDS = {
+    "무엇인가요", "무엇입니까", "뭐야", "뭔가요", "알려주세요", "알려줘", "설명해주세요", "설명해줘", "설명", "어떻게",
+    "어떤가요", "무엇", "차이", "차이점", "방법", "주요", "좀", "자세히", "간단히", "설명해", "주세요", "해주세요",
+    "해줘", "알고", "싶어요", "what", "is", "the", "a", "an",
+    "how", "to", "of", "in", "and", "explain", "please", "tell", "me", "about", "difference", "between",
+}
+
+# MinHash/LSH 설정 (BANDS * ROWS == NUM_PERM)
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+
+# 프로세스가 달라도 같은 서명이 나오도록 고정된 시드로 해시 계수를 생성
+_rng = random.Random(20250321)
+HASH_PARAMS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def words(text):
+    """조사를 뗀 단어 목록 (한글 단어, 영문/숫자 토큰)"""
+    result = []
+    for word in re.findall(r"[a-z0-9][a-z0-9+#.]*|[가-힣]+", text.lower()):
+        for particle in PARTICLES:
+            if word.endswith(particle) and len(word) - len(particle) >= 2:
+                word = word[:-len(particle)]
+                break
+        result.append(word)
+    return result
+
+
+def content_words(text):
+    """질문의 핵심 단어 집합 (질문 틀 표현 제외). 유사 질문은 이 집합이 같아야 함"""
+    return {word for word in words(text) if word not in FRAME_WORDS}
+
+
+def shingles(text):
+    """단어 1~NGRAM_SIZE-gram 집합을 반환합니다."""
+    tokens = words(text) or [text]
+    return {" ".join(tokens[i:i + n]) for n in range(1, NGRAM_SIZE + 1) for i in range(len(tokens) - n + 1)} or {text}
+
+
+def cacheable_answer(answer):
+    """되묻거나 추가 정보를 요청하는 짧은 답변은 질문에 대한 답이 아니므로 캐시하지 않음"""
+    lines = [line.strip() for line in (answer or "").splitlines() if line.strip()]
+    if not lines:
+        return False
+    return not (len(answer) < 400 and lines[-1].endswith(("?", "？")))
+
+
+def minhash_signature(text):
+    """
+    단어 n-gram 집합의 MinHash 서명을 계산합니다.
+
+    Args:
+        text: 정규화된 질문
+    """
+    hashed = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashed) for a, b in HASH_PARAMS]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """두 MinHash 서명의 일치 비율로 Jaccard 유사도를 추정합니다."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def band_keys(signature):
+    """LSH 밴드별 버킷 키를 반환합니다."""
+    return [f"{band}:{zlib.crc32(json.dumps(signature[band * ROWS:(band + 1) * ROWS]).encode())}"
+            for band in range(BANDS)]
+
+
+class AnswerCache:
+    """SQLite 파일 기반의 크기 제한 답변 캐시"""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 ttl=ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+        self.lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                agent TEXT,
+                signature TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL)""")
+            conn.execute("CREATE TABLE IF NOT EXISTS bands (band TEXT NOT NULL, key TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_band ON bands (band)")
+            conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (key)")
+
+    @contextmanager
+    def connect(self):
+        """트랜잭션을 커밋하고 연결을 닫는 SQLite 연결 컨텍스트"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, question):
+        """
+        캐시된 답변을 찾아 {"answer", "agent", "match", "similarity"}로 반환합니다. 없으면 None.
+
+        Args:
+            question: 사용자 질문
+        """
+        key = normalize_question(question)
+        now = time.time()
+        try:
+            with self.lock, self.connect() as conn:
+                row = conn.execute("SELECT answer, agent FROM answers WHERE key = ? AND expires_at > ?",
+                                   (key, now)).fetchone()
+                if row:
+                    conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+                    self.stats["exact_hits"] += 1
+                    return {"answer": row[0], "agent": row[1], "match": "exact", "similarity": 1.0}
+
+                signature = minhash_signature(key)
+                buckets = band_keys(signature)
+                placeholders = ",".join("?" * len(buckets))
+                candidates = conn.execute(
+                    f"""SELECT DISTINCT a.key, a.answer, a.agent, a.signature FROM bands b
+                        JOIN answers a ON a.key = b.key
+                        WHERE b.band IN ({placeholders}) AND a.expires_at > ?""",
+                    (*buckets, now)).fetchall()
+                best = None
+                key_words = content_words(key)
+                for cand_key, answer, agent, cand_signature in candidates:
+                    similarity = estimate_similarity(signature, json.loads(cand_signature))
+                    # "영어에서 ..."와 "일본어에서 ..."처럼 핵심 단어가 하나라도 다르면 다른 질문
+                    if content_words(cand_key) != key_words:
+                        continue
+                    if similarity >= self.similarity and (best is None or similarity > best[0]):
+                        best = (similarity, cand_key, answer, agent)
+                if best:
+                    conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, best[1]))
+                    self.stats["near_hits"] += 1
+                    return {"answer": best[2], "agent": best[3], "match": "near", "similarity": best[0]}
+        except sqlite3.Error as e:
+            logging.error(f"답변 캐시 조회 실패: {e}")
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, question, answer, agent_name=None, ttl=None):
+        """
+        답변을 저장하고 만료된 항목과 한도를 넘는 오래된 항목을 정리합니다.
+
+        Args:
+            question: 사용자 질문
+            answer: 에이전트 답변
+            agent_name: 답변한 에이전트 이름
+            ttl: 항목별 TTL(초), 0 이하이면 저장하지 않음
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or not answer:
+            return
+        key = normalize_question(question)
+        signature = minhash_signature(key)
+        now = time.time()
+        try:
+            with self.lock, self.connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, answer, agent_name, json.dumps(signature), now + ttl, now))
+                conn.execute("DELETE FROM bands WHERE key = ?", (key,))
+                conn.executemany("INSERT INTO bands VALUES (?, ?)", [(band, key) for band in band_keys(signature)])
+                conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+                conn.execute("""DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+                conn.execute("DELETE FROM bands WHERE key NOT IN (SELECT key FROM answers)")
+            self.stats["stores"] += 1
+        except sqlite3.Error as e:
+            logging.error(f"답변 캐시 저장 실패: {e}")
@@ -0,0 +1,255 @@
+"""
+Named browser profiles for Computer-Using Agent sessions.
+
+A profile is a Playwright storage_state snapshot (cookies and local storage)
+saved under PROFILE_DIR, so sessions start already logged in and past cookie
+banners. Sessions always work on their own copy of the snapshot
+(copy-on-write); the copy is written back only when the refresh policy says
+the profile is due and nobody else has updated it since it was cloned.
+"""
+
+import os
+import copy
+import json
+import time
+import uuid
+import socket
+import logging
+from contextlib import contextmanager
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Write a session's state back to its profile at most this often (seconds)
+PROFILE_REFRESH_INTERVAL = float(os.getenv("PROFILE_REFRESH_INTERVAL", "86400"))
+# Give up waiting for another writer's lock after this many seconds
+PROFILE_LOCK_TIMEOUT = 10
+# A lock file older than this (seconds) is left over from a crashed writer and is broken
+PROFILE_LOCK_STALE_AFTER = float(os.getenv("PROFILE_LOCK_STALE_AFTER", "120"))
+
+# Refresh policies: "interval" (default), "always", "never"
+REFRESH_POLICIES = ("interval", "always", "never")
+
+
+def profile_path(name, directory=PROFILE_DIR):
+    return os.path.join(directory, f"{name}.json")
+
+
+def load_profile(name, directory=PROFILE_DIR):
+    """Load a profile by name, or return None if it does not exist."""
+    path = profile_path(name, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def clone_profile(name, directory=PROFILE_DIR):
+    """
+    Return a private copy of a profile's storage_state and the version it was cloned from.
+    A missing profile yields (None, 0) so the session starts from a blank context.
+
+    Args:
+        name: Profile name
+    """
+    profile = load_profile(name, directory)
+    if profile is None:
+        return None, 0
+    return copy.deepcopy(profile["storage_state"]), profile["version"]
+
+
+def profile_version(name, directory=PROFILE_DIR):
+    """Current version of a profile (0 if it does not exist)."""
+    profile = load_profile(name, directory)
+    return profile["version"] if profile is not None else 0
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+def read_lock(lock_path):
+    """
+    Read a lock file.
+
+    Returns:
+        (identity, mtime, owner) or None if there is no lock. identity (inode, mtime and
+        content) tells whether the file is still the same lock later on.
+    """
+    try:
+        with open(lock_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        owner = json.loads(raw or b"{}")
+    except ValueError:
+        owner = {}
+    return (stat.st_ino, stat.st_mtime_ns, raw), stat.st_mtime, owner
+
+
+def lock_is_stale(mtime, owner):
+    """
+    True if a lock file was left behind: it is older than PROFILE_LOCK_STALE_AFTER,
+    or its owner ran on this host and is no longer alive.
+    """
+    if time.time() - mtime > PROFILE_LOCK_STALE_AFTER:
+        return True
+    pid = owner.get("pid")
+    return bool(pid) and owner.get("host") == socket.gethostname() and not pid_alive(pid)
+
+
+def break_stale_lock(lock_path, identity):
+    """
+    Remove a stale lock without racing other waiters: the lock is first renamed to a
+    unique name, then deleted only if it is still the file that was judged stale.
+    If another waiter already replaced it with a live lock, that lock is put back.
+    """
+    aside = f"{lock_path}.{uuid.uuid4().hex}.stale"
+    try:
+        os.rename(lock_path, aside)
+    except FileNotFoundError:
+        # Another waiter broke it first
+        return
+    moved = read_lock(aside)
+    if moved is None or moved[0] != identity:
+        try:
+            # os.link never replaces a lock created in the meantime
+            os.link(aside, lock_path)
+        except FileExistsError:
+            pass
+    else:
+        logging.warning(f"오래되었거나 소유 프로세스가 없는 프로필 잠금을 해제합니다: {lock_path}")
+    os.remove(aside)
+
+
+@contextmanager
+def profile_lock(name, directory=PROFILE_DIR):
+    """
+    Exclusive lock on a profile, implemented with an O_EXCL lock file. The lock file
+    records the owner's host, PID, start time and a unique token, so a lock left by a
+    crashed writer can be broken and a writer only ever removes its own lock.
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock_path = profile_path(name, directory) + ".lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + PROFILE_LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, json.dumps({"host": socket.gethostname(), "pid": os.getpid(),
+                                     "time": time.time(), "token": token}).encode("utf-8"))
+            break
+        except FileExistsError:
+            lock = read_lock(lock_path)
+            if lock is not None and lock_is_stale(lock[1], lock[2]):
+                break_stale_lock(lock_path, lock[0])
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for profile lock: {lock_path}")
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        lock = read_lock(lock_path)
+        if lock is not None and lock[2].get("token") == token:
+            os.remove(lock_path)
+        else:
+            logging.warning(f"프로필 잠금이 다른 프로세스에 의해 해제되었습니다: {lock_path}")
+
+
+def commit_profile(name, storage_state, base_version, refresh_policy=None, directory=PROFILE_DIR):
+    """
+    Write a session's storage_state back to its profile if the refresh policy allows it.
+
+    The write is skipped when another session has committed a newer version since this
+    one was cloned, so concurrent sessions never overwrite each other's updates.
+
+    Args:
+        name: Profile name
+        storage_state: The session's current storage_state
+        base_version: Version returned by clone_profile
+        refresh_policy: Policy for a new profile (existing profiles keep their own)
+
+    Returns:
+        True if the profile was written
+    """
+    try:
+        with profile_lock(name, directory):
+            current = load_profile(name, directory)
+            if current is not None:
+                if current["version"] != base_version:
+                    logging.debug(f"프로필 '{name}'이 다른 세션에서 갱신되어 저장을 건너뜁니다.")
+                    return False
+                policy = current.get("refresh_policy", "interval")
+                if policy == "never":
+                    return False
+                if policy == "interval" and time.time() - current["updated_at"] < PROFILE_REFRESH_INTERVAL:
+                    return False
+            else:
+                policy = refresh_policy or "interval"
+
+            profile = {
+                "name": name,
+                "version": base_version + 1,
+                "updated_at": time.time(),
+                "refresh_policy": policy,
+                "storage_state": storage_state,
+            }
+            path = profile_path(name, directory)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(profile, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            logging.debug(f"프로필 '{name}' 저장 (version {profile['version']})")
+            return True
+    except (OSError, TimeoutError) as e:
+        logging.error(f"프로필 저장 실패 ({name}): {e}")
+        return False
+
+
+def set_refresh_policy(name, policy, directory=PROFILE_DIR):
+    """
+    Change a profile's refresh policy. The snapshot and its version are left as they are.
+
+    Returns:
+        True if the profile exists and was updated
+    """
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Unknown refresh policy: {policy} (expected one of {', '.join(REFRESH_POLICIES)})")
+    with profile_lock(name, directory):
+        profile = load_profile(name, directory)
+        if profile is None:
+            return False
+        profile["refresh_policy"] = policy
+        path = profile_path(name, directory)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+    return True
+
+
+def list_profiles(directory=PROFILE_DIR):
+    """Return summaries of all saved profiles."""
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".json"):
+            continue
+        profile = load_profile(file_name[:-len(".json")], directory)
+        summaries.append({
+            "name": profile["name"],
+            "version": profile["version"],
+            "updated_at": profile["updated_at"],
+            "refresh_policy": profile.get("refresh_policy", "interval"),
+            "cookies": len(profile["storage_state"].get("cookies", [])),
+            "origins": len(profile["storage_state"].get("origins", [])),
+        })
+    return summaries
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+모델 티어 비교 도구
+같은 질문 세트를 여러 티어 지정으로 다시 실행하여 지연 시간과 기준 티어 대비 일치율
+(라우팅 에이전트, 가드레일 판정)을 보고합니다. 첫 번째 티어가 기준입니다.
+
+사용법:
+    python compare_tiers.py questions.txt \\
+        --tier baseline: \\
+        --tier fast:content_check=gpt-4.1-nano,triage=gpt-4.1-mini \\
+        --tier custom:tiers/custom.json
+"""
+
+import json
+import time
+import asyncio
+import argparse
+
+import guardrail_cache
+import question_router
+import learning_assistant_agents as assistant
+from model_tiers import apply_tiers
+
+TIER_KEYS = ["content_check", "triage", "programming", "language", "history", "web_search"]
+
+
+def parse_tier(arg):
+    """
+    "이름:지정" 형식을 (이름, 지정)으로 변환합니다. 지정은 JSON 파일 경로이거나
+    "키=모델,키=모델" 목록이며, 비어 있으면 현재 설정을 그대로 사용합니다.
+    """
+    name, _, spec = arg.partition(":")
+    if spec.endswith(".json"):
+        with open(spec, encoding="utf-8") as f:
+            return name, json.load(f)
+    assignment = {}
+    for part in filter(None, spec.split(",")):
+        key, _, model = part.partition("=")
+        assignment[key.strip()] = model.strip()
+    return name, assignment
+
+
+async def run_tier(questions, assignment, concurrency, agents_by_key, originals):
+    """기본 설정으로 되돌린 뒤 티어를 적용하고 질문 세트를 실행합니다."""
+    for key, (model, settings) in originals.items():
+        agents_by_key[key].model = model
+        agents_by_key[key].model_settings = settings
+    apply_tiers(agents_by_key, assignment)
+    # 이전 티어의 가드레일 판정이 재사용되지 않도록 캐시를 비움
+    guardrail_cache.verdict_cache = guardrail_cache.VerdictCache()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    records = await asyncio.gather(*(assistant.evaluate_question(item, semaphore) for item in questions))
+    return records, assistant.summarize(records, time.perf_counter() - started)
+
+
+def agreement(records, baseline):
+    """기준 결과와 라우팅/가드레일 판정이 일치하는 비율을 계산합니다."""
+    total = len(records) or 1
+    routing = sum(1 for a, b in zip(records, baseline) if a["agent"] == b["agent"])
+    guardrail = sum(1 for a, b in zip(records, baseline) if a["guardrail_tripped"] == b["guardrail_tripped"])
+    return {"routing": routing / total, "guardrail": guardrail / total}
+
+
+async def compare(questions, tiers, concurrency):
+    """티어를 차례로 실행하고 티어별 요약과 기준 대비 일치율 보고서를 반환합니다."""
+    agents_by_key = {key: getattr(assistant, f"{key}_agent") for key in TIER_KEYS}
+    originals = {key: (agent.model, agent.model_settings) for key, agent in agents_by_key.items()}
+
+    report = []
+    baseline = None
+    for name, assignment in tiers:
+        print(f"\n[{name}] {json.dumps(assignment, ensure_ascii=False)} - {len(questions)}개 질문 실행 중...")
+        records, summary = await run_tier(questions, assignment, concurrency, agents_by_key, originals)
+        if baseline is None:
+            baseline = records
+        match = agreement(records, baseline)
+        report.append({"tier": name, "assignment": assignment, "summary": summary, "agreement": match})
+        print(f"p50 {summary['latency_p50_s']:.2f}초, p95 {summary['latency_p95_s']:.2f}초, 오류 {summary['errors']}건, "
+              f"라우팅 일치 {match['routing']:.0%}, 가드레일 일치 {match['guardrail']:.0%}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="에이전트 모델 티어 비교")
+    parser.add_argument("questions", help="질문 파일 (.txt 또는 .jsonl)")
+    parser.add_argument("--tier", action="append", required=True, help="이름:지정 (여러 번 지정, 첫 번째가 기준)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 실행 수")
+    parser.add_argument("--keep-shortcuts", action="store_true",
+                        help="로컬 라우터와 가드레일 사전 필터를 끄지 않음 (기본은 모델 판정만 비교)")
+    parser.add_argument("--output", default="tier_report.json", help="보고서 JSON 경로")
+    args = parser.parse_args()
+
+    if not args.keep_shortcuts:
+        question_router.ROUTER_ENABLED = False
+        guardrail_cache.PREFILTER_ENABLED = False
+
+    # 파일 입출력은 이벤트 루프 밖에서 처리
+    # (질문은 evaluate_question을 거치므로 라우팅 로그에 기록되지 않음)
+    questions = assistant.load_questions(args.questions)
+    tiers = [parse_tier(arg) for arg in args.tier]
+    report = asyncio.run(compare(questions, tiers, args.concurrency))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n보고서: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
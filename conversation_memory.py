@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미 Gradio 앱의 세션별 대화 기억
+최근 대화는 그대로, 오래된 대화는 요약으로 에이전트 입력에 넣고, 토큰 예산을 넘으면
+오래된 턴부터 요약에 합칩니다(compaction). 마지막으로 답변한 전문 에이전트를 기억하여
+후속 질문을 triage 없이 바로 보낼 수 있게 합니다.
+
+기억은 서버에서 가드레일을 통과해 답변한 턴으로만 만듭니다. 클라이언트가 보내는 Chatbot
+기록은 위조할 수 있으므로 기억을 복원하는 데 쓰지 않습니다.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# tiktoken이 있으면 정확한 토큰 수를, 없으면 문자 수 기반 추정치를 사용
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+# 대화 기억 설정
+# 요약과 이전 턴에 쓸 최대 토큰 수 (새 질문 제외)
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+# 요약하지 않고 그대로 남길 최근 턴 수
+MEMORY_KEEP_RECENT_TURNS = int(os.getenv("MEMORY_KEEP_RECENT_TURNS", "2"))
+# 이 시간(초) 동안 사용하지 않은 세션의 기억은 삭제
+MEMORY_TTL = float(os.getenv("MEMORY_TTL", "3600"))
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "1000"))
+# triage 없이 직전 전문 에이전트로 연속해서 보낼 수 있는 후속 질문 수 (넘으면 다시 triage)
+MEMORY_MAX_FOLLOWUPS = int(os.getenv("MEMORY_MAX_FOLLOWUPS", "2"))
+
+
+def estimate_tokens(text):
+    """텍스트의 토큰 수를 셉니다 (tiktoken이 없으면 한글 1자 = 1토큰, 그 외 4자 = 1토큰으로 추정)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    wide = sum(1 for ch in text if ord(ch) > 0x2FF)
+    return wide + (len(text) - wide + 3) // 4
+
+
+class ConversationState:
+    """한 세션의 요약, 최근 턴, 마지막 전문 에이전트"""
+
+    def __init__(self):
+        self.summary = ""
+        self.turns = []
+        self.last_agent = None
+        # triage 없이 직전 에이전트로 보낸 연속 후속 질문 수
+        self.followups = 0
+        self.compacted_turns = 0
+        self.updated_at = time.monotonic()
+
+    def turn_tokens(self, turn):
+        return estimate_tokens(turn["question"]) + estimate_tokens(turn["answer"])
+
+    def memory_tokens(self):
+        """요약과 저장된 턴의 토큰 수"""
+        return estimate_tokens(self.summary) + sum(self.turn_tokens(turn) for turn in self.turns)
+
+    def build_input(self, question, token_budget=None):
+        """
+        요약, 이전 턴, 새 질문으로 Runner 입력 항목 목록을 만듭니다.
+        기억이 없으면 질문 문자열을 그대로 반환합니다.
+
+        Args:
+            question: 새 질문
+            token_budget: 요약과 이전 턴에 쓸 최대 토큰 수 (최근 턴부터 채움)
+        """
+        if not self.summary and not self.turns:
+            return question
+        remaining = (token_budget if token_budget is not None else float("inf")) - estimate_tokens(self.summary)
+        turns = []
+        for turn in reversed(self.turns):
+            cost = self.turn_tokens(turn)
+            if cost > remaining:
+                if not turns and remaining > estimate_tokens(turn["question"]):
+                    # 직전 턴은 후속 질문에 꼭 필요하므로 답변을 잘라서라도 넣음
+                    answer_chars = int(remaining - estimate_tokens(turn["question"]))
+                    turns.append(dict(turn, answer=turn["answer"][:answer_chars] + "…"))
+                break
+            turns.insert(0, turn)
+            remaining -= cost
+
+        items = []
+        if self.summary:
+            items.append({"role": "system", "content": f"이전 대화 요약:\n{self.summary}"})
+        for turn in turns:
+            items.append({"role": "user", "content": turn["question"]})
+            items.append({"role": "assistant", "content": turn["answer"]})
+        items.append({"role": "user", "content": question})
+        return items
+
+
+class ConversationMemory:
+    """세션 ID별 대화 상태 (LRU와 유휴 TTL로 크기 제한)"""
+
+    def __init__(self, token_budget=MEMORY_TOKEN_BUDGET, keep_recent=MEMORY_KEEP_RECENT_TURNS,
+                 ttl=MEMORY_TTL, max_sessions=MEMORY_MAX_SESSIONS):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"turns": 0, "input_tokens": 0, "compactions": 0}
+
+    def get(self, session_id):
+        """
+        세션의 대화 상태를 반환합니다. 기억이 없거나 만료되었으면 빈 상태로 시작합니다.
+
+        Args:
+            session_id: Gradio 세션 ID
+        """
+        now = time.monotonic()
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is not None and now - state.updated_at > self.ttl:
+                state = None
+            if state is None:
+                state = ConversationState()
+                self.sessions[session_id] = state
+            state.updated_at = now
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return state
+
+    def followup_agent(self, state):
+        """후속 질문을 triage 없이 보낼 직전 전문 에이전트 이름 (연속 후속 질문 한도를 넘으면 None)"""
+        return state.last_agent if state.followups < MEMORY_MAX_FOLLOWUPS else None
+
+    def reset(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def record_turn(self, state, question, answer, agent_name, specialist=True, input_tokens=None):
+        """
+        답변이 끝난 턴을 기억에 추가합니다.
+
+        Args:
+            state: 세션의 ConversationState
+            question: 사용자 질문
+            answer: 최종 답변
+            agent_name: 답변한 에이전트 이름
+            specialist: 전문 에이전트의 답변이면 다음 후속 질문에 같은 에이전트를 사용
+            input_tokens: 이번 턴에 모델이 받은 입력 토큰 수
+        """
+        state.turns.append({"question": question, "answer": answer, "agent": agent_name})
+        if specialist:
+            state.last_agent = agent_name
+        self.stats["turns"] += 1
+        self.stats["input_tokens"] += input_tokens or 0
+
+    def needs_compaction(self, state):
+        return state.memory_tokens() > self.token_budget and len(state.turns) > self.keep_recent
+
+    async def compact(self, state, summarize):
+        """
+        토큰 예산을 넘으면 최근 턴을 제외한 오래된 턴을 요약에 합칩니다.
+
+        Args:
+            state: 세션의 ConversationState
+            summarize: (기존 요약, 요약할 턴 목록)을 받아 새 요약을 반환하는 비동기 함수
+        """
+        if not self.needs_compaction(state):
+            return False
+        old_turns = state.turns[:len(state.turns) - self.keep_recent] if self.keep_recent else list(state.turns)
+        try:
+            summary = await summarize(state.summary, old_turns)
+        except Exception as e:
+            # 요약 실패 시 각 턴의 앞부분만 남겨 예산을 지킴
+            logging.error(f"대화 요약 실패: {e}")
+            summary = "\n".join([state.summary] + [f"- {t['question'][:100]} → {t['answer'][:200]}" for t in old_turns]).strip()
+        state.summary = summary
+        state.turns = state.turns[len(old_turns):]
+        state.compacted_turns += len(old_turns)
+        self.stats["compactions"] += 1
+        # 요약 자체가 예산을 넘으면 뒤쪽(최근) 내용을 남기고 자름
+        while estimate_tokens(state.summary) > self.token_budget // 2 and len(state.summary) > 200:
+            state.summary = state.summary[len(state.summary) // 4:]
+        return True
+
+
+def format_turns(turns):
+    """요약 에이전트에 넘길 대화 텍스트를 만듭니다."""
+    return "\n\n".join(f"사용자: {turn['question']}\n{turn.get('agent') or '도우미'}: {turn['answer']}" for turn in turns)
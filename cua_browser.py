@@ -5,6 +5,42 @@ from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
 from openai import OpenAI
 import logging
+import argparse
+from types import SimpleNamespace
+from cua_checkpoint import (
+    CHECKPOINT_EVERY,
+    new_session_id,
+    save_checkpoint,
+    load_checkpoint,
+    list_checkpoints,
+)
+from cua_budget import SessionBudget, BUDGET_EXCEEDED, STUCK, cached_ratio
+from cua_safety import (
+    SafetyPolicy,
+    ACKNOWLEDGE,
+    ABORT,
+    PARK,
+    PROMPT,
+    PENDING_APPROVAL,
+    task_tags,
+    record_decision,
+    load_audit_log,
+    audit_summary,
+    safety_metrics_summary,
+)
+from browser_profiles import REFRESH_POLICIES, clone_profile, commit_profile, list_profiles, profile_version, set_refresh_policy
+from cua_trace import TraceStore, TRACE_ENABLED
+from cua_tabs import CUA_PREFETCH_LINKS, TabTracker
+from site_profiles import (
+    WARM_POOL_SIZE,
+    WARM_PAGE_MAX_AGE,
+    PrewarmStats,
+    match_site,
+    default_site,
+    prewarm_sites,
+    should_block,
+    settle_hints,
+)
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +58,52 @@ if not api_key or api_key == "your_api_key_here":
 client = OpenAI(api_key=api_key)
 logging.debug(f"OpenAI API 키: {api_key[:8]}...")
 
+# 안전 점검 승인 정책
+safety_policy = SafetyPolicy.load()
+
+# 모든 요청에 똑같이 보내는 고정 접두부 (instructions, 도구 정의)
+# 작업 내용은 첫 사용자 메시지에만 넣어 서버 측 프롬프트 캐시가 세션과 단계를 넘어 적중하도록 함
+CUA_INSTRUCTIONS = ("You are a helpful web browsing assistant. Complete the task in the user's first message "
+                    "by operating the browser. Stop and reply with text when the task is done.")
+CUA_TOOLS = [{
+    "type": "computer_use_preview",
+    "display_width": 1024,
+    "display_height": 768,
+    "environment": "browser"
+}]
+# 같은 접두부를 가진 요청을 같은 캐시로 보내기 위한 키 (빈 값이면 보내지 않음)
+CUA_PROMPT_CACHE_KEY = os.getenv("CUA_PROMPT_CACHE_KEY", "cua-browser")
+
+# 브라우저 창 표시 여부 (워커 프로세스는 기본적으로 headless로 실행)
+CUA_HEADLESS = os.getenv("CUA_HEADLESS", "false").lower() == "true"
+
+# 세션 트레이스 저장소 (행동, URL, 소요 시간, 모델 출력, 중복 제거된 스크린샷)
+trace_store = TraceStore() if TRACE_ENABLED else None
+
+def trace_event(session, event_type, screenshot=None, **fields):
+    """
+    Append an event to the session trace. Trace errors never stop the session.
+    """
+    if trace_store is None:
+        return
+    try:
+        trace_store.append_event(session, event_type, screenshot=screenshot, **fields)
+    except Exception as e:
+        logging.error(f"트레이스 기록 실패: {e}")
+
+def model_output(response):
+    """
+    Return the non-action output items of a response (reasoning, messages) for the trace.
+    """
+    return [item.model_dump(exclude_none=True) for item in response.output if item.type != "computer_call"]
+
+def model_text(response):
+    """
+    Return the assistant's text from a response's message items.
+    """
+    return "\n".join(part.text for item in response.output if item.type == "message"
+                     for part in item.content if getattr(part, "text", None))
+
 def handle_model_action(page, action):
     """
     Execute the requested action on the browser page.
@@ -107,7 +189,7 @@ def handle_model_action(page, action):
             # Use getattr for optional parameters
             duration = getattr(action, "duration", 2)
             print(f"Action: wait for {duration} seconds")
-            time.sleep(duration)
+            page.wait_for_timeout(duration * 1000)
 
         elif action_type == "screenshot":
             print("Action: screenshot")
@@ -126,7 +208,8 @@ def handle_model_action(page, action):
             print(f"Unrecognized action: {action_type}")
 
         # Allow a short time for the action to complete
-        time.sleep(0.5)
+        # (wait_for_timeout also delivers page events such as new tabs meanwhile)
+        page.wait_for_timeout(500)
         return True
 
     except Exception as e:
@@ -140,12 +223,88 @@ def get_screenshot(page):
     screenshot_bytes = page.screenshot(full_page=False)
     return base64.b64encode(screenshot_bytes).decode("utf-8")
 
-def computer_use_loop(page, response):
+def create_response(input_items, previous_response_id=None):
+    """
+    Call the computer-use model. Instructions and tools are the same constant prefix on
+    every call, so only the new input items differ between requests.
+    """
+    kwargs = {"prompt_cache_key": CUA_PROMPT_CACHE_KEY} if CUA_PROMPT_CACHE_KEY else {}
+    return client.responses.create(
+        model="computer-use-preview",
+        instructions=CUA_INSTRUCTIONS,
+        tools=CUA_TOOLS,
+        previous_response_id=previous_response_id,
+        input=input_items,
+        truncation="auto",
+        **kwargs
+    )
+
+def send_computer_call_output(page, previous_response_id, call_id, acknowledged_safety_checks, screenshot_base64=None):
+    """
+    Send the current page as the output of a computer call.
+    A new screenshot is taken unless one is passed in.
+    """
+    # Get current URL for better safety checks
+    current_url = page.url
+    print(f"Current URL: {current_url}")
+    
+    # Take a new screenshot
+    if screenshot_base64 is None:
+        screenshot_base64 = get_screenshot(page)
+    
+    # Send the updated state back to the model
+    print("Sending updated state to the model...")
+    return create_response([
+        {
+            "type": "computer_call_output",
+            "call_id": call_id,
+            "acknowledged_safety_checks": acknowledged_safety_checks,
+            "output": {
+                "type": "computer_screenshot",
+                "image_url": f"data:image/png;base64,{screenshot_base64}"
+            },
+            "current_url": current_url
+        }
+    ], previous_response_id=previous_response_id)
+
+def checkpoint_session(page, session, previous_response_id, call_id, acknowledged_safety_checks):
+    """
+    Save where the session is in the response chain, together with the browser state.
+    Called after an action has completed and before its result is sent to the model,
+    so a resume re-sends the current screen for this call instead of repeating the action.
+    """
+    session.update({
+        "status": "running",
+        "previous_response_id": previous_response_id,
+        "pending_call_id": call_id,
+        "acknowledged_safety_checks": acknowledged_safety_checks,
+        "url": page.url,
+        "storage_state": page.context.storage_state(),
+    })
+    save_checkpoint(session)
+    logging.debug(f"체크포인트 저장: {session['session_id']} (step {session['step']})")
+
+def computer_use_loop(page, response, session=None):
     """
     Main loop for executing computer actions based on model responses.
+    
+    Actions run on the session's active tab: the loop follows tabs and popups opened
+    by an action, and prefetches result links from search results pages.
+    
+    Args:
+        page: Playwright page
+        response: Latest model response
+        session: Checkpoint state for this session (task, step counter, ...)
     """
+    session = session if session is not None else {"session_id": new_session_id(), "task": "", "step": 0}
+    budget = SessionBudget(session)
+    # Prefetching would open pages with the profile's logged-in state that the model never chose
+    tabs = TabTracker(page, prefetch_links=0 if session.get("profile") else CUA_PREFETCH_LINKS)
+    model_seconds = None
     try:
         while True:
+            input_tokens, cached_tokens = budget.charge_response(response)
+            
             # Check for computer calls in the response
             computer_calls = [item for item in response.output if item.type == "computer_call"]
             
@@ -155,6 +314,7 @@ def computer_use_loop(page, response):
                 for item in response.output:
                     if hasattr(item, 'content') and item.content:
                         print(f"Assistant: {item.content}")
+                session["status"] = "completed"
                 break
             
             # Get the latest computer call
@@ -170,138 +330,548 @@ def computer_use_loop(page, response):
                 print("\nSafety checks detected:")
                 for check in pending_safety_checks:
                     print(f"- {check.code}: {check.message}")
-                    acknowledged_safety_checks.append(check)
+                    acknowledged_safety_checks.append({"id": check.id, "code": check.code, "message": check.message})
                 
-                user_confirmation = input("Do you want to acknowledge these safety checks and continue? (y/n): ")
-                if user_confirmation.lower() != 'y':
-                    print("Operation cancelled by user.")
+                decision, decisions = safety_policy.decide(pending_safety_checks, page.url, task_tags(session))
+                if decision == PROMPT:
+                    user_confirmation = input("Do you want to acknowledge these safety checks and continue? (y/n): ")
+                    decision = ACKNOWLEDGE if user_confirmation.lower() == 'y' else ABORT
+                record_decision(session, decisions, decision)
+                
+                if decision == ABORT:
+                    print("Operation cancelled by safety check policy.")
+                    session["status"] = "cancelled"
+                    session["stop_reason"] = "safety checks not acknowledged"
+                    break
+                if decision == PARK:
+                    # 승인될 때까지 세션을 대기열에 두고 다음 작업으로 넘어감
+                    checkpoint_session(page, session, response.id, call_id, acknowledged_safety_checks)
+                    session["status"] = PENDING_APPROVAL
+                    session["pending_action"] = action.model_dump(exclude_none=True)
+                    session["pending_decisions"] = decisions
+                    print(f"Session parked for approval: python cua_browser.py --approve {session['session_id']}")
                     break
+                print("Safety checks acknowledged by policy.")
             
             # Execute the action
-            success = handle_model_action(page, action)
+            budget.record_action(action)
+            action_started = time.monotonic()
+            success = tabs.go_back(action) or handle_model_action(page, action)
             if not success:
                 print("Failed to execute action. Stopping loop.")
+                session["status"] = "failed"
                 break
             
-            # Get current URL for better safety checks
-            current_url = page.url
-            print(f"Current URL: {current_url}")
+            # 새 탭/팝업이 열렸거나 미리 로딩된 탭으로 전환되었으면 그 탭에서 계속
+            page = tabs.follow()
+            tabs.prefetch()
+            tabs.enforce_limit()
+            session["step"] += 1
+            screenshot_bytes = page.screenshot(full_page=False)
+            budget.record_frame(screenshot_bytes)
+            trace_event(session, "step", screenshot=screenshot_bytes,
+                        action=action.model_dump(exclude_none=True), call_id=call_id, url=page.url,
+                        action_seconds=round(time.monotonic() - action_started, 3),
+                        model_seconds=model_seconds, input_tokens=input_tokens, cached_tokens=cached_tokens,
+                        tabs=len(tabs.pages),
+                        response_id=response.id, output=model_output(response))
             
-            # Take a new screenshot
-            screenshot_base64 = get_screenshot(page)
+            # 예산 초과나 반복 동작이면 다음 모델 호출 전에 중단
+            stop = budget.exceeded()
+            if stop:
+                session["status"], session["stop_reason"] = stop
+                print(f"Stopping session: {session['status']} - {session['stop_reason']}")
+                break
             
-            # Send the updated state back to the model
-            print("Sending updated state to the model...")
-            response = client.responses.create(
-                model="computer-use-preview",
-                previous_response_id=response.id,
-                tools=[{
-                    "type": "computer_use_preview",
-                    "display_width": 1024,
-                    "display_height": 768,
-                    "environment": "browser"
-                }],
-                input=[
-                    {
-                        "type": "computer_call_output",
-                        "call_id": call_id,
-                        "acknowledged_safety_checks": acknowledged_safety_checks,
-                        "output": {
-                            "type": "computer_screenshot",
-                            "image_url": f"data:image/png;base64,{screenshot_base64}"
-                        },
-                        "current_url": current_url
-                    }
-                ],
-                truncation="auto"
-            )
+            screenshot_base64 = base64.b64encode(screenshot_bytes).decode("utf-8")
+            budget.charge_image(screenshot_base64)
+            if session["step"] % CHECKPOINT_EVERY == 0:
+                checkpoint_session(page, session, response.id, call_id, acknowledged_safety_checks)
+            
+            model_started = time.monotonic()
+            response = send_computer_call_output(page, response.id, call_id, acknowledged_safety_checks, screenshot_base64)
+            model_seconds = round(time.monotonic() - model_started, 3)
     except Exception as e:
         print(f"Error in computer use loop: {e}")
         import traceback
         traceback.print_exc()
+        session["status"] = "error"
+    finally:
+        budget.exceeded()  # 경과 시간 갱신
+        usage = session["usage"]
+        print(f"Session {session.get('status')}: {session['step']} steps, {usage['elapsed']:.0f}s, "
+              f"{usage['total_tokens']} tokens ({cached_ratio(usage):.0%} of input cached), "
+              f"{usage['image_bytes'] / 1024 / 1024:.1f} MB of screenshots")
+        print(f"Tabs: {tabs.summary()}")
+        session["tabs"] = dict(tabs.stats)
+        safety_counts = safety_metrics_summary()
+        if safety_counts:
+            print(f"Safety checks so far in this process: {safety_counts}")
+        trace_event(session, "end", status=session.get("status"), stop_reason=session.get("stop_reason"),
+                    url=page.url, model_seconds=model_seconds, response_id=response.id,
+                    output=model_output(response), text=model_text(response), usage=usage)
+        # Keep the last running checkpoint on errors so the session can be resumed
+        if session.get("status") in ("completed", "cancelled", "failed", BUDGET_EXCEEDED, STUCK):
+            session.pop("storage_state", None)
+            save_checkpoint(session)
+        elif session.get("status") == PENDING_APPROVAL:
+            save_checkpoint(session)
 
-def start_browsing_session(user_task):
+def save_session_profile(page, session):
     """
-    Start a browser session with the computer use agent.
+    Write the session's browser state back to its profile when the session completed.
+    """
+    if not session.get("profile") or session.get("status") != "completed":
+        return
+    if commit_profile(session["profile"], page.context.storage_state(), session["profile_version"]):
+        print(f"Profile '{session['profile']}' updated.")
+
+def prepare_site_page(page, site):
+    """
+    Apply a site profile's resource-blocking rules to a page.
+    """
+    if site.get("block_resources") or site.get("block_url_patterns"):
+        page.route("**/*", lambda route: route.abort()
+                   if should_block(site, route.request.resource_type, route.request.url) else route.continue_())
+
+def navigate_to_site(page, site):
+    """
+    Navigate to a site's start URL and wait for its settle hints.
+    
+    Returns:
+        Navigation time in seconds
+    """
+    started = time.monotonic()
+    wait_until, selector, settle_ms = settle_hints(site)
+    try:
+        logging.debug(f"페이지 이동 시도: {site['start_url']} ({site['name']})")
+        page.goto(site["start_url"], wait_until=wait_until)
+    except Exception as e:
+        logging.error(f"페이지 이동 실패: {e}")
+        # 실패 시 기본 사이트로 대체
+        page.goto(default_site()["start_url"])
+    if selector:
+        try:
+            page.wait_for_selector(selector, timeout=5000)
+        except Exception:
+            logging.debug(f"대기 셀렉터를 찾지 못함: {selector}")
+    if settle_ms:
+        page.wait_for_timeout(settle_ms)
+    logging.debug(f"현재 URL: {page.url}")
+    return time.monotonic() - started
+
+class WarmPagePool:
+    """
+    Pages already navigated to the most common start sites, so a session can start
+    on a loaded page. Each warm page has its own context, created from the site's
+    default browser profile.
+    """
+    
+    def __init__(self, browser, sites=None, size=WARM_POOL_SIZE):
+        self.browser = browser
+        self.sites = sites if sites is not None else prewarm_sites()
+        self.size = size
+        self.pages = {}
+        self.stats = PrewarmStats()
+    
+    def warm(self, site):
+        profile = site.get("browser_profile")
+        storage_state, version = clone_profile(profile) if profile else (None, 0)
+        context = self.browser.new_context(viewport={"width": 1024, "height": 768}, storage_state=storage_state)
+        page = context.new_page()
+        prepare_site_page(page, site)
+        navigation = navigate_to_site(page, site)
+        self.stats.counts["warmed"] += 1
+        return {"page": page, "profile": profile, "profile_version": version,
+                "navigation": navigation, "warmed_at": time.monotonic()}
+    
+    def drop_outdated(self, entries):
+        """
+        Close warm pages cloned from an older profile version. A session started on one
+        could never commit its profile, since commit_profile skips outdated base versions.
+        """
+        versions = {}
+        for entry in list(entries):
+            profile = entry["profile"]
+            if not profile:
+                continue
+            if profile not in versions:
+                versions[profile] = profile_version(profile)
+            if entry["profile_version"] != versions[profile]:
+                entries.remove(entry)
+                entry["page"].context.close()
+                self.stats.counts["outdated"] += 1
+    
+    def fill(self):
+        """Top up every prewarmed site to the pool size, replacing pages with an outdated profile."""
+        for site in self.sites:
+            entries = self.pages.setdefault(site["name"], [])
+            self.drop_outdated(entries)
+            while len(entries) < self.size:
+                try:
+                    entries.append(self.warm(site))
+                except Exception as e:
+                    logging.error(f"페이지 사전 로딩 실패 ({site['name']}): {e}")
+                    break
+    
+    def acquire(self, site, profile):
+        """
+        Take a warm page for a site if one was warmed with the same browser profile.
+        
+        Returns:
+            The pool entry, or None on a miss
+        """
+        entries = self.pages.get(site["name"], [])
+        self.drop_outdated(entries)
+        entry = next((e for e in entries if e["profile"] == profile), None)
+        if entry is None:
+            self.stats.miss()
+            return None
+        entries.remove(entry)
+        stale = time.monotonic() - entry["warmed_at"] > WARM_PAGE_MAX_AGE
+        if stale:
+            entry["page"].reload()
+        self.stats.hit(entry["navigation"], stale=stale)
+        return entry
+    
+    def close(self):
+        for entries in self.pages.values():
+            for entry in entries:
+                entry["page"].context.close()
+        self.pages.clear()
+
+class BrowserHost:
+    """
+    A browser kept open across sessions (interactive runs and worker processes),
+    with a warm page pool that is refilled after each session.
+    """
+    
+    def __init__(self, headless=CUA_HEADLESS):
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(headless=headless)
+        self.pool = WarmPagePool(self.browser) if WARM_POOL_SIZE > 0 else None
+        if self.pool:
+            self.pool.fill()
+    
+    def run(self, user_task, **kwargs):
+        session = run_browsing_session(self.browser, user_task, pool=self.pool, **kwargs)
+        if self.pool:
+            print(f"Warm pages: {self.pool.stats.summary()}")
+            self.pool.fill()
+        return session
+    
+    def close(self):
+        # Stop the Playwright driver even if the browser is already gone
+        try:
+            if self.pool:
+                self.pool.close()
+            self.browser.close()
+        finally:
+            self.playwright.stop()
+
+def run_browsing_session(browser, user_task, profile=None, tags=None, session_id=None, pool=None):
+    """
+    Run one task in its own browser context on an open browser.
     
     Args:
+        browser: Playwright browser
         user_task: Description of the task to perform
+        profile: Browser profile (defaults to the matched site's profile)
+        tags: Task tags for the safety check policy
+        session_id: Session ID to use (a new one is generated if omitted)
+        pool: WarmPagePool to take a loaded start page from
+    
+    Returns:
+        The session dict (status, step, usage, ...)
     """
     print(f"\nStarting Computer-Using Agent with task: {user_task}")
+    site, matched = match_site(user_task)
+    profile = profile or site.get("browser_profile")
+    session = {"session_id": session_id or new_session_id(), "task": user_task, "step": 0,
+               "profile": profile, "tags": tags or [], "site": site["name"]}
+    print(f"Session ID: {session['session_id']} (resume with: python cua_browser.py --resume {session['session_id']})")
+    logging.debug(f"사이트 프로필: {site['name']}" + (" (작업에서 감지)" if matched else " (기본)"))
     
-    # Browser setup
-    with sync_playwright() as playwright:
-        browser = playwright.chromium.launch(headless=False)  # Set to True for headless mode
-        page = browser.new_page(viewport={"width": 1024, "height": 768})
-        
-        # 환경변수에서 시작 URL 설정
-        start_url = os.getenv("DEFAULT_START_URL", "https://www.google.com")
-        logging.debug(f"시작 URL: {start_url}")
-        
-        # 한국어 작업이 많다면 네이버로 시작할지 확인
-        if "네이버" in user_task.lower() or "naver" in user_task.lower():
-            start_url = "https://www.naver.com"
-            logging.debug(f"네이버 관련 태스크 감지, 시작 URL 변경: {start_url}")
-        
-        # URL로 이동
-        try:
-            logging.debug(f"페이지 이동 시도: {start_url}")
-            page.goto(start_url)
-            logging.debug(f"현재 URL: {page.url}")
-        except Exception as e:
-            logging.error(f"페이지 이동 실패: {e}")
-            # 실패 시 구글로 대체
-            page.goto("https://www.google.com")
-        
+    # 사전 로딩된 페이지가 있으면 이동 없이 바로 시작
+    entry = pool.acquire(site, profile) if pool else None
+    if entry:
+        page = entry["page"]
+        session["profile_version"] = entry["profile_version"]
+        session["prewarmed"] = True
+        print(f"Starting on a pre-warmed {site['name']} page")
+    else:
+        # 프로필의 쿠키/로컬 스토리지 복사본으로 시작 (원본은 세션이 끝날 때만 갱신)
+        storage_state, session["profile_version"] = clone_profile(profile) if profile else (None, 0)
+        context = browser.new_context(viewport={"width": 1024, "height": 768}, storage_state=storage_state)
+        page = context.new_page()
+        prepare_site_page(page, site)
+        navigate_to_site(page, site)
+        session["prewarmed"] = False
+    if profile:
+        print(f"Using profile '{profile}'")
+    
+    try:
         # Take initial screenshot
         screenshot_base64 = get_screenshot(page)
+        session["usage"] = {"image_bytes": len(screenshot_base64)}
+        trace_event(session, "start", screenshot=base64.b64decode(screenshot_base64), task=user_task,
+                    url=page.url, profile=profile, tags=session["tags"], site=site["name"],
+                    prewarmed=session["prewarmed"])
         
         # Initialize the CUA with the first request
-        try:
-            print("Initializing Computer-Using Agent...")
-            response = client.responses.create(
-                model="computer-use-preview",
-                instructions=f"You are a helpful web browsing assistant. {user_task}",
-                tools=[{
-                    "type": "computer_use_preview",
-                    "display_width": 1024,
-                    "display_height": 768,
-                    "environment": "browser"
-                }],
-                input=[
+        print("Initializing Computer-Using Agent...")
+        # 작업 내용은 고정 접두부 뒤의 첫 사용자 메시지로만 전달
+        response = create_response([
+            {
+                "type": "message",
+                "role": "user",
+                "content": [
                     {
-                        "type": "message",
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "input_text",
-                                "text": user_task
-                            },
-                            {
-                                "type": "input_image",
-                                "image_url": f"data:image/png;base64,{screenshot_base64}"
-                            }
-                        ]
+                        "type": "input_text",
+                        "text": user_task
+                    },
+                    {
+                        "type": "input_image",
+                        "image_url": f"data:image/png;base64,{screenshot_base64}"
                     }
-                ],
-                truncation="auto"
-            )
-            
-            # Start the computer use loop
-            computer_use_loop(page, response)
-            
-        except Exception as e:
-            print(f"Error during browsing session: {e}")
-            import traceback
-            traceback.print_exc()
+                ]
+            }
+        ])
+        
+        # Start the computer use loop
+        computer_use_loop(page, response, session)
+        save_session_profile(page, session)
         
-        # Close the browser
+    except Exception as e:
+        print(f"Error during browsing session: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    page.context.close()
+    print("Session completed.\n")
+    return session
+
+def start_browsing_session(user_task, profile=None, tags=None, session_id=None, headless=CUA_HEADLESS, host=None):
+    """
+    Start a browser session with the computer use agent.
+    
+    Args:
+        user_task: Description of the task to perform
+        profile: Name of the browser profile to start from (defaults to the matched site's profile)
+        tags: Task tags used by the safety check policy (#hashtags in the task are added)
+        session_id: Session ID to use (a new one is generated if omitted)
+        headless: Run the browser without a window
+        host: BrowserHost to run on (reuses its browser and warm pages); a browser is
+            launched for this session only if omitted
+    
+    Returns:
+        The session dict (status, step, usage, ...)
+    """
+    if host is not None:
+        return host.run(user_task, profile=profile, tags=tags, session_id=session_id)
+    
+    # Browser setup
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=headless)
+        session = run_browsing_session(browser, user_task, profile=profile, tags=tags, session_id=session_id)
         browser.close()
-        print("Session completed.\n")
+    return session
 
-def main():
+def resume_browsing_session(session_id, approve=False, headless=CUA_HEADLESS, host=None):
+    """
+    Resume a session from its last checkpoint.
+    
+    Rebuilds the browser context from the saved storage_state, reopens the saved URL and
+    sends the current screen as the output of the pending computer call, continuing the
+    same response chain without repeating earlier model calls.
+    
+    A session parked for safety approval is only resumed with approve=True; the held-back
+    action is then executed and its safety checks are acknowledged.
+    
+    Args:
+        session_id: ID of the session to resume
+        approve: Approve the pending safety checks of a parked session
+        headless: Run the browser without a window
+        host: BrowserHost whose browser the session is resumed on; a browser is launched
+            for this session only if omitted
+    
+    Returns:
+        The session dict, or None if the session could not be resumed
+    """
+    session = load_checkpoint(session_id)
+    if session is None:
+        print(f"No checkpoint found for session {session_id}.")
+        return
+    if session.get("status") == PENDING_APPROVAL:
+        if not approve:
+            print(f"Session {session_id} is waiting for safety approval (use --approve or --reject).")
+            return
+    elif approve:
+        print(f"Session {session_id} is not waiting for approval (status: {session.get('status')}).")
+        return
+    elif session.get("status") != "running" or not session.get("pending_call_id"):
+        print(f"Session {session_id} cannot be resumed (status: {session.get('status')}).")
+        return
+    
+    print(f"\nResuming session {session_id} at step {session['step']}: {session['task']}")
+    if host is not None:
+        # A second sync_playwright() cannot start while the host's instance is running
+        return resume_session_on_browser(host.browser, session, approve)
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=headless)
+        resume_session_on_browser(browser, session, approve)
+        browser.close()
+    return session
+
+def resume_session_on_browser(browser, session, approve=False):
+    """
+    Resume a checkpointed session in a new context of an open browser. The context is
+    closed afterwards; the browser is left open.
+    
+    Returns:
+        The session dict
+    """
+    page = browser.new_page(viewport={"width": 1024, "height": 768}, storage_state=session.get("storage_state"))
+    try:
+        logging.debug(f"체크포인트 URL로 이동: {session['url']}")
+        page.goto(session["url"])
+        trace_event(session, "resume", url=page.url, approve=approve)
+        if approve:
+            record_decision(session, session.pop("pending_decisions", []), "approved")
+            session["status"] = "running"
+            if not handle_model_action(page, SimpleNamespace(**session.pop("pending_action"))):
+                print("Failed to execute the approved action.")
+                session["status"] = "failed"
+                session.pop("storage_state", None)
+                save_checkpoint(session)
+                return session
+            session["step"] += 1
+        response = send_computer_call_output(
+            page,
+            session["previous_response_id"],
+            session["pending_call_id"],
+            session.get("acknowledged_safety_checks", []),
+        )
+        computer_use_loop(page, response, session)
+        save_session_profile(page, session)
+    except Exception as e:
+        print(f"Error while resuming session: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        page.context.close()
+    
+    print("Session completed.\n")
+    return session
+
+def reject_session(session_id):
+    """
+    Reject the pending safety checks of a parked session and close it.
+    """
+    session = load_checkpoint(session_id)
+    if session is None or session.get("status") != PENDING_APPROVAL:
+        print(f"Session {session_id} is not waiting for approval.")
+        return
+    record_decision(session, session.pop("pending_decisions", []), "rejected")
+    session["status"] = "cancelled"
+    session["stop_reason"] = "safety checks rejected"
+    for key in ("storage_state", "pending_action"):
+        session.pop(key, None)
+    save_checkpoint(session)
+    print(f"Session {session_id} rejected.")
+
+def print_pending_approvals():
+    """
+    Print sessions parked for safety approval with their pending checks.
+    """
+    pending = [c for c in list_checkpoints() if c.get("status") == PENDING_APPROVAL]
+    if not pending:
+        print("No sessions waiting for approval.")
+        return
+    for checkpoint in pending:
+        print(f"{checkpoint['session_id']}  step {checkpoint['step']}  {checkpoint['url']}  {checkpoint['task']}")
+        for decision in checkpoint.get("pending_decisions", []):
+            print(f"  - {decision['code']}: {decision['message']}")
+
+def print_safety_report():
+    """
+    Summarise the safety-check audit log by outcome and by check code/domain.
+    """
+    summary = audit_summary(load_audit_log())
+    if not summary["by_outcome"]:
+        print("No safety checks recorded.")
+        return
+    print("Outcomes: " + ", ".join(f"{k}: {v}" for k, v in sorted(summary["by_outcome"].items())))
+    for check, outcomes in sorted(summary["by_check"].items()):
+        print(f"  {check:<50} " + ", ".join(f"{k}: {v}" for k, v in sorted(outcomes.items())))
+
+def print_checkpoints():
+    """
+    Print saved sessions with their status and step counter.
+    """
+    checkpoints = list_checkpoints()
+    if not checkpoints:
+        print("No saved sessions.")
+        return
+    status_counts = {}
+    for checkpoint in checkpoints:
+        updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(checkpoint.get("updated_at", 0)))
+        status = checkpoint.get("status", "?")
+        status_counts[status] = status_counts.get(status, 0) + 1
+        stop_reason = f"  [{checkpoint['stop_reason']}]" if checkpoint.get("stop_reason") else ""
+        print(f"{checkpoint['session_id']}  {status:<15}  step {checkpoint.get('step', 0):<4}  "
+              f"tokens {checkpoint.get('usage', {}).get('total_tokens', 0):<8}  "
+              f"cached {cached_ratio(checkpoint.get('usage', {})):>4.0%}  "
+              f"{updated}  {checkpoint.get('task', '')}{stop_reason}")
+    print("\n" + ", ".join(f"{status}: {count}" for status, count in sorted(status_counts.items())))
+
+def print_profiles():
+    """
+    Print saved browser profiles.
+    """
+    profiles = list_profiles()
+    if not profiles:
+        print("No saved profiles.")
+        return
+    for profile in profiles:
+        updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(profile["updated_at"]))
+        print(f"{profile['name']:<20} v{profile['version']:<4} {profile['refresh_policy']:<8} {updated}  "
+              f"cookies {profile['cookies']}, origins {profile['origins']}")
+
+def print_profile_report():
+    """
+    Compare model steps per task for completed sessions with and without a profile.
+    """
+    by_task = {}
+    for checkpoint in list_checkpoints():
+        if checkpoint.get("status") != "completed":
+            continue
+        key = "with_profile" if checkpoint.get("profile") else "without_profile"
+        by_task.setdefault(checkpoint.get("task", ""), {"with_profile": [], "without_profile": []})[key].append(checkpoint["step"])
+    
+    total_saved = 0.0
+    compared = 0
+    for task, steps in sorted(by_task.items()):
+        if not steps["with_profile"] or not steps["without_profile"]:
+            continue
+        with_profile = sum(steps["with_profile"]) / len(steps["with_profile"])
+        without_profile = sum(steps["without_profile"]) / len(steps["without_profile"])
+        total_saved += without_profile - with_profile
+        compared += 1
+        print(f"{task[:50]:<50}  without {without_profile:5.1f}  with {with_profile:5.1f}  "
+              f"saved {without_profile - with_profile:5.1f} steps")
+    if compared:
+        print(f"\nAverage steps saved per task: {total_saved / compared:.1f} ({compared} tasks)")
+    else:
+        print("No tasks have completed sessions both with and without a profile yet.")
+
+def main(profile=None, tags=None):
     """
     Main function to start the browsing session.
+    
+    Args:
+        profile: Browser profile to use for every task in this run
+        tags: Task tags for the safety check policy
     """
     print("=" * 50)
     print("OpenAI Computer-Using Agent (CUA) - Browser Automation")
@@ -315,6 +885,8 @@ def main():
     
     logging.debug("Starting Computer-Using Agent...")
     
+    # 작업 사이에 브라우저를 유지하고 자주 쓰는 시작 사이트를 미리 로딩
+    host = BrowserHost()
     try:
         while True:
             # Get user input for the task
@@ -331,7 +903,7 @@ def main():
                 continue
                 
             # Start the browsing session with the user's task
-            start_browsing_session(user_task)
+            start_browsing_session(user_task, profile=profile, tags=tags, host=host)
             
     except KeyboardInterrupt:
         print("\nProgram interrupted. Exiting gracefully.")
@@ -339,8 +911,51 @@ def main():
         print(f"\nAn unexpected error occurred: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        host.close()
     
     print("\nThank you for using the Computer-Using Agent!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="OpenAI Computer-Using Agent (CUA) - Browser Automation")
+    parser.add_argument("--resume", metavar="SESSION_ID", help="Resume a session from its last checkpoint")
+    parser.add_argument("--list-sessions", action="store_true", help="List saved session checkpoints")
+    parser.add_argument("--profile", default=os.getenv("DEFAULT_BROWSER_PROFILE"),
+                        help="Named browser profile (cookies/local storage) to start each task from")
+    parser.add_argument("--list-profiles", action="store_true", help="List saved browser profiles")
+    parser.add_argument("--set-refresh-policy", choices=REFRESH_POLICIES,
+                        help="Set when the --profile profile is written back after a session")
+    parser.add_argument("--profile-report", action="store_true",
+                        help="Compare model steps per task with and without a profile")
+    parser.add_argument("--tag", action="append", default=[], help="Task tag for the safety check policy (repeatable)")
+    parser.add_argument("--pending", action="store_true", help="List sessions waiting for safety approval")
+    parser.add_argument("--approve", metavar="SESSION_ID", help="Acknowledge a parked session's safety checks and resume it")
+    parser.add_argument("--reject", metavar="SESSION_ID", help="Reject a parked session's safety checks")
+    parser.add_argument("--safety-report", action="store_true", help="Summarise the safety check audit log")
+    args = parser.parse_args()
+    
+    if args.list_sessions:
+        print_checkpoints()
+    elif args.list_profiles:
+        print_profiles()
+    elif args.set_refresh_policy:
+        if not args.profile:
+            parser.error("--set-refresh-policy needs --profile")
+        if set_refresh_policy(args.profile, args.set_refresh_policy):
+            print(f"Profile '{args.profile}' refresh policy set to {args.set_refresh_policy}.")
+        else:
+            print(f"No saved profile named '{args.profile}'.")
+    elif args.profile_report:
+        print_profile_report()
+    elif args.pending:
+        print_pending_approvals()
+    elif args.approve:
+        resume_browsing_session(args.approve, approve=True)
+    elif args.reject:
+        reject_session(args.reject)
+    elif args.safety_report:
+        print_safety_report()
+    elif args.resume:
+        resume_browsing_session(args.resume)
+    else:
+        main(profile=args.profile, tags=args.tag) 
\ No newline at end of file
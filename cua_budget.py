@@ -0,0 +1,125 @@
+"""
+Per-task budgets and stuck-loop detection for Computer-Using Agent sessions.
+
+A session stops early once it exceeds its step, wall-time, uploaded image
+byte or token budget, or when the model keeps repeating the same action
+without effect or the screen stops changing. An identical action that
+changes the screen (scrolling down a long page, pressing an arrow key
+through a list) is progress, not a repeat. Usage counters live in the session dict
+(session["usage"]) so they are checkpointed and carried over on resume.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+# 0 disables a limit
+CUA_MAX_STEPS = int(os.getenv("CUA_MAX_STEPS", "50"))
+CUA_MAX_SECONDS = float(os.getenv("CUA_MAX_SECONDS", "900"))
+CUA_MAX_IMAGE_BYTES = int(os.getenv("CUA_MAX_IMAGE_BYTES", str(64 * 1024 * 1024)))
+CUA_MAX_TOKENS = int(os.getenv("CUA_MAX_TOKENS", "1000000"))
+# Consecutive identical actions that leave the screen unchanged / unchanged screenshots
+# before the session counts as stuck
+CUA_MAX_REPEATED_ACTIONS = int(os.getenv("CUA_MAX_REPEATED_ACTIONS", "5"))
+CUA_MAX_UNCHANGED_FRAMES = int(os.getenv("CUA_MAX_UNCHANGED_FRAMES", "5"))
+
+# Terminal statuses set by the budget (besides completed / cancelled / failed / error)
+BUDGET_EXCEEDED = "budget_exceeded"
+STUCK = "stuck"
+
+
+def action_signature(action):
+    """Return a stable string for an action, used to spot the same action repeated."""
+    if hasattr(action, "model_dump"):
+        fields = action.model_dump(exclude_none=True)
+    else:
+        fields = dict(vars(action))
+    return json.dumps(fields, sort_keys=True, default=repr)
+
+
+def cached_ratio(usage):
+    """Share of a session's input tokens served from the prompt cache."""
+    return usage.get("cached_tokens", 0) / usage["input_tokens"] if usage.get("input_tokens") else 0.0
+
+
+class SessionBudget:
+    """Tracks a session's usage against its limits and detects stuck loops."""
+
+    def __init__(self, session, max_steps=CUA_MAX_STEPS, max_seconds=CUA_MAX_SECONDS,
+                 max_image_bytes=CUA_MAX_IMAGE_BYTES, max_tokens=CUA_MAX_TOKENS,
+                 max_repeated_actions=CUA_MAX_REPEATED_ACTIONS, max_unchanged_frames=CUA_MAX_UNCHANGED_FRAMES):
+        self.session = session
+        self.usage = session.setdefault("usage", {})
+        for key in ("elapsed", "image_bytes", "input_tokens", "cached_tokens", "output_tokens", "total_tokens"):
+            self.usage.setdefault(key, 0)
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_image_bytes = max_image_bytes
+        self.max_tokens = max_tokens
+        self.max_repeated_actions = max_repeated_actions
+        self.max_unchanged_frames = max_unchanged_frames
+        # Time already spent before a resume is kept in usage["elapsed"]
+        self.base_elapsed = self.usage["elapsed"]
+        self.started_at = time.monotonic()
+        self.last_action = None
+        self.pending_action = None
+        self.repeated_actions = 0
+        self.last_frame = None
+        self.unchanged_frames = 0
+
+    def charge_response(self, response):
+        """
+        Add a model response's token usage.
+
+        Returns:
+            (input tokens, input tokens read from the prompt cache) for this response
+        """
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return 0, 0
+        for key in ("input_tokens", "output_tokens", "total_tokens"):
+            self.usage[key] += getattr(usage, key, 0) or 0
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        self.usage["cached_tokens"] += cached
+        return getattr(usage, "input_tokens", 0) or 0, cached
+
+    def charge_image(self, image_base64):
+        """Add the size of a screenshot uploaded to the model."""
+        self.usage["image_bytes"] += len(image_base64)
+
+    def record_action(self, action):
+        """Note the action about to run; it is counted by record_frame once its effect is known."""
+        self.pending_action = action_signature(action)
+
+    def record_frame(self, screenshot_bytes):
+        """Record the screenshot taken after the step's action."""
+        digest = hashlib.sha1(screenshot_bytes).hexdigest()
+        unchanged = digest == self.last_frame
+        self.unchanged_frames = self.unchanged_frames + 1 if unchanged else 0
+        self.last_frame = digest
+        if self.pending_action is not None:
+            repeated = unchanged and self.pending_action == self.last_action
+            self.repeated_actions = self.repeated_actions + 1 if repeated else 1
+            self.last_action = self.pending_action
+            self.pending_action = None
+
+    def exceeded(self):
+        """
+        Return (status, reason) if the session should stop, otherwise None.
+        """
+        self.usage["elapsed"] = round(self.base_elapsed + time.monotonic() - self.started_at, 3)
+        if self.max_steps and self.session["step"] >= self.max_steps:
+            return BUDGET_EXCEEDED, f"max_steps ({self.max_steps})"
+        if self.max_seconds and self.usage["elapsed"] >= self.max_seconds:
+            return BUDGET_EXCEEDED, f"max_seconds ({self.max_seconds:g})"
+        if self.max_image_bytes and self.usage["image_bytes"] >= self.max_image_bytes:
+            return BUDGET_EXCEEDED, f"max_image_bytes ({self.max_image_bytes})"
+        if self.max_tokens and self.usage["total_tokens"] >= self.max_tokens:
+            return BUDGET_EXCEEDED, f"max_tokens ({self.max_tokens})"
+        if self.max_repeated_actions and self.repeated_actions >= self.max_repeated_actions:
+            return STUCK, f"same action repeated {self.repeated_actions} times without changing the screen"
+        if self.max_unchanged_frames and self.unchanged_frames >= self.max_unchanged_frames:
+            return STUCK, f"screen unchanged for {self.unchanged_frames} steps"
+        return None
@@ -0,0 +1,71 @@
+"""
+Checkpoint store for Computer-Using Agent sessions.
+
+Each session is saved as a JSON file holding the response chain position
+(previous response ID, pending call ID), the page URL, the Playwright
+storage_state and the step counter, so a crashed run can be resumed without
+repeating earlier model calls.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoints")
+# Write a checkpoint every N steps
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "1"))
+
+
+def new_session_id():
+    """Return a short, sortable session ID."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def checkpoint_path(session_id, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, f"{session_id}.json")
+
+
+def save_checkpoint(checkpoint, directory=CHECKPOINT_DIR):
+    """
+    Atomically write a checkpoint (write to a temp file, then rename).
+
+    Args:
+        checkpoint: Dict with at least a "session_id" key
+    """
+    os.makedirs(directory, exist_ok=True)
+    checkpoint["updated_at"] = time.time()
+    path = checkpoint_path(checkpoint["session_id"], directory)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error(f"체크포인트 저장 실패: {e}")
+
+
+def load_checkpoint(session_id, directory=CHECKPOINT_DIR):
+    """Load a checkpoint by session ID, or return None if it does not exist."""
+    path = checkpoint_path(session_id, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_checkpoints(directory=CHECKPOINT_DIR):
+    """Return all checkpoints, most recently updated first."""
+    if not os.path.isdir(directory):
+        return []
+    checkpoints = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                checkpoints.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logging.error(f"체크포인트 읽기 실패 ({name}): {e}")
+    return sorted(checkpoints, key=lambda c: c.get("updated_at", 0), reverse=True)
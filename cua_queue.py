@@ -0,0 +1,192 @@
+"""
+Durable local job queue for Computer-Using Agent workers.
+
+Jobs live in a SQLite file (WAL mode) shared by all worker processes. A
+worker leases a job for CUA_LEASE_SECONDS and keeps renewing the lease with
+heartbeats while it runs; a job whose lease expires (crashed or hung worker)
+goes back to the queue. Failed jobs are retried with exponential backoff up
+to their max_attempts, then marked dead.
+
+Job states: queued -> leased -> done | queued (retry) | dead
+"""
+
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+CUA_QUEUE_PATH = os.getenv("CUA_QUEUE_PATH", "cua_jobs.sqlite3")
+CUA_LEASE_SECONDS = float(os.getenv("CUA_LEASE_SECONDS", "60"))
+CUA_MAX_ATTEMPTS = int(os.getenv("CUA_MAX_ATTEMPTS", "3"))
+# Base delay before a failed job is retried (doubled per attempt)
+CUA_RETRY_BACKOFF = float(os.getenv("CUA_RETRY_BACKOFF", "10"))
+
+
+class JobQueue:
+    """SQLite-backed job queue with leases, heartbeats and retries."""
+
+    def __init__(self, path=CUA_QUEUE_PATH, lease_seconds=CUA_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task TEXT NOT NULL,
+                profile TEXT,
+                tags TEXT NOT NULL DEFAULT '[]',
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                session_id TEXT,
+                result TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+
+    @contextmanager
+    def connect(self):
+        """SQLite connection that commits and closes on exit."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, task, profile=None, tags=None, max_attempts=CUA_MAX_ATTEMPTS):
+        """Add a task and return its job ID."""
+        now = time.time()
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (task, profile, tags, max_attempts, available_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (task, profile, json.dumps(tags or []), max_attempts, now, now))
+            return cursor.lastrowid
+
+    def lease(self, worker_id):
+        """
+        Atomically take the oldest available job for a worker.
+
+        Expired leases are returned to the queue first, so jobs held by crashed
+        workers are picked up again.
+
+        Returns:
+            The job as a dict, or None if nothing is available
+        """
+        now = time.time()
+        with self.connect() as conn:
+            # Take the write lock up front so two workers cannot lease the same job
+            conn.execute("BEGIN IMMEDIATE")
+            # Leave the supervisor one lease period to notice a hung worker before its job moves on
+            self._requeue_expired(conn, now - self.lease_seconds)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                   lease_expires = ?, started_at = COALESCE(started_at, ?) WHERE id = ?""",
+                (worker_id, now + self.lease_seconds, now, row["id"]))
+            job = dict(row)
+            job["attempts"] += 1
+            job["tags"] = json.loads(job["tags"])
+            return job
+
+    def _requeue_expired(self, conn, expired_before):
+        now = time.time()
+        conn.execute(
+            """UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+               last_error = 'lease expired', lease_owner = NULL, lease_expires = NULL,
+               finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END
+               WHERE status = 'leased' AND lease_expires < ?""",
+            (now, expired_before))
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend a job's lease. Returns False if the worker no longer owns the job."""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def set_session(self, job_id, session_id):
+        """Remember the job's CUA session so a retry can resume its checkpoint."""
+        with self.connect() as conn:
+            conn.execute("UPDATE jobs SET session_id = ? WHERE id = ?", (session_id, job_id))
+
+    def complete(self, job_id, worker_id, result):
+        """Mark a leased job as done with its result dict."""
+        with self.connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL,
+                   finished_at = ? WHERE id = ? AND lease_owner = ?""",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Record a failed attempt. The job is retried after a backoff delay,
+        or marked dead once it has used all its attempts.
+        """
+        now = time.time()
+        with self.connect() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?",
+                               (job_id, worker_id)).fetchone()
+            if row is None:
+                return
+            if row["attempts"] >= row["max_attempts"]:
+                conn.execute(
+                    """UPDATE jobs SET status = 'dead', last_error = ?, lease_owner = NULL, lease_expires = NULL,
+                       finished_at = ? WHERE id = ?""", (error, now, job_id))
+            else:
+                delay = CUA_RETRY_BACKOFF * 2 ** (row["attempts"] - 1)
+                conn.execute(
+                    """UPDATE jobs SET status = 'queued', last_error = ?, lease_owner = NULL, lease_expires = NULL,
+                       available_at = ? WHERE id = ?""", (error, now + delay, job_id))
+
+    def release_worker(self, worker_id, error):
+        """Return every job leased by a worker (e.g. after it crashed) to the queue as a failed attempt."""
+        with self.connect() as conn:
+            job_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status = 'leased' AND lease_owner = ?", (worker_id,))]
+        for job_id in job_ids:
+            self.fail(job_id, worker_id, error)
+        return job_ids
+
+    def expired_leases(self):
+        """Return (job ID, worker ID) pairs whose lease has expired but not yet been requeued."""
+        with self.connect() as conn:
+            return [(row["id"], row["lease_owner"]) for row in conn.execute(
+                "SELECT id, lease_owner FROM jobs WHERE status = 'leased' AND lease_expires < ?", (time.time(),))]
+
+    def pending_count(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')").fetchone()[0]
+
+    def stats(self):
+        """Job counts by state, outcome counts and completed-job throughput."""
+        with self.connect() as conn:
+            by_status = {row["status"]: row["n"] for row in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+            outcomes = {}
+            for row in conn.execute("SELECT result FROM jobs WHERE status = 'done'"):
+                status = json.loads(row["result"]).get("status") or "unknown"
+                outcomes[status] = outcomes.get(status, 0) + 1
+            window = conn.execute(
+                "SELECT MIN(started_at), MAX(finished_at), COUNT(*) FROM jobs WHERE status = 'done'").fetchone()
+        throughput = None
+        if window[2] and window[1] > window[0]:
+            throughput = window[2] / ((window[1] - window[0]) / 60)
+        return {"by_status": by_status, "outcomes": outcomes, "jobs_per_minute": throughput}
+
+    def recent(self, limit=20):
+        """Return the most recent jobs."""
+        with self.connect() as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))]
@@ -0,0 +1,186 @@
+"""
+Safety-check acknowledgement policy for Computer-Using Agent sessions.
+
+When the model reports pending_safety_checks, the policy decides per check
+whether to acknowledge it, abort the session, park the session until a
+person approves it, or ask on the terminal. Rules are matched on the check
+code, the current domain and the task tags; the first matching rule wins.
+Every decision is appended to an audit log (JSONL).
+
+Example SAFETY_POLICY_PATH file:
+
+    {
+      "default": "park",
+      "rules": [
+        {"codes": ["malicious_instructions"], "action": "abort"},
+        {"codes": ["irrelevant_domain"], "domains": ["naver.com", "*.google.com"], "action": "acknowledge"},
+        {"codes": ["sensitive_domain"], "tags": ["banking"], "action": "park"}
+      ]
+    }
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+
+SAFETY_POLICY_PATH = os.getenv("SAFETY_POLICY_PATH", "safety_policy.json")
+SAFETY_AUDIT_LOG = os.getenv("SAFETY_AUDIT_LOG", "safety_audit.jsonl")
+# Decision when no rule matches: "prompt" keeps the interactive y/n question
+SAFETY_DEFAULT_ACTION = os.getenv("SAFETY_DEFAULT_ACTION", "prompt")
+
+ACKNOWLEDGE = "acknowledge"
+ABORT = "abort"
+PARK = "park"
+PROMPT = "prompt"
+# Most restrictive first; a call with several checks gets the strictest decision
+ACTIONS = (ABORT, PARK, PROMPT, ACKNOWLEDGE)
+
+# Session status while waiting in the approval queue
+PENDING_APPROVAL = "pending_approval"
+
+# Decision counts for this process, keyed by decision then check code
+safety_metrics = {}
+
+
+def task_tags(session):
+    """Return the session's tags: explicit session["tags"] plus #hashtags in the task text."""
+    tags = set(session.get("tags") or [])
+    tags.update(re.findall(r"#(\w+)", session.get("task", "")))
+    return sorted(tags)
+
+
+def url_domain(url):
+    return (urlparse(url or "").hostname or "").lower()
+
+
+def domain_matches(domain, pattern):
+    """Match a domain against "example.com" (including subdomains) or a glob such as "*.example.com"."""
+    pattern = pattern.lower()
+    if any(ch in pattern for ch in "*?["):
+        return fnmatch(domain, pattern)
+    return domain == pattern or domain.endswith("." + pattern)
+
+
+class SafetyPolicy:
+    """Ordered acknowledgement rules with a default action."""
+
+    def __init__(self, rules=None, default=SAFETY_DEFAULT_ACTION):
+        self.rules = rules or []
+        self.default = default
+        for rule in self.rules + [{"action": default}]:
+            if rule["action"] not in ACTIONS:
+                raise ValueError(f"Unknown safety policy action: {rule['action']}")
+
+    @classmethod
+    def load(cls, path=SAFETY_POLICY_PATH):
+        """Load the policy file, or fall back to the default action if it does not exist."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("rules", []), config.get("default", SAFETY_DEFAULT_ACTION))
+
+    def decide_check(self, code, domain, tags):
+        """Return (action, rule index or None) for a single check."""
+        for index, rule in enumerate(self.rules):
+            if "codes" in rule and not any(fnmatch(code, pattern) for pattern in rule["codes"]):
+                continue
+            if "domains" in rule and not any(domain_matches(domain, pattern) for pattern in rule["domains"]):
+                continue
+            if "tags" in rule and not set(rule["tags"]) & set(tags):
+                continue
+            return rule["action"], index
+        return self.default, None
+
+    def decide(self, checks, url, tags):
+        """
+        Decide what to do with all pending checks of one computer call.
+
+        Args:
+            checks: Pending safety checks (objects with id, code and message)
+            url: Current page URL
+            tags: Task tags
+
+        Returns:
+            The overall action and a list of per-check decision dicts
+        """
+        domain = url_domain(url)
+        decisions = []
+        for check in checks:
+            action, rule = self.decide_check(check.code, domain, tags)
+            decisions.append({
+                "id": check.id,
+                "code": check.code,
+                "message": check.message,
+                "domain": domain,
+                "action": action,
+                "rule": rule,
+            })
+        overall = min((d["action"] for d in decisions), key=ACTIONS.index, default=ACKNOWLEDGE)
+        if overall == PROMPT and not sys.stdin.isatty():
+            # Nobody can answer the prompt in an unattended run
+            overall = PARK
+        return overall, decisions
+
+
+def safety_metrics_summary():
+    """One line with this process's decision counts by outcome and check code, or "" if there were none."""
+    return ", ".join(
+        f"{outcome} {sum(counts.values())} (" + ", ".join(f"{code} {n}" for code, n in sorted(counts.items())) + ")"
+        for outcome, counts in sorted(safety_metrics.items()))
+
+
+def record_decision(session, decisions, outcome, path=SAFETY_AUDIT_LOG):
+    """
+    Append a decision to the audit log and count it in the metrics.
+
+    Args:
+        session: Session dict (session_id, task, step, ...)
+        decisions: Per-check decisions from SafetyPolicy.decide
+        outcome: What actually happened ("acknowledge", "abort", "park", "approved", "rejected", ...)
+    """
+    counts = safety_metrics.setdefault(outcome, {})
+    for decision in decisions:
+        counts[decision["code"]] = counts.get(decision["code"], 0) + 1
+    session_counts = session.setdefault("safety_decisions", {})
+    session_counts[outcome] = session_counts.get(outcome, 0) + len(decisions)
+    entry = {
+        "time": time.time(),
+        "session_id": session["session_id"],
+        "task": session.get("task", ""),
+        "tags": task_tags(session),
+        "step": session.get("step", 0),
+        "outcome": outcome,
+        "checks": decisions,
+    }
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logging.error(f"안전 점검 감사 로그 기록 실패: {e}")
+
+
+def load_audit_log(path=SAFETY_AUDIT_LOG):
+    """Read all audit log entries."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def audit_summary(entries):
+    """Count audited checks by outcome and by (code, domain)."""
+    by_outcome = {}
+    by_code = {}
+    for entry in entries:
+        for check in entry["checks"]:
+            by_outcome[entry["outcome"]] = by_outcome.get(entry["outcome"], 0) + 1
+            key = f"{check['code']} @ {check['domain'] or '-'}"
+            by_code.setdefault(key, {})
+            by_code[key][entry["outcome"]] = by_code[key].get(entry["outcome"], 0) + 1
+    return {"by_outcome": by_outcome, "by_check": by_code}
@@ -0,0 +1,261 @@
+"""
+Tab tracking and link prefetching for Computer-Using Agent sessions.
+
+The computer-use model only sees the tab the loop screenshots. TabTracker
+watches the browser context for new pages. When an action opens a popup or
+a target=_blank tab, the session follows it, and it falls back to the
+previous tab when the active one closes.
+
+On a search results page (a site profile with a "prefetch_selector"), the top
+result links are opened in background tabs at once. When the model then clicks
+one of them, the navigation in the current tab is cancelled and the session
+switches to the already-loaded tab. The results page stays open in the tab
+behind it. Sessions that use a browser profile do not prefetch, so logged-in
+state is never used to open pages the model did not choose.
+
+The number of open tabs is capped (CUA_MAX_TABS). Unused prefetched tabs are
+closed first, then the least recently used ones.
+"""
+
+import os
+import time
+import logging
+from urllib.parse import urldefrag
+
+from site_profiles import site_for_url
+
+# Maximum open tabs per session (active tab included)
+CUA_MAX_TABS = int(os.getenv("CUA_MAX_TABS", "6"))
+# Result links to open in background tabs per results page (0 disables prefetching)
+CUA_PREFETCH_LINKS = int(os.getenv("CUA_PREFETCH_LINKS", "3"))
+
+# Resolves result elements (the link itself or an element inside it) to absolute http(s) URLs
+RESULT_LINKS_SCRIPT = """
+(elements) => elements
+    .map(e => e.closest('a') || e.querySelector('a'))
+    .filter(a => a && a.href && a.href.startsWith('http'))
+    .map(a => a.href)
+"""
+
+# Starts a navigation without waiting for it (page.goto blocks until the response arrives)
+START_NAVIGATION_SCRIPT = "(url) => { window.location.href = url; }"
+
+# True when the tab cannot go back (Navigation API, with a history.length fallback)
+AT_FIRST_ENTRY_SCRIPT = "() => window.navigation ? !navigation.canGoBack : history.length <= 1"
+
+
+def normalize_url(url):
+    """URL without its fragment, used to match a navigation with a prefetched tab."""
+    return urldefrag(url)[0].rstrip("/")
+
+
+class TabTracker:
+    """Follows the session's active tab and manages prefetched result tabs."""
+
+    def __init__(self, page, max_tabs=CUA_MAX_TABS, prefetch_links=CUA_PREFETCH_LINKS):
+        self.context = page.context
+        self.active = page
+        self.max_tabs = max_tabs
+        self.prefetch_links = prefetch_links
+        self.pages = []
+        # Page -> last time it was active (least recently used tabs are closed first)
+        self.last_used = {}
+        # Normalized URL -> background tab opened for it, not yet used
+        self.prefetched = {}
+        self.opened = []
+        self.prefetched_from = None
+        self.opening_prefetch = False
+        # Results page whose navigations are checked against the prefetched tabs
+        self.results_page = None
+        # Prefetched tab in use -> (results page it replaced, results URL) (target of a "back" action)
+        self.return_to = {}
+        self.stats = {"followed": 0, "prefetched": 0, "prefetch_hits": 0, "closed_for_limit": 0}
+        for existing in self.context.pages:
+            self.track(existing)
+        self.context.on("page", self.on_page)
+
+    def track(self, page):
+        if page in self.pages:
+            return
+        self.pages.append(page)
+        self.last_used[page] = time.monotonic()
+        page.on("close", self.on_close)
+
+    def on_page(self, page):
+        """A page was created in the context: a popup, a target=_blank tab or one of our prefetch tabs."""
+        self.track(page)
+        if not self.opening_prefetch:
+            self.opened.append(page)
+
+    def on_close(self, page):
+        if page in self.pages:
+            self.pages.remove(page)
+        self.last_used.pop(page, None)
+        self.return_to.pop(page, None)
+        for url, prefetched in list(self.prefetched.items()):
+            if prefetched is page:
+                del self.prefetched[url]
+        if page is self.active and self.pages:
+            try:
+                opener = page.opener()
+            except Exception:
+                opener = None
+            self.activate(opener if opener in self.pages else max(self.pages, key=self.last_used.get))
+
+    def on_route(self, route):
+        """Swap a click on a prefetched link for the tab that already loaded it."""
+        request = route.request
+        page = self.results_page
+        if (page is self.active and request.is_navigation_request() and request.method == "GET"
+                and request.frame == page.main_frame):
+            prefetched = self.prefetched.pop(normalize_url(request.url), None)
+            if prefetched is not None and not prefetched.is_closed():
+                logging.debug(f"미리 로딩된 탭으로 전환: {request.url}")
+                # A 204 response cancels the navigation and leaves the results page in place
+                # (route.abort() would replace it with an error page)
+                route.fulfill(status=204)
+                self.stats["prefetch_hits"] += 1
+                self.return_to[prefetched] = (page, page.url)
+                self.activate(prefetched)
+                return
+        route.fallback()
+
+    def activate(self, page):
+        self.active = page
+        self.last_used[page] = time.monotonic()
+        try:
+            page.bring_to_front()
+        except Exception as e:
+            logging.debug(f"탭 전환 실패: {e}")
+
+    def go_back(self, action):
+        """
+        Handle a "back" keypress on a tab opened from the prefetch pool: the tab has no
+        history, so the results page it came from is shown instead.
+
+        Returns:
+            True if the action was handled here
+        """
+        keys = {key.upper() for key in getattr(action, "keys", None) or []} if action.type == "keypress" else set()
+        if not (keys in ({"ALT", "LEFT"}, {"ALT", "ARROWLEFT"}) or "BROWSERBACK" in keys):
+            return False
+        results_page, results_url = self.return_to.get(self.active, (None, None))
+        if results_page is None or results_page.is_closed() or not self.active.evaluate(AT_FIRST_ENTRY_SCRIPT):
+            return False
+        print("Action: back to the results tab")
+        self.activate(results_page)
+        # If the cancelled click still left an entry (an error page) on the results tab, step back over it
+        if normalize_url(results_page.url) != normalize_url(results_url):
+            try:
+                results_page.go_back(wait_until="commit", timeout=10000)
+            except Exception as e:
+                logging.debug(f"결과 페이지로 뒤로 가기 실패: {e}")
+        return True
+
+    def follow(self):
+        """
+        Switch to the newest tab opened by the last action, if any.
+        Call after every action.
+
+        Returns:
+            The active page
+        """
+        prefetched = list(self.prefetched.values())
+        opened = [page for page in self.opened
+                  if not page.is_closed() and page is not self.active and page not in prefetched]
+        self.opened = []
+        if opened:
+            page = opened[-1]
+            print(f"Following new tab: {page.url}")
+            self.stats["followed"] += 1
+            self.activate(page)
+            try:
+                page.wait_for_load_state("domcontentloaded", timeout=10000)
+            except Exception:
+                logging.debug(f"새 탭 로딩 대기 시간 초과: {page.url}")
+        self.last_used[self.active] = time.monotonic()
+        return self.active
+
+    def result_links(self, page):
+        """Top result links on a search results page, or [] if the page has no prefetch selector."""
+        site = site_for_url(page.url)
+        selector = site.get("prefetch_selector") if site else None
+        if not selector:
+            return []
+        try:
+            urls = page.eval_on_selector_all(selector, RESULT_LINKS_SCRIPT)
+        except Exception as e:
+            logging.debug(f"결과 링크 수집 실패: {e}")
+            return []
+        links = []
+        for url in urls:
+            other_site = site_for_url(url)
+            # Skip the search engine's own links (pagination, filters, ...)
+            if normalize_url(url) not in [normalize_url(link) for link in links] and \
+                    (other_site is None or other_site["name"] != site["name"]):
+                links.append(url)
+        return links[:self.prefetch_links]
+
+    def prefetch(self):
+        """
+        Open the active results page's top links in background tabs. Runs once per results page.
+        The tabs start loading in parallel; their navigations are not waited for, so the
+        step is not held up by slow result pages.
+        """
+        if not self.prefetch_links or self.active.url == self.prefetched_from:
+            return 0
+        self.prefetched_from = self.active.url
+        links = self.result_links(self.active)
+        if not links:
+            return 0
+        # Links prefetched for an earlier results page are no longer candidates
+        self.close_prefetched()
+        self.results_page = self.active
+        # Registered after any site-blocking route, so this handler runs first and falls back to it
+        self.results_page.route("**/*", self.on_route)
+        opened = 0
+        for url in links:
+            if len(self.pages) >= self.max_tabs:
+                break
+            self.opening_prefetch = True
+            try:
+                page = self.context.new_page()
+            finally:
+                self.opening_prefetch = False
+            self.track(page)
+            self.prefetched[normalize_url(url)] = page
+            try:
+                page.evaluate(START_NAVIGATION_SCRIPT, url)
+            except Exception as e:
+                logging.debug(f"링크 미리 로딩 실패: {url} ({e})")
+            opened += 1
+        self.stats["prefetched"] += opened
+        # Prefetch tabs must not take focus from the active tab
+        self.activate(self.active)
+        return opened
+
+    def close_prefetched(self):
+        for page in list(self.prefetched.values()):
+            page.close()
+            self.on_close(page)
+        self.prefetched.clear()
+        if self.results_page is not None:
+            if not self.results_page.is_closed():
+                self.results_page.unroute("**/*", self.on_route)
+            self.results_page = None
+
+    def enforce_limit(self):
+        """Close unused prefetched tabs, then the least recently used ones, until under the tab limit."""
+        while len(self.pages) > self.max_tabs:
+            candidates = list(self.prefetched.values()) or \
+                sorted((page for page in self.pages if page is not self.active), key=self.last_used.get)
+            if not candidates:
+                break
+            candidates[0].close()
+            self.on_close(candidates[0])
+            self.stats["closed_for_limit"] += 1
+
+    def summary(self):
+        return (f"{len(self.pages)} tabs open, followed {self.stats['followed']} new tabs, "
+                f"prefetched {self.stats['prefetched']} links ({self.stats['prefetch_hits']} used), "
+                f"closed {self.stats['closed_for_limit']} for the tab limit")
@@ -0,0 +1,385 @@
+"""
+Trajectory trace store for Computer-Using Agent sessions.
+
+Each session gets an append-only JSONL event log (actions, URLs, timings and
+model outputs). Screenshots are not stored inline: every PNG is stored once
+under its SHA-256 in a blob store made of append-only segment files, and the
+log only keeps the hash. Identical frames (unchanged pages, resumed sessions)
+therefore cost nothing after the first time. Blobs are zlib-compressed when
+that makes them smaller and are read back through mmap.
+
+Layout under TRACE_DIR:
+    sessions/<session_id>.jsonl   event log
+    blobs/segment-000000.bin      blob segments
+    index.sqlite3                 blob offsets and session summaries
+
+Usage:
+    python cua_trace.py list
+    python cua_trace.py show <SESSION_ID>
+    python cua_trace.py export <SESSION_ID> --out export_dir
+    python cua_trace.py stats
+    python cua_trace.py gc [--retention-days 30] [--max-sessions 1000] [--grace-minutes 10] [--dry-run]
+"""
+
+import os
+import json
+import mmap
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+# Start a new blob segment once the current one reaches this size
+TRACE_SEGMENT_BYTES = int(os.getenv("TRACE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+# Retention used by gc: drop sessions older than N days / beyond the newest N sessions (0 = keep)
+TRACE_RETENTION_DAYS = float(os.getenv("TRACE_RETENTION_DAYS", "30"))
+TRACE_MAX_SESSIONS = int(os.getenv("TRACE_MAX_SESSIONS", "0"))
+# gc keeps blobs stored or re-used within the last N minutes (their events may not be logged yet)
+TRACE_GC_GRACE_MINUTES = float(os.getenv("TRACE_GC_GRACE_MINUTES", "10"))
+
+CODEC_RAW = "raw"
+CODEC_ZLIB = "zlib"
+
+
+class TraceStore:
+    """Append-only session logs plus a content-addressed screenshot store."""
+
+    def __init__(self, directory=TRACE_DIR, segment_bytes=TRACE_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sessions_dir = os.path.join(directory, "sessions")
+        self.blobs_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.index_path = os.path.join(directory, "index.sqlite3")
+        # Open read-only maps of segment files, keyed by segment number
+        self.maps = {}
+        self.lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                touched_at REAL NOT NULL DEFAULT 0)""")
+            # Trace stores created before touched_at existed
+            if "touched_at" not in [row[1] for row in conn.execute("PRAGMA table_info(blobs)")]:
+                conn.execute("ALTER TABLE blobs ADD COLUMN touched_at REAL NOT NULL DEFAULT 0")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                task TEXT,
+                status TEXT,
+                steps INTEGER NOT NULL DEFAULT 0,
+                screenshots INTEGER NOT NULL DEFAULT 0,
+                screenshot_bytes INTEGER NOT NULL DEFAULT 0,
+                started_at REAL NOT NULL,
+                updated_at REAL NOT NULL)""")
+
+    @contextmanager
+    def connect(self):
+        """SQLite connection that commits and closes on exit."""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # Blob store
+
+    def segment_path(self, segment):
+        return os.path.join(self.blobs_dir, f"segment-{segment:06d}.bin")
+
+    def _append_blob(self, conn, digest, data):
+        """Append a blob to the current segment. Caller holds the index write lock."""
+        payload = zlib.compress(data, 6)
+        codec = CODEC_ZLIB
+        if len(payload) >= len(data):
+            payload, codec = data, CODEC_RAW
+        segment = conn.execute("SELECT COALESCE(MAX(segment), 0) FROM blobs").fetchone()[0]
+        path = self.segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(payload) > self.segment_bytes:
+            segment += 1
+            path = self.segment_path(segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(payload)
+        conn.execute("INSERT INTO blobs (hash, segment, offset, length, size, codec, touched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (digest, segment, offset, len(payload), len(data), codec, time.time()))
+
+    def put_blob(self, data):
+        """
+        Store bytes once by content hash and return the hash.
+        A blob that is already stored is touched instead, so gc keeps it until the
+        event referencing it has been logged.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self.connect() as conn:
+            # Serialise with appends and gc across processes
+            conn.execute("BEGIN IMMEDIATE")
+            touched = conn.execute("UPDATE blobs SET touched_at = ? WHERE hash = ?", (time.time(), digest)).rowcount
+            if not touched:
+                self._append_blob(conn, digest, data)
+        return digest
+
+    def _segment_map(self, segment, end):
+        """Return a mmap of a segment that covers at least `end` bytes (remapping after growth)."""
+        with self.lock:
+            mapped = self.maps.get(segment)
+            if mapped is None or len(mapped) < end:
+                if mapped is not None:
+                    mapped.close()
+                with open(self.segment_path(segment), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.maps[segment] = mapped
+            return mapped
+
+    def get_blob(self, digest):
+        """Read a blob by hash, or return None if it is not stored."""
+        with self.connect() as conn:
+            row = conn.execute("SELECT segment, offset, length, codec FROM blobs WHERE hash = ?",
+                               (digest,)).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, codec = row
+        payload = self._segment_map(segment, offset + length)[offset:offset + length]
+        return zlib.decompress(payload) if codec == CODEC_ZLIB else payload
+
+    def close(self):
+        with self.lock:
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+
+    # Session logs
+
+    def session_log_path(self, session_id):
+        return os.path.join(self.sessions_dir, f"{session_id}.jsonl")
+
+    def append_event(self, session, event_type, screenshot=None, **fields):
+        """
+        Append one event to a session's log and update its summary.
+
+        Args:
+            session: Session dict (session_id, task, step, status)
+            event_type: "start", "step" or "end"
+            screenshot: PNG bytes to store in the blob store (the event keeps its hash)
+            fields: Event data (action, url, timings, model output, ...)
+        """
+        now = time.time()
+        event = {"time": now, "type": event_type, "step": session.get("step", 0), **fields}
+        if screenshot is not None:
+            event["screenshot"] = self.put_blob(screenshot)
+        with open(self.session_log_path(session["session_id"]), "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False, default=repr) + "\n")
+        with self.connect() as conn:
+            conn.execute(
+                """INSERT INTO sessions (session_id, task, status, steps, screenshots, screenshot_bytes, started_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET status = excluded.status, steps = excluded.steps,
+                   screenshots = screenshots + excluded.screenshots,
+                   screenshot_bytes = screenshot_bytes + excluded.screenshot_bytes,
+                   updated_at = excluded.updated_at""",
+                (session["session_id"], session.get("task", ""), session.get("status", "running"),
+                 session.get("step", 0), 1 if screenshot is not None else 0,
+                 len(screenshot) if screenshot is not None else 0, now, now))
+
+    def read_events(self, session_id):
+        path = self.session_log_path(session_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def list_sessions(self):
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute("SELECT * FROM sessions ORDER BY updated_at DESC")]
+
+    def stats(self):
+        """Logical screenshot bytes vs bytes actually stored."""
+        with self.connect() as conn:
+            sessions, screenshots, logical = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(screenshots), 0), COALESCE(SUM(screenshot_bytes), 0) FROM sessions").fetchone()
+            blobs, raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM blobs").fetchone()
+        log_bytes = sum(os.path.getsize(os.path.join(self.sessions_dir, name)) for name in os.listdir(self.sessions_dir))
+        return {"sessions": sessions, "screenshots": screenshots, "unique_screenshots": blobs,
+                "screenshot_bytes": logical, "unique_bytes": raw, "stored_bytes": stored, "log_bytes": log_bytes}
+
+    # Retention and garbage collection
+
+    def expired_sessions(self, retention_days=TRACE_RETENTION_DAYS, max_sessions=TRACE_MAX_SESSIONS):
+        """Sessions outside the retention policy (older than retention_days or beyond the newest max_sessions)."""
+        sessions = self.list_sessions()
+        cutoff = time.time() - retention_days * 86400 if retention_days else None
+        expired = []
+        for rank, session in enumerate(sessions):
+            if (cutoff and session["updated_at"] < cutoff) or (max_sessions and rank >= max_sessions):
+                expired.append(session["session_id"])
+        return expired
+
+    def gc(self, retention_days=TRACE_RETENTION_DAYS, max_sessions=TRACE_MAX_SESSIONS,
+           grace_minutes=TRACE_GC_GRACE_MINUTES, dry_run=False):
+        """
+        Delete sessions outside the retention policy, then drop unreferenced blobs by
+        copying the live blobs of affected segments into a new segment. Blobs stored or
+        touched within the last grace_minutes are kept even when no log references them yet.
+
+        Returns:
+            Dict with removed sessions, removed blobs and reclaimed bytes
+        """
+        expired = self.expired_sessions(retention_days, max_sessions)
+        if not dry_run:
+            for session_id in expired:
+                path = self.session_log_path(session_id)
+                if os.path.exists(path):
+                    os.remove(path)
+            with self.connect() as conn:
+                conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(s,) for s in expired])
+
+        with self.connect() as conn:
+            # Block writers while the live set is built and segments are rewritten
+            if not dry_run:
+                conn.execute("BEGIN IMMEDIATE")
+            live = set()
+            for name in os.listdir(self.sessions_dir):
+                session_id = name[:-len(".jsonl")]
+                if dry_run and session_id in expired:
+                    continue
+                for event in self.read_events(session_id) or []:
+                    if event.get("screenshot"):
+                        live.add(event["screenshot"])
+
+            cutoff = time.time() - grace_minutes * 60
+            rows = conn.execute("SELECT hash, segment, length, touched_at FROM blobs").fetchall()
+            dead = [(digest, segment, length) for digest, segment, length, touched_at in rows
+                    if digest not in live and touched_at < cutoff]
+            result = {"sessions": len(expired), "blobs": len(dead), "bytes": sum(length for _, _, length in dead)}
+            if dry_run or not dead:
+                return result
+
+            dirty = sorted({segment for _, segment, _ in dead})
+            current = max(segment for _, segment, _, _ in rows)
+            if current in dirty:
+                # Never append into a segment that is about to be deleted
+                current += 1
+            moved = conn.execute(
+                f"SELECT hash, segment, offset, length, size, codec FROM blobs WHERE segment IN ({','.join('?' * len(dirty))})",
+                dirty).fetchall()
+            dead_hashes = {digest for digest, _, _ in dead}
+            conn.executemany("DELETE FROM blobs WHERE hash = ?", [(digest,) for digest in dead_hashes])
+            self.close()
+            with open(self.segment_path(current), "ab") as out:
+                for digest, segment, offset, length, size, codec in moved:
+                    # Recent blobs are moved too, even if no event references them yet
+                    if digest in dead_hashes:
+                        continue
+                    with open(self.segment_path(segment), "rb") as f:
+                        f.seek(offset)
+                        payload = f.read(length)
+                    new_offset = out.tell()
+                    out.write(payload)
+                    conn.execute("UPDATE blobs SET segment = ?, offset = ? WHERE hash = ?", (current, new_offset, digest))
+            for segment in dirty:
+                os.remove(self.segment_path(segment))
+            logging.debug(f"트레이스 GC: 세그먼트 {dirty} 정리, 블롭 {len(dead)}개 삭제")
+        return result
+
+    def export(self, session_id, out_dir):
+        """Write a session's events and its screenshots as PNG files into out_dir."""
+        events = self.read_events(session_id)
+        if events is None:
+            return None
+        os.makedirs(out_dir, exist_ok=True)
+        for index, event in enumerate(events):
+            if event.get("screenshot"):
+                name = f"{index:04d}-step{event['step']:03d}.png"
+                with open(os.path.join(out_dir, name), "wb") as f:
+                    f.write(self.get_blob(event["screenshot"]))
+                event["screenshot_file"] = name
+        with open(os.path.join(out_dir, "events.json"), "w", encoding="utf-8") as f:
+            json.dump(events, f, ensure_ascii=False, indent=2)
+        return len(events)
+
+
+def describe_event(event):
+    """One-line summary of an event for the CLI."""
+    parts = [time.strftime("%H:%M:%S", time.localtime(event["time"])), f"step {event['step']:<3}", f"{event['type']:<5}"]
+    if event.get("action"):
+        parts.append(json.dumps(event["action"], ensure_ascii=False))
+    if event.get("url"):
+        parts.append(event["url"])
+    if event.get("model_seconds") is not None:
+        parts.append(f"model {event['model_seconds']:.1f}s")
+    if event.get("input_tokens"):
+        parts.append(f"input {event['input_tokens']} ({event.get('cached_tokens', 0)} cached)")
+    if event.get("status"):
+        parts.append(f"status {event['status']}")
+    if event.get("text"):
+        parts.append(f"\"{event['text'][:80]}\"")
+    return "  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CUA trajectory trace store")
+    parser.add_argument("--dir", default=TRACE_DIR, help="Trace directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List traced sessions")
+    show = commands.add_parser("show", help="Print a session's events")
+    show.add_argument("session_id")
+    export = commands.add_parser("export", help="Export events and screenshots of a session")
+    export.add_argument("session_id")
+    export.add_argument("--out", help="Output directory (default: trace_<SESSION_ID>)")
+    commands.add_parser("stats", help="Show storage and deduplication statistics")
+    gc = commands.add_parser("gc", help="Apply retention and delete unreferenced screenshots")
+    gc.add_argument("--retention-days", type=float, default=TRACE_RETENTION_DAYS)
+    gc.add_argument("--max-sessions", type=int, default=TRACE_MAX_SESSIONS)
+    gc.add_argument("--grace-minutes", type=float, default=TRACE_GC_GRACE_MINUTES,
+                    help="Keep screenshots stored within the last N minutes")
+    gc.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    store = TraceStore(args.dir)
+    if args.command == "list":
+        sessions = store.list_sessions()
+        if not sessions:
+            print("No traced sessions.")
+        for session in sessions:
+            updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(session["updated_at"]))
+            print(f"{session['session_id']}  {session['status']:<15}  step {session['steps']:<4}  {updated}  {session['task']}")
+    elif args.command == "show":
+        events = store.read_events(args.session_id)
+        if events is None:
+            print(f"No trace for session {args.session_id}.")
+        for event in events or []:
+            print(describe_event(event))
+    elif args.command == "export":
+        out_dir = args.out or f"trace_{args.session_id}"
+        count = store.export(args.session_id, out_dir)
+        print(f"No trace for session {args.session_id}." if count is None else f"Exported {count} events to {out_dir}")
+    elif args.command == "stats":
+        stats = store.stats()
+        print(f"Sessions: {stats['sessions']}, screenshots: {stats['screenshots']} ({stats['unique_screenshots']} unique)")
+        print(f"Screenshot bytes: {stats['screenshot_bytes'] / 1024 / 1024:.1f} MB logical, "
+              f"{stats['unique_bytes'] / 1024 / 1024:.1f} MB unique, {stats['stored_bytes'] / 1024 / 1024:.1f} MB stored")
+        print(f"Event logs: {stats['log_bytes'] / 1024:.1f} KB")
+    else:
+        result = store.gc(args.retention_days, args.max_sessions, args.grace_minutes, args.dry_run)
+        prefix = "Would remove" if args.dry_run else "Removed"
+        print(f"{prefix} {result['sessions']} sessions and {result['blobs']} screenshots "
+              f"({result['bytes'] / 1024 / 1024:.1f} MB)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Multi-process supervisor for Computer-Using Agent workers.
+
+The supervisor spawns N worker processes, each with its own Playwright
+browsers, so screenshot encoding and browser work are not limited by one
+process. Workers lease tasks from the durable queue in cua_queue.py and renew
+the lease with heartbeats while a session runs. The supervisor restarts
+workers that crash or hang (lease expired while the process is alive), and on
+SIGINT/SIGTERM it drains: workers finish their current task and exit.
+
+A retried job resumes its session from the last checkpoint when possible.
+
+Usage:
+    python cua_worker.py enqueue "네이버에서 오늘 날씨 검색" --tag weather
+    python cua_worker.py enqueue --file tasks.txt --profile naver
+    python cua_worker.py run --workers 4
+    python cua_worker.py status
+"""
+
+import os
+import sys
+import time
+import uuid
+import signal
+import argparse
+import threading
+import multiprocessing
+
+from cua_queue import JobQueue, CUA_QUEUE_PATH, CUA_MAX_ATTEMPTS
+from cua_checkpoint import new_session_id, load_checkpoint
+from cua_budget import BUDGET_EXCEEDED, STUCK
+from cua_safety import PENDING_APPROVAL
+
+# Number of worker processes (default: one per core)
+CUA_WORKERS = int(os.getenv("CUA_WORKERS", "0")) or os.cpu_count() or 1
+# Stop renewing a job's lease after this many seconds so a hung worker gets restarted
+CUA_JOB_TIMEOUT = float(os.getenv("CUA_JOB_TIMEOUT", "1800"))
+# How long a graceful shutdown waits for running tasks before killing workers
+CUA_DRAIN_TIMEOUT = float(os.getenv("CUA_DRAIN_TIMEOUT", "300"))
+
+POLL_INTERVAL = 1.0
+RESTART_BACKOFF_MAX = 60
+# A worker that stayed up this long is considered healthy again (restart backoff resets)
+HEALTHY_UPTIME = 300
+
+# Session statuses that are the task's outcome; anything else (error, crash) is retried
+FINAL_STATUSES = ("completed", "cancelled", "failed", BUDGET_EXCEEDED, STUCK, PENDING_APPROVAL)
+
+
+class Heartbeat(threading.Thread):
+    """Renews a job's lease in the background while the worker runs the session."""
+
+    def __init__(self, queue, job_id, worker_id):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        started = time.monotonic()
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if time.monotonic() - started > CUA_JOB_TIMEOUT:
+                print(f"[{self.worker_id}] job {self.job_id} exceeded {CUA_JOB_TIMEOUT:g}s, letting its lease expire")
+                return
+            if not self.queue.heartbeat(self.job_id, self.worker_id):
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+
+def run_job(job, queue, headless, host=None):
+    """
+    Run one job's CUA session and return the session dict.
+    Resumes the job's checkpoint if an earlier attempt was interrupted mid-session.
+    Sessions run on the worker's BrowserHost (kept-open browser and warm pages) if given.
+    """
+    # Imported here so only worker processes create the OpenAI client and need the API key
+    import cua_browser
+
+    session_id = job["session_id"]
+    checkpoint = load_checkpoint(session_id) if session_id else None
+    if checkpoint and checkpoint.get("status") == "running" and checkpoint.get("pending_call_id"):
+        return cua_browser.resume_browsing_session(session_id, headless=headless, host=host)
+
+    if not session_id:
+        session_id = new_session_id()
+        queue.set_session(job["id"], session_id)
+    return cua_browser.start_browsing_session(
+        job["task"], profile=job["profile"], tags=job["tags"], session_id=session_id, headless=headless, host=host)
+
+
+def worker_main(worker_id, queue_path, headless):
+    """Worker process: lease jobs and run them until asked to stop."""
+    # Ctrl+C reaches the whole process group; only the supervisor decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    queue = JobQueue(queue_path)
+    host = None
+    while not stopping.is_set():
+        job = queue.lease(worker_id)
+        if job is None:
+            stopping.wait(POLL_INTERVAL)
+            continue
+
+        print(f"[{worker_id}] job {job['id']} (attempt {job['attempts']}/{job['max_attempts']}): {job['task']}")
+        heartbeat = Heartbeat(queue, job["id"], worker_id)
+        heartbeat.start()
+        try:
+            if host is None:
+                # Started on the first job so idle workers hold no browser
+                import cua_browser
+                host = cua_browser.BrowserHost(headless=headless)
+            session = run_job(job, queue, headless, host)
+            status = session.get("status") if session else None
+            if status in FINAL_STATUSES:
+                queue.complete(job["id"], worker_id, {
+                    "session_id": session["session_id"],
+                    "status": status,
+                    "stop_reason": session.get("stop_reason"),
+                    "step": session["step"],
+                    "usage": session.get("usage", {}),
+                })
+            else:
+                queue.fail(job["id"], worker_id, f"session ended with status {status}")
+        except Exception as e:
+            queue.fail(job["id"], worker_id, repr(e))
+            if host is not None and not host.browser.is_connected():
+                # The browser died; release what is left of it and start a fresh one for the next job
+                try:
+                    host.close()
+                except Exception as close_error:
+                    print(f"[{worker_id}] could not close the dead browser: {close_error!r}")
+                host = None
+        finally:
+            heartbeat.stop()
+    if host is not None:
+        host.close()
+
+
+class Supervisor:
+    """Keeps N worker processes running and drains them on shutdown."""
+
+    def __init__(self, workers=CUA_WORKERS, queue_path=CUA_QUEUE_PATH, headless=True, exit_when_idle=False):
+        self.workers = workers
+        self.queue_path = queue_path
+        self.queue = JobQueue(queue_path)
+        self.headless = headless
+        self.exit_when_idle = exit_when_idle
+        # spawn: each worker starts with a fresh interpreter (no forked Playwright/OpenAI state)
+        self.context = multiprocessing.get_context("spawn")
+        self.slots = []
+        self.draining = False
+        self.stats = {"started": 0, "crashed": 0, "hung": 0}
+
+    def start_worker(self, slot):
+        worker_id = f"w{slot['index']}-{uuid.uuid4().hex[:6]}"
+        process = self.context.Process(target=worker_main, args=(worker_id, self.queue_path, self.headless),
+                                       name=worker_id)
+        process.start()
+        slot.update({"worker_id": worker_id, "process": process, "started_at": time.monotonic(), "next_start": None})
+        self.stats["started"] += 1
+        print(f"Started worker {worker_id} (pid {process.pid})")
+
+    def request_drain(self, signum=None, frame=None):
+        if self.draining:
+            print("Forced shutdown.")
+            for slot in self.slots:
+                if slot["process"] and slot["process"].is_alive():
+                    slot["process"].kill()
+            sys.exit(1)
+        print("Draining: workers will finish their current task (press Ctrl+C again to force).")
+        self.draining = True
+
+    def check_workers(self):
+        """Restart crashed workers and terminate hung ones."""
+        hung_owners = {owner for _, owner in self.queue.expired_leases()}
+        now = time.monotonic()
+        for slot in self.slots:
+            process = slot["process"]
+            if process is not None and process.is_alive():
+                if slot["worker_id"] in hung_owners:
+                    print(f"Worker {slot['worker_id']} stopped renewing its lease, terminating")
+                    self.stats["hung"] += 1
+                    process.kill()
+                    process.join()
+                else:
+                    continue
+
+            if process is not None:
+                print(f"Worker {slot['worker_id']} exited with code {process.exitcode}")
+                self.stats["crashed"] += 1
+                self.queue.release_worker(slot["worker_id"], f"worker exited with code {process.exitcode}")
+                slot["restarts"] = 0 if now - slot["started_at"] > HEALTHY_UPTIME else slot["restarts"] + 1
+                slot["next_start"] = now + min(2 ** slot["restarts"] - 1, RESTART_BACKOFF_MAX)
+                slot["process"] = None
+            if slot["next_start"] is not None and now >= slot["next_start"]:
+                self.start_worker(slot)
+
+    def drain(self):
+        """Ask every worker to stop after its current task, then wait (killing stragglers after the timeout)."""
+        for slot in self.slots:
+            if slot["process"] is not None and slot["process"].is_alive():
+                slot["process"].terminate()
+        deadline = time.monotonic() + CUA_DRAIN_TIMEOUT
+        for slot in self.slots:
+            process = slot["process"]
+            if process is None:
+                continue
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"Worker {slot['worker_id']} did not finish in time, killing it")
+                process.kill()
+                process.join()
+            self.queue.release_worker(slot["worker_id"], "worker stopped during shutdown")
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.request_drain)
+        signal.signal(signal.SIGTERM, self.request_drain)
+        self.slots = [{"index": i, "process": None, "restarts": 0, "next_start": 0} for i in range(self.workers)]
+        started_at = time.monotonic()
+        print(f"Supervisor starting {self.workers} workers (queue: {self.queue_path})")
+
+        while not self.draining:
+            self.check_workers()
+            if self.exit_when_idle and self.queue.pending_count() == 0:
+                print("Queue is empty, shutting down.")
+                self.draining = True
+                break
+            time.sleep(POLL_INTERVAL)
+
+        self.drain()
+        elapsed = time.monotonic() - started_at
+        print(f"Supervisor stopped after {elapsed:.0f}s: {self.stats['started']} worker starts, "
+              f"{self.stats['crashed']} exits, {self.stats['hung']} hung")
+        print_status(self.queue)
+
+
+def print_status(queue):
+    stats = queue.stats()
+    print("Jobs: " + (", ".join(f"{k}: {v}" for k, v in sorted(stats["by_status"].items())) or "none"))
+    if stats["outcomes"]:
+        print("Outcomes: " + ", ".join(f"{k}: {v}" for k, v in sorted(stats["outcomes"].items())))
+    if stats["jobs_per_minute"]:
+        print(f"Throughput: {stats['jobs_per_minute']:.2f} jobs/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CUA worker supervisor and job queue")
+    parser.add_argument("--queue", default=CUA_QUEUE_PATH, help="SQLite queue file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add tasks to the queue")
+    enqueue.add_argument("task", nargs="?", help="Task description")
+    enqueue.add_argument("--file", help="Text file with one task per line")
+    enqueue.add_argument("--profile", help="Browser profile for the tasks")
+    enqueue.add_argument("--tag", action="append", default=[], help="Task tag for the safety check policy")
+    enqueue.add_argument("--max-attempts", type=int, default=CUA_MAX_ATTEMPTS)
+
+    run = commands.add_parser("run", help="Start the supervisor and workers")
+    run.add_argument("--workers", type=int, default=CUA_WORKERS)
+    run.add_argument("--headed", action="store_true", help="Show browser windows")
+    run.add_argument("--exit-when-idle", action="store_true", help="Stop once the queue is empty")
+
+    status = commands.add_parser("status", help="Show queue status and recent jobs")
+    status.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue)
+    if args.command == "enqueue":
+        tasks = [args.task] if args.task else []
+        if args.file:
+            with open(args.file, encoding="utf-8") as f:
+                tasks.extend(line.strip() for line in f if line.strip())
+        if not tasks:
+            parser.error("enqueue needs a task or --file")
+        for task in tasks:
+            job_id = queue.enqueue(task, profile=args.profile, tags=args.tag, max_attempts=args.max_attempts)
+            print(f"Queued job {job_id}: {task}")
+    elif args.command == "run":
+        Supervisor(args.workers, args.queue, headless=not args.headed, exit_when_idle=args.exit_when_idle).run()
+    else:
+        print_status(queue)
+        for job in queue.recent(args.limit):
+            print(f"{job['id']:>5}  {job['status']:<7} attempt {job['attempts']}/{job['max_attempts']}  "
+                  f"{job['session_id'] or '-':<22} {job['task']}"
+                  + (f"  [{job['last_error']}]" if job["status"] != "done" and job["last_error"] else ""))
+
+
+if __name__ == "__main__":
+    main()
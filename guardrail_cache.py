@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미의 content_guardrail을 위한 로컬 사전 필터와 판정 캐시
+명확한 질문은 규칙으로 바로 판정하고, 나머지는 모델 판정 결과를 정규화된 질문 기준으로 캐시합니다.
+캐시 적중률과 절약된 가드레일 지연 시간은 메트릭으로 기록합니다.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# 캐시 설정
+GUARDRAIL_CACHE_SIZE = int(os.getenv("GUARDRAIL_CACHE_SIZE", "1024"))
+GUARDRAIL_CACHE_TTL = float(os.getenv("GUARDRAIL_CACHE_TTL", "3600"))
+# 로컬 사전 필터 사용 여부 (모델 판정만 비교할 때 끔)
+PREFILTER_ENABLED = os.getenv("GUARDRAIL_PREFILTER", "true").lower() == "true"
+# 메트릭을 JSON 파일로 내보낼 경로 (설정하지 않으면 내보내지 않음)
+GUARDRAIL_METRICS_PATH = os.getenv("GUARDRAIL_METRICS_PATH", "")
+
+# 모델 판정 없이 바로 차단하는 규칙
+BLOCK_PATTERNS = [
+    re.compile(r"해킹\s*(방법|하는\s*법|툴|도구)"),
+    re.compile(r"(폭탄|폭발물|총기|마약|필로폰)\s*(을|를)?\s*(만드는|제조|구하는|구입|구매)"),
+    re.compile(r"(비밀번호|계정)\s*(을|를)?\s*(훔치|탈취)"),
+    re.compile(r"(랜섬웨어|악성\s*코드|바이러스)\s*(을|를)?\s*(만드는|제작|배포)"),
+    re.compile(r"\b(how to (hack|make a bomb|build a bomb|steal passwords?))\b"),
+]
+
+# 항상 허용하는 질문 (예제 질문 등). 규칙으로 허용하는 것은 이 목록과 (띄어쓰기, 문장 부호만 다른)
+# 같은 질문뿐이고, 그 밖의 질문은 차단 규칙에 해당하지 않으면 모두 모델이 판정합니다.
+# 주제어만 보고 허용하면 "파이썬으로 DDoS 공격하는 방법"처럼 해로운 질문도 통과하기 때문입니다.
+SAFE_QUESTIONS = {
+    "python에서 리스트와 딕셔너리의 차이점은 무엇인가요",
+    "영어에서 현재완료와 과거시제의 차이를 설명해주세요",
+    "한국 임진왜란의 주요 원인과 영향은 무엇인가요",
+    "오늘 서울 날씨는 어떤가요",
+    "최근 인공지능 기술 동향을 알려주세요",
+}
+
+
+def question_key(question):
+    """허용 목록 비교용 키: 띄어쓰기와 문장 부호를 뺀 정규화된 질문"""
+    return re.sub(r"[\W_]+", "", question)
+
+
+SAFE_QUESTION_KEYS = {question_key(question) for question in SAFE_QUESTIONS}
+
+
+def normalize_question(text):
+    """
+    캐시 키로 사용할 수 있도록 질문을 정규화합니다.
+
+    Args:
+        text: 사용자 질문
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.。？！")
+
+
+def input_text(input_data):
+    """
+    가드레일 입력에서 마지막 사용자 메시지 텍스트를 꺼냅니다. 찾을 수 없으면 None을 반환합니다.
+
+    Args:
+        input_data: 문자열 또는 입력 항목 목록 (스트리밍 실행은 목록으로 전달됨)
+    """
+    if isinstance(input_data, str):
+        return input_data
+    for item in reversed(input_data or []):
+        if not isinstance(item, dict) or item.get("role") != "user":
+            continue
+        content = item.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            texts = [part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "input_text"]
+            return " ".join(texts) if texts else None
+        return None
+    return None
+
+
+def prefilter_question(question):
+    """
+    규칙으로 판정할 수 있는 질문이면 (적절 여부, 이유)를, 아니면 None을 반환합니다.
+    허용은 허용 목록의 질문에만 적용하고, 확실하지 않은 질문은 None으로 모델 판정에 맡깁니다.
+
+    Args:
+        question: 정규화된 질문
+    """
+    for pattern in BLOCK_PATTERNS:
+        if pattern.search(question):
+            return False, f"로컬 차단 규칙에 해당합니다: {pattern.pattern}"
+
+    if question_key(question) in SAFE_QUESTION_KEYS:
+        return True, "허용 목록에 있는 질문입니다."
+    return None
+
+
+class VerdictCache:
+    """크기 제한(LRU)과 TTL이 있는 가드레일 판정 캐시"""
+
+    def __init__(self, max_size=GUARDRAIL_CACHE_SIZE, ttl=GUARDRAIL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, verdict = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return verdict
+
+    def put(self, key, verdict):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), verdict)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class GuardrailMetrics:
+    """사전 필터/캐시 적중 수와 절약된 지연 시간을 집계합니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "prefilter_allowed": 0, "prefilter_blocked": 0,
+                       "cache_hits": 0, "model_checks": 0}
+        self.model_latency_total = 0.0
+
+    def record(self, kind, latency=None):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[kind] += 1
+            if latency is not None:
+                self.model_latency_total += latency
+        if GUARDRAIL_METRICS_PATH:
+            self.export(GUARDRAIL_METRICS_PATH)
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+            model_latency_total = self.model_latency_total
+        requests = counts["requests"] or 1
+        avg_model_latency = model_latency_total / counts["model_checks"] if counts["model_checks"] else 0.0
+        skipped = counts["prefilter_allowed"] + counts["prefilter_blocked"] + counts["cache_hits"]
+        return {
+            **counts,
+            "prefilter_rate": (counts["prefilter_allowed"] + counts["prefilter_blocked"]) / requests,
+            "cache_hit_rate": counts["cache_hits"] / requests,
+            "avg_model_latency_s": avg_model_latency,
+            # 모델을 호출하지 않은 요청마다 평균 모델 판정 시간만큼 절약한 것으로 추정
+            "latency_saved_s": skipped * avg_model_latency,
+        }
+
+    def export(self, path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logging.error(f"가드레일 메트릭 저장 실패: {e}")
+
+
+verdict_cache = VerdictCache()
+guardrail_metrics = GuardrailMetrics()
+
+
+async def cached_content_check(input_data, run_check, make_verdict):
+    """
+    사전 필터 → 판정 캐시 → 모델 판정 순서로 질문을 검사합니다.
+
+    Args:
+        input_data: 가드레일에 전달된 입력 (사용자 메시지를 찾을 수 없으면 항상 모델로 판정)
+        run_check: 모델 판정을 수행하는 비동기 함수
+        make_verdict: (적절 여부, 이유)로 판정 객체를 만드는 함수
+    """
+    question = input_text(input_data)
+    if question is None:
+        started = time.perf_counter()
+        verdict = await run_check()
+        guardrail_metrics.record("model_checks", time.perf_counter() - started)
+        return verdict
+
+    key = normalize_question(question)
+    decision = prefilter_question(key) if PREFILTER_ENABLED else None
+    if decision is not None:
+        is_appropriate, reasoning = decision
+        guardrail_metrics.record("prefilter_allowed" if is_appropriate else "prefilter_blocked")
+        return make_verdict(is_appropriate, reasoning)
+
+    verdict = verdict_cache.get(key)
+    if verdict is not None:
+        guardrail_metrics.record("cache_hits")
+        return verdict
+
+    started = time.perf_counter()
+    verdict = await run_check()
+    guardrail_metrics.record("model_checks", time.perf_counter() - started)
+    verdict_cache.put(key, verdict)
+    return verdict
@@ -8,12 +8,18 @@ OpenAI Agents SDK를 활용한 학습 도우미 시스템 예제
 """
 
 import os
+import json
+import time
 import asyncio
+import argparse
 from agents import Agent, Runner, InputGuardrail, GuardrailFunctionOutput
 from agents.exceptions import InputGuardrailTripwireTriggered
 from agents.tool import WebSearchTool
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from model_tiers import model_kwargs
+from question_router import QuestionRouter, log_routing_decision
+from guardrail_cache import cached_content_check, guardrail_metrics
 
 # 환경 변수 로드
 load_dotenv()
@@ -42,7 +48,8 @@ content_check_agent = Agent(
 - 부적절한 성인 콘텐츠
 
 적절성 여부와 그 이유를 명확히 설명하세요.""",
-    output_type=ContentCheck
+    output_type=ContentCheck,
+    **model_kwargs("content_check"),
 )
 
 
@@ -56,7 +63,8 @@ programming_agent = Agent(
 - 알고리즘 및 자료구조
 - 버전 관리(Git)
 
-코드를 설명할 때는 명확한 주석과 함께 단계별로 설명해주세요."""
+코드를 설명할 때는 명확한 주석과 함께 단계별로 설명해주세요.""",
+    **model_kwargs("programming"),
 )
 
 
@@ -71,7 +79,8 @@ language_agent = Agent(
 - 발음 가이드
 - 번역 도움
 
-학습자의 수준에 맞게 쉽고 명확하게 설명해주세요."""
+학습자의 수준에 맞게 쉽고 명확하게 설명해주세요.""",
+    **model_kwargs("language"),
 )
 
 
@@ -85,7 +94,8 @@ history_agent = Agent(
 - 시대별 사회/문화/경제적 특징
 - 역사적 맥락에서의 현대 사회 이해
 
-정확한 사실과 다양한 관점을 균형있게 제시해주세요."""
+정확한 사실과 다양한 관점을 균형있게 제시해주세요.""",
+    **model_kwargs("history"),
 )
 
 
@@ -104,14 +114,25 @@ web_search_agent = Agent(
 검색 결과가 충분하지 않을 경우, 더 구체적인 검색이 필요함을 안내하세요.
 정보의 출처를 함께 제공하여 신뢰성을 높이세요.""",
     tools=[WebSearchTool()],
+    **model_kwargs("web_search"),
 )
 
 
 # 가드레일 함수 정의
 async def content_guardrail(ctx, agent, input_data):
-    # 콘텐츠 검사 에이전트 실행
-    result = await Runner.run(content_check_agent, input_data, context=ctx.context)
-    final_output = result.final_output_as(ContentCheck)
+    # 콘텐츠 검사 에이전트 실행 (사전 필터나 캐시로 판정되면 생략)
+    async def run_check():
+        result = await Runner.run(content_check_agent, input_data, context=ctx.context)
+        return result.final_output_as(ContentCheck)
+    
+    def make_verdict(is_appropriate, reasoning):
+        return ContentCheck(
+            is_appropriate=is_appropriate,
+            reasoning=reasoning,
+            contains_harmful_content=not is_appropriate,
+        )
+    
+    final_output = await cached_content_check(input_data, run_check, make_verdict)
     
     # 만약 contains_harmful_content가 설정되지 않았다면 False로 처리
     harmful_content = getattr(final_output, 'contains_harmful_content', False)
@@ -140,9 +161,131 @@ triage_agent = Agent(
     input_guardrails=[
         InputGuardrail(guardrail_function=content_guardrail),
     ],
+    **model_kwargs("triage"),
 )
 
 
+# 로컬 라우터 (확신할 수 있는 질문은 triage_agent를 거치지 않음)
+question_router = QuestionRouter.from_triage(triage_agent)
+
+
+async def ask(question, log_routing=True):
+    """
+    질문을 라우터가 고른 에이전트로 실행하고, triage를 거친 경우 라우팅 결과를 기록합니다.
+    
+    Args:
+        question: 사용자 질문
+        log_routing: False이면 라우팅 결과를 기록하지 않음 (배치 평가, 티어 비교)
+    """
+    agent = question_router.select_agent(triage_agent, question)
+    started = time.perf_counter()
+    result = await Runner.run(agent, question)
+    if agent is triage_agent and log_routing:
+        log_routing_decision(question, result.last_agent.name, time.perf_counter() - started, len(result.raw_responses))
+    return result
+
+
+def load_questions(path):
+    """
+    배치 평가용 질문을 불러옵니다. .jsonl 파일은 줄마다 {"id", "question"} 객체를,
+    그 외 파일은 한 줄에 질문 하나를 읽습니다. 빈 줄과 #으로 시작하는 줄은 건너뜁니다.
+    
+    Args:
+        path: 질문 파일 경로
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                questions.append({"id": str(record.get("id", line_no)), "question": record["question"]})
+            else:
+                questions.append({"id": str(line_no), "question": line})
+    return questions
+
+
+async def evaluate_question(item, semaphore):
+    """질문 하나를 실행하고 라우팅 결과, 가드레일 발동 여부, 지연 시간, 답변을 기록합니다."""
+    async with semaphore:
+        record = {"id": item["id"], "question": item["question"], "agent": None,
+                  "guardrail_tripped": False, "latency_s": None, "answer": None, "error": None}
+        started = time.perf_counter()
+        try:
+            # 평가 실행의 라우팅은 분류기 학습 데이터(routing_log.jsonl)에 섞지 않음
+            result = await ask(item["question"], log_routing=False)
+            record["agent"] = result.last_agent.name
+            record["answer"] = str(result.final_output)
+        except InputGuardrailTripwireTriggered:
+            record["guardrail_tripped"] = True
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["latency_s"] = round(time.perf_counter() - started, 3)
+        return record
+
+
+def summarize(records, wall_time):
+    """배치 평가 결과를 에이전트별 분포와 지연 시간 통계로 요약합니다."""
+    latencies = sorted(r["latency_s"] for r in records if r["error"] is None)
+    agents = {}
+    for record in records:
+        if record["agent"]:
+            agents[record["agent"]] = agents.get(record["agent"], 0) + 1
+    
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))] if latencies else 0.0
+    
+    return {
+        "questions": len(records),
+        "answered": sum(1 for r in records if r["answer"] is not None),
+        "guardrail_tripped": sum(1 for r in records if r["guardrail_tripped"]),
+        "errors": sum(1 for r in records if r["error"]),
+        "agents": dict(sorted(agents.items())),
+        "latency_p50_s": percentile(0.5),
+        "latency_p95_s": percentile(0.95),
+        "wall_time_s": round(wall_time, 3),
+    }
+
+
+def save_batch_results(records, summary, output_path):
+    """질문별 결과 JSONL과 요약 JSON을 저장하고 요약 파일 경로를 반환합니다."""
+    with open(output_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+    summary_path = os.path.splitext(output_path)[0] + ".summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary_path
+
+
+async def run_batch(questions_path, output_path, concurrency):
+    """
+    질문 파일을 동시에 평가하여 질문별 결과 JSONL과 요약 보고서를 저장합니다.
+    결과는 입력 순서대로 저장되므로 실행 간 diff로 비교할 수 있습니다.
+    
+    Args:
+        questions_path: 질문 파일 경로
+        output_path: 결과 JSONL 파일 경로 (요약은 같은 이름의 .summary.json)
+        concurrency: 동시에 실행할 최대 질문 수
+    """
+    questions = await asyncio.to_thread(load_questions, questions_path)
+    print(f"{len(questions)}개 질문을 동시성 {concurrency}로 평가합니다...")
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    records = await asyncio.gather(*(evaluate_question(item, semaphore) for item in questions))
+    summary = summarize(records, time.perf_counter() - started)
+    summary_path = await asyncio.to_thread(save_batch_results, records, summary, output_path)
+    
+    print(f"응답 {summary['answered']}건, 가드레일 발동 {summary['guardrail_tripped']}건, 오류 {summary['errors']}건")
+    for agent_name, count in summary["agents"].items():
+        print(f"- {agent_name}: {count}건")
+    print(f"지연 시간 p50 {summary['latency_p50_s']:.2f}초, p95 {summary['latency_p95_s']:.2f}초, "
+          f"전체 {summary['wall_time_s']:.1f}초")
+    print(f"결과: {output_path}, 요약: {summary_path}")
+
+
 async def main():
     print("=" * 50)
     print("OpenAI Agents SDK - 학습 도우미 시스템 데모")
@@ -153,7 +296,7 @@ async def main():
     programming_question = "Python에서 리스트와 딕셔너리의 차이점은 무엇인가요?"
     print(f"질문: {programming_question}")
     try:
-        result = await Runner.run(triage_agent, programming_question)
+        result = await ask(programming_question)
         print(f"응답:\n{result.final_output}\n")
     except Exception as e:
         print(f"오류 발생: {e}\n")
@@ -162,7 +305,7 @@ async def main():
     language_question = "영어에서 현재완료와 과거시제의 차이를 설명해주세요."
     print(f"질문: {language_question}")
     try:
-        result = await Runner.run(triage_agent, language_question)
+        result = await ask(language_question)
         print(f"응답:\n{result.final_output}\n")
     except Exception as e:
         print(f"오류 발생: {e}\n")
@@ -171,7 +314,7 @@ async def main():
     history_question = "한국 임진왜란의 주요 원인과 영향은 무엇인가요?"
     print(f"질문: {history_question}")
     try:
-        result = await Runner.run(triage_agent, history_question)
+        result = await ask(history_question)
         print(f"응답:\n{result.final_output}\n")
     except Exception as e:
         print(f"오류 발생: {e}\n")
@@ -180,7 +323,7 @@ async def main():
     web_search_question = "오늘 서울 날씨는 어떤가요?"
     print(f"질문: {web_search_question}")
     try:
-        result = await Runner.run(triage_agent, web_search_question)
+        result = await ask(web_search_question)
         print(f"응답:\n{result.final_output}\n")
     except Exception as e:
         print(f"오류 발생: {e}\n")
@@ -189,13 +332,27 @@ async def main():
     inappropriate_question = "해킹 방법을 자세히 알려주세요."
     print(f"질문: {inappropriate_question}")
     try:
-        result = await Runner.run(triage_agent, inappropriate_question)
+        result = await ask(inappropriate_question)
         print(f"응답:\n{result.final_output}\n")
     except InputGuardrailTripwireTriggered as e:
         print(f"가드레일 발동: {e}\n")
     except Exception as e:
         print(f"오류 발생: {e}\n")
+    
+    # 가드레일 사전 필터/캐시 통계
+    metrics = guardrail_metrics.snapshot()
+    print(f"가드레일: 요청 {metrics['requests']}건, 사전 필터 {metrics['prefilter_rate']:.0%}, "
+          f"캐시 적중 {metrics['cache_hit_rate']:.0%}, 절약된 시간 약 {metrics['latency_saved_s']:.1f}초")
 
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="OpenAI Agents SDK 학습 도우미 시스템")
+    parser.add_argument("--batch", metavar="QUESTIONS", help="질문 파일을 배치 평가 (.txt 또는 .jsonl)")
+    parser.add_argument("--output", default="batch_results.jsonl", help="배치 평가 결과 JSONL 경로")
+    parser.add_argument("--concurrency", type=int, default=4, help="배치 평가 동시 실행 수")
+    args = parser.parse_args()
+    
+    if args.batch:
+        asyncio.run(run_batch(args.batch, args.output, args.concurrency))
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
@@ -8,13 +8,26 @@ OpenAI Agents SDK를 활용한 학습 도우미 시스템 예제 - Gradio 웹 
 """
 
 import os
+import time
 import asyncio
+import logging
 import gradio as gr
 from agents import Agent, Runner, InputGuardrail, GuardrailFunctionOutput
 from agents.exceptions import InputGuardrailTripwireTriggered
 from agents.tool import WebSearchTool
+from openai.types.responses import ResponseTextDeltaEvent
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from model_tiers import model_kwargs
+from question_router import QuestionRouter, log_routing_decision
+from guardrail_cache import cached_content_check, guardrail_metrics, normalize_question, prefilter_question, input_text
+from answer_cache import AnswerCache, ANSWER_CACHE_REALTIME_TTL, cacheable_answer
+from admission import AdmissionController, AdmissionRejected, ADMISSION_MAX_IN_FLIGHT
+from conversation_memory import ConversationMemory, format_turns
+from prompt_cache import prompt_cache_stats
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # 환경 변수 로드
 load_dotenv()
@@ -43,7 +56,8 @@ content_check_agent = Agent(
 - 부적절한 성인 콘텐츠
 
 적절성 여부와 그 이유를 명확히 설명하세요.""",
-    output_type=ContentCheck
+    output_type=ContentCheck,
+    **model_kwargs("content_check"),
 )
 
 
@@ -57,7 +71,8 @@ programming_agent = Agent(
 - 알고리즘 및 자료구조
 - 버전 관리(Git)
 
-코드를 설명할 때는 명확한 주석과 함께 단계별로 설명해주세요."""
+코드를 설명할 때는 명확한 주석과 함께 단계별로 설명해주세요.""",
+    **model_kwargs("programming"),
 )
 
 
@@ -72,7 +87,8 @@ language_agent = Agent(
 - 발음 가이드
 - 번역 도움
 
-학습자의 수준에 맞게 쉽고 명확하게 설명해주세요."""
+학습자의 수준에 맞게 쉽고 명확하게 설명해주세요.""",
+    **model_kwargs("language"),
 )
 
 
@@ -86,7 +102,8 @@ history_agent = Agent(
 - 시대별 사회/문화/경제적 특징
 - 역사적 맥락에서의 현대 사회 이해
 
-정확한 사실과 다양한 관점을 균형있게 제시해주세요."""
+정확한 사실과 다양한 관점을 균형있게 제시해주세요.""",
+    **model_kwargs("history"),
 )
 
 
@@ -105,23 +122,44 @@ web_search_agent = Agent(
 검색 결과가 충분하지 않을 경우, 더 구체적인 검색이 필요함을 안내하세요.
 정보의 출처를 함께 제공하여 신뢰성을 높이세요.""",
     tools=[WebSearchTool()],
+    **model_kwargs("web_search"),
 )
 
 
-# 가드레일 함수 정의
-async def content_guardrail(ctx, agent, input_data):
-    # 콘텐츠 검사 에이전트 실행
-    result = await Runner.run(content_check_agent, input_data, context=ctx.context)
-    final_output = result.final_output_as(ContentCheck)
+# 콘텐츠 검사 (가드레일과 답변 캐시 적중 시 공통으로 사용)
+async def check_content(input_data, context=None):
+    """질문의 적절성 판정(ContentCheck)을 반환합니다. 사전 필터나 캐시로 판정되면 모델을 호출하지 않습니다."""
+    # 대화 기억이 포함된 입력이어도 새 질문만 검사
+    async def run_check():
+        result = await Runner.run(content_check_agent, input_text(input_data) or input_data, context=context)
+        prompt_cache_stats.record_run(result, content_check_agent.name)
+        return result.final_output_as(ContentCheck)
+    
+    def make_verdict(is_appropriate, reasoning):
+        return ContentCheck(
+            is_appropriate=is_appropriate,
+            reasoning=reasoning,
+            contains_harmful_content=not is_appropriate,
+        )
     
+    return await cached_content_check(input_data, run_check, make_verdict)
+
+
+def is_inappropriate(verdict):
     # 만약 contains_harmful_content가 설정되지 않았다면 False로 처리
-    harmful_content = getattr(final_output, 'contains_harmful_content', False)
+    harmful_content = getattr(verdict, 'contains_harmful_content', False)
+    return not verdict.is_appropriate or harmful_content
+
+
+# 가드레일 함수 정의
+async def content_guardrail(ctx, agent, input_data):
+    # 콘텐츠 검사 에이전트 실행 (사전 필터나 캐시로 판정되면 생략)
+    final_output = await check_content(input_data, ctx.context)
     
     # 부적절한 내용이 감지되면 차단
-    is_inappropriate = not final_output.is_appropriate or harmful_content
     return GuardrailFunctionOutput(
         output_info=final_output,
-        tripwire_triggered=is_inappropriate,
+        tripwire_triggered=is_inappropriate(final_output),
     )
 
 
@@ -139,14 +177,109 @@ triage_agent = Agent(
 명확하지 않은 경우, 사용자에게 추가 정보를 요청하세요.""",
     handoffs=[programming_agent, language_agent, history_agent, web_search_agent],
     input_guardrails=[
-        InputGuardrail(guardrail_function=content_guardrail),
+        # 스트리밍 실행에서는 가드레일이 판정을 마친 뒤에 모델을 호출해야
+        # 차단될 질문의 답변 토큰이 사용자에게 먼저 표시되지 않음
+        InputGuardrail(guardrail_function=content_guardrail, run_in_parallel=False),
     ],
+    **model_kwargs("triage"),
 )
 
 
+# 대화 요약 에이전트 (토큰 예산을 넘은 오래된 대화를 요약)
+summary_agent = Agent(
+    name="대화 요약기",
+    instructions="""학습 도우미와 사용자의 대화를 이후 질문에 필요한 맥락만 남겨 간결하게 요약합니다.
+- 사용자가 무엇을 배우고 있는지, 어떤 수준인지
+- 이미 설명한 핵심 개념, 예시 코드의 요점, 언급된 고유명사와 수치
+- 아직 해결되지 않은 질문
+기존 요약이 있으면 새 대화 내용을 합쳐 하나의 요약으로 다시 작성하세요.""",
+    **model_kwargs("summary"),
+)
+
+
+# 로컬 라우터 (확신할 수 있는 질문은 triage_agent를 거치지 않음)
+question_router = QuestionRouter.from_triage(triage_agent)
+
+# 세션별 대화 기억
+conversation_memory = ConversationMemory()
+
+
+async def summarize_turns(summary, turns):
+    """기존 요약과 오래된 턴을 합쳐 새 요약을 만듭니다."""
+    prompt = (f"기존 요약:\n{summary}\n\n" if summary else "") + f"새 대화:\n{format_turns(turns)}"
+    result = await Runner.run(summary_agent, prompt)
+    prompt_cache_stats.record_run(result, summary_agent.name)
+    return result.final_output
+
+
+async def ask_streamed(question, state=None):
+    """
+    질문을 라우터가 고른 에이전트로 스트리밍 실행합니다.
+    ("agent", 에이전트 이름) 또는 ("delta", 텍스트 조각)을 순서대로 내보내고,
+    마지막에 ("done", 실행 결과)를 내보냅니다. 첫 토큰까지의 시간(TTFT)과 입력 토큰 수
+    (프롬프트 캐시에서 읽은 토큰 포함)를 기록합니다.
+    
+    입력은 고정된 instructions와 도구 정의 뒤에 대화 요약, 이전 턴, 새 질문 순서로 붙으므로
+    같은 에이전트에 대한 요청은 앞부분이 같아 서버 측 프롬프트 캐시에 적중합니다.
+    
+    Args:
+        question: 사용자 질문
+        state: 세션의 대화 상태 (이전 대화를 입력에 포함하고, 후속 질문은 직전 전문 에이전트로 보냄)
+    """
+    last_agent = conversation_memory.followup_agent(state) if state is not None else None
+    name, reason = question_router.choose(question, last_agent)
+    agent = question_router.agent_for(triage_agent, name)
+    if state is not None:
+        # 후속 질문 연속 한도를 넘으면 다음 질문은 다시 triage를 거침
+        state.followups = state.followups + 1 if reason == "followup" else 0
+    input_data = state.build_input(question, conversation_memory.token_budget) if state is not None else question
+    started = time.perf_counter()
+    first_token_at = None
+    result = Runner.run_streamed(agent, input_data)
+    yield "agent", agent.name
+    
+    async for event in result.stream_events():
+        if event.type == "agent_updated_stream_event":
+            yield "agent", event.new_agent.name
+        elif event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield "delta", event.data.delta
+    
+    elapsed = time.perf_counter() - started
+    ttft = (first_token_at - started) if first_token_at else elapsed
+    input_tokens, cached = prompt_cache_stats.record_run(result, agent.name)
+    logging.info(f"응답 완료: {result.last_agent.name}, TTFT {ttft:.2f}초, 전체 {elapsed:.2f}초, "
+                 f"입력 토큰 {input_tokens} (캐시 {cached}, 모델 호출 {len(result.raw_responses)}회)")
+    if agent is triage_agent:
+        log_routing_decision(question, result.last_agent.name, elapsed, len(result.raw_responses))
+    yield "done", result
+
+
+# 답변 캐시 (여러 워커 프로세스가 같은 SQLite 파일을 공유)
+answer_cache = AnswerCache()
+
+# 실시간 정보를 다루는 에이전트 (답변을 캐시하지 않거나 짧게 캐시)
+# 라우터가 가드레일을 붙인 복사본을 실행하므로 이름으로 비교
+realtime_agent_names = {web_search_agent.name}
+
+# 가드레일 차단 안내 메시지
+GUARDRAIL_MESSAGE = "⚠️ 가드레일 발동: 부적절한 콘텐츠가 감지되어 처리가 중단되었습니다."
+
+# 승인 제어 (세션별 속도 제한, 동시 실행 한도)
+admission_controller = AdmissionController()
+
+# 거절 사유별 안내 메시지
+rejection_messages = {
+    "rate": "⏳ 요청이 너무 많습니다. 잠시 후 다시 질문해주세요.",
+    "busy": "⏳ 현재 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+}
+
+
 # Gradio 인터페이스 함수
-async def process_question(question, history):
+async def process_question(question, history, request: gr.Request = None):
     history = history or []
+    session_id = request.session_hash if request is not None else "local"
     
     if not question.strip():
         yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": "질문을 입력해주세요."}]
@@ -156,20 +289,87 @@ async def process_question(question, history):
         # 상태 업데이트
         yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": "처리 중..."}]
         
-        # 에이전트 실행
-        result = await Runner.run(triage_agent, question)
+        # 대화 기억 (이전 대화가 있으면 답변이 맥락에 따라 달라지므로 답변 캐시를 쓰지 않음)
+        # 기억은 서버의 상태로만 만듦 (클라이언트가 보낸 history는 위조될 수 있음)
+        state = conversation_memory.get(session_id)
+        standalone = not state.turns and not state.summary
+        
+        # 차단 규칙에 해당하지 않는 질문만 캐시된 답변 사용
+        decision = prefilter_question(normalize_question(question))
+        cached = answer_cache.lookup(question) if standalone and (decision is None or decision[0]) else None
+        # 캐시된 답변도 Runner를 거칠 때와 같은 콘텐츠 검사를 통과해야 제공
+        if cached and is_inappropriate(await check_content(question)):
+            yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": GUARDRAIL_MESSAGE}]
+            return
+        if cached:
+            logging.info(f"답변 캐시 적중 ({cached['match']}, 유사도 {cached['similarity']:.2f}, {cached['agent']})")
+            conversation_memory.record_turn(state, question, cached["answer"], cached["agent"],
+                                            specialist=cached["agent"] in question_router.specialists, input_tokens=0)
+            yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": f"**[{cached['agent']}]**\n\n{cached['answer']}"}]
+            return
+        
+        # 에이전트 실행 (전문 에이전트의 답변을 토큰 단위로 표시)
+        agent_name = ""
+        answer = ""
+        result = None
+        async with admission_controller.admit(session_id):
+            async for kind, value in ask_streamed(question, state):
+                if kind == "agent":
+                    agent_name = value
+                    answer = ""
+                elif kind == "delta":
+                    answer += value
+                else:
+                    result = value
+                    break
+                content = f"**[{agent_name}]**\n\n{answer}" if answer else f"**[{agent_name}]** 처리 중..."
+                yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": content}]
         answer = result.final_output
         
+        # triage의 답변(되묻기)이나 추가 정보를 요청하는 답변은 캐시하지 않음
+        if standalone and result.last_agent.name in question_router.specialists and cacheable_answer(answer):
+            ttl = ANSWER_CACHE_REALTIME_TTL if result.last_agent.name in realtime_agent_names else None
+            answer_cache.store(question, answer, result.last_agent.name, ttl=ttl)
+        
+        input_tokens = result.context_wrapper.usage.input_tokens
+        conversation_memory.record_turn(state, question, answer, result.last_agent.name,
+                                        specialist=result.last_agent.name in question_router.specialists,
+                                        input_tokens=input_tokens)
+        memory_stats = conversation_memory.stats
+        logging.info(f"대화 기억: 세션 {session_id}, 입력 토큰 {input_tokens}, 기억 {state.memory_tokens()}토큰 "
+                     f"(턴 {len(state.turns)}개, 요약된 턴 {state.compacted_turns}개), "
+                     f"턴당 평균 입력 토큰 {memory_stats['input_tokens'] / max(memory_stats['turns'], 1):.0f}")
+        
+        metrics = guardrail_metrics.snapshot()
+        logging.info(f"가드레일 통계: 사전 필터 {metrics['prefilter_rate']:.0%}, "
+                     f"캐시 적중 {metrics['cache_hit_rate']:.0%}, 절약된 시간 {metrics['latency_saved_s']:.1f}초")
+        logging.info(f"프롬프트 캐시 (에이전트별 캐시된 입력 토큰 비율): {prompt_cache_stats.summary()}")
+        
         # 결과 반환
-        yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": f"**[{result.last_agent.name}]**\n\n{answer}"}]
+        
+        # 답변을 보여준 뒤 토큰 예산을 넘은 오래된 대화를 요약
+        if await conversation_memory.compact(state, summarize_turns):
+            logging.info(f"대화 요약: 세션 {session_id}, 기억 {state.memory_tokens()}토큰으로 축소")
+    
+    except AdmissionRejected as e:
+        logging.info(f"요청 거절 ({e.reason}): 세션 {session_id}")
+        yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": rejection_messages[e.reason]}]
     
     except InputGuardrailTripwireTriggered:
-        yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": "⚠️ 가드레일 발동: 부적절한 콘텐츠가 감지되어 처리가 중단되었습니다."}]
+        yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": GUARDRAIL_MESSAGE}]
     
     except Exception as e:
         yield history + [{"role": "user", "content": question}, {"role": "assistant", "content": f"오류 발생: {str(e)}"}]
 
 
+# 대화 초기화 (화면과 세션의 대화 기억을 함께 지움)
+def clear_conversation(request: gr.Request = None):
+    if request is not None:
+        conversation_memory.reset(request.session_hash)
+    return [], ""
+
+
 # 예제 질문 목록
 example_questions = [
     "Python에서 리스트와 딕셔너리의 차이점은 무엇인가요?",
@@ -279,7 +479,7 @@ def create_demo():
         )
         
         clear_btn.click(
-            fn=lambda: ([], ""),
+            fn=clear_conversation,
             inputs=None,
             outputs=[chatbot, question],
         )
@@ -290,7 +490,10 @@ def create_demo():
 # 메인 실행 함수
 if __name__ == "__main__":
     demo = create_demo()
-    demo.queue(max_size=20).launch(
+    # Gradio 동시 실행 수는 승인 제어 한도보다 크게 두어 캐시 적중은 바로 처리하고,
+    # Runner 실행이 한도를 넘으면 대기열에 쌓지 않고 즉시 거절
+    concurrency_limit = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", str(ADMISSION_MAX_IN_FLIGHT * 4)))
+    demo.queue(max_size=20, default_concurrency_limit=concurrency_limit).launch(
         server_name="0.0.0.0",
         share=False,
     ) 
\ No newline at end of file
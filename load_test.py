@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미 Gradio 앱 부하 테스트
+모든 에이전트의 모델을 로컬 스텁 모델로 바꾼 뒤 process_question을 여러 동시성 수준에서 호출하고,
+설정별 p50/p99 지연 시간, 처리량, 거절 수를 보고합니다. OpenAI API는 호출하지 않습니다.
+
+사용법:
+    python load_test.py --concurrency 1,4,16,32 --requests 64 --max-in-flight 4,8
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import asyncio
+import argparse
+import tempfile
+
+# 스텁 모델만 사용하므로 실제 API 키가 없어도 실행되도록 설정
+os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+_tmpdir = tempfile.mkdtemp(prefix="load_test_")
+os.environ["ROUTING_LOG_PATH"] = os.path.join(_tmpdir, "routing_log.jsonl")
+os.environ["ANSWER_CACHE_PATH"] = os.path.join(_tmpdir, "answer_cache.sqlite3")
+os.environ["ANSWER_CACHE_TTL"] = "0"
+
+from agents import set_tracing_disabled
+from agents.items import ModelResponse
+from agents.models.interface import Model
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+import learning_assistant_gradio as app
+from admission import AdmissionController
+from conversation_memory import ConversationMemory, estimate_tokens
+
+STUB_ANSWER = "스텁 모델의 답변입니다. 부하 테스트용으로 생성된 고정 텍스트로, 실제 답변 길이를 흉내 내기 위해 여러 토큰으로 나누어 전송됩니다."
+STUB_VERDICT = json.dumps({"is_appropriate": True, "reasoning": "stub", "contains_harmful_content": False})
+
+
+class StubModel(Model):
+    """고정 지연 후 고정 답변(또는 첫 번째 handoff 호출)을 돌려주는 로컬 모델"""
+
+    def __init__(self, first_token_latency, token_interval):
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+
+    def build_output(self, input, output_schema, handoffs):
+        if output_schema is not None and not output_schema.is_plain_text():
+            text = STUB_VERDICT
+        elif handoffs:
+            # triage 단계: 질문 내용에 따라 결정적으로 handoff 대상을 고름
+            target = handoffs[zlib.crc32(str(input).encode("utf-8")) % len(handoffs)]
+            return [ResponseFunctionToolCall(type="function_call", id="fc_stub", call_id="call_stub",
+                                             name=target.tool_name, arguments="{}", status="completed")]
+        else:
+            text = STUB_ANSWER
+        return [ResponseOutputMessage(
+            type="message", id="msg_stub", role="assistant", status="completed",
+            content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+        )]
+
+    def build_usage(self, system_instructions, input, output):
+        """입력/출력 길이로 추정한 토큰 사용량"""
+        input_tokens = estimate_tokens(system_instructions or "") + estimate_tokens(str(input))
+        output_tokens = estimate_tokens(str(output))
+        return ResponseUsage.model_construct(
+            input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens,
+            input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+            output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0))
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        output = self.build_output(input, output_schema, handoffs)
+        usage = self.build_usage(system_instructions, input, output)
+        return ModelResponse(output=output, response_id=None,
+                             usage=Usage(requests=1, input_tokens=usage.input_tokens, output_tokens=usage.output_tokens,
+                                         total_tokens=usage.total_tokens))
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs):
+        output = self.build_output(input, output_schema, handoffs)
+        await asyncio.sleep(self.first_token_latency)
+        sequence = 0
+        if isinstance(output[0], ResponseOutputMessage):
+            for i in range(0, len(output[0].content[0].text), 8):
+                await asyncio.sleep(self.token_interval)
+                yield ResponseTextDeltaEvent.model_construct(
+                    type="response.output_text.delta", item_id="msg_stub", output_index=0, content_index=0,
+                    delta=output[0].content[0].text[i:i + 8], logprobs=[], sequence_number=sequence)
+                sequence += 1
+        response = Response.model_construct(
+            id="resp_stub", object="response", created_at=time.time(), model="stub", output=output,
+            tool_choice="auto", tools=[], parallel_tool_calls=False,
+            usage=self.build_usage(system_instructions, input, output))
+        yield ResponseCompletedEvent.model_construct(type="response.completed", response=response,
+                                                     sequence_number=sequence)
+
+
+class FakeRequest:
+    """process_question에 전달할 세션 정보"""
+
+    def __init__(self, session_hash):
+        self.session_hash = session_hash
+
+
+def install_stub_model(first_token_latency, token_interval):
+    model = StubModel(first_token_latency, token_interval)
+    for agent in [app.content_check_agent, app.summary_agent, app.triage_agent, *app.triage_agent.handoffs]:
+        agent.model = model
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run_config(concurrency, total_requests, max_in_flight, rate_per_minute, sessions):
+    """
+    한 설정으로 부하를 발생시키고 결과를 집계합니다.
+
+    Args:
+        concurrency: 동시에 요청을 보내는 사용자 수
+        total_requests: 전체 요청 수
+        max_in_flight: 동시 Runner 실행 한도
+        rate_per_minute: 세션별 분당 요청 한도 (0이면 제한 없음)
+        sessions: 요청을 나눠 보낼 세션 수
+    """
+    app.admission_controller = AdmissionController(max_in_flight=max_in_flight, rate_per_minute=rate_per_minute)
+    # 설정끼리 결과를 비교할 수 있도록 대화 기억을 비우고 시작
+    app.conversation_memory = ConversationMemory()
+    latencies = []
+    rejected = 0
+    rejection_texts = set(app.rejection_messages.values())
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(i)
+
+    async def user():
+        nonlocal rejected
+        while not queue.empty():
+            i = queue.get_nowait()
+            question = f"{app.example_questions[i % len(app.example_questions)]} ({i})"
+            request = FakeRequest(f"session-{i % sessions}")
+            started = time.perf_counter()
+            last = None
+            async for last in app.process_question(question, [], request):
+                pass
+            if last[-1]["content"] in rejection_texts:
+                rejected += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "max_in_flight": max_in_flight,
+        "rate_per_minute": rate_per_minute,
+        "completed": len(latencies),
+        "rejected": rejected,
+        "p50_s": percentile(latencies, 0.5),
+        "p99_s": percentile(latencies, 0.99),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="학습 도우미 부하 테스트 (스텁 모델 사용)")
+    parser.add_argument("--concurrency", default="1,4,16,32", help="동시 사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--max-in-flight", default="8", help="동시 Runner 실행 한도 목록 (쉼표 구분)")
+    parser.add_argument("--rate", type=float, default=0, help="세션별 분당 요청 한도 (0이면 제한 없음)")
+    parser.add_argument("--requests", type=int, default=64, help="설정별 전체 요청 수")
+    parser.add_argument("--sessions", type=int, default=16, help="요청을 나눠 보낼 세션 수")
+    parser.add_argument("--latency", type=float, default=0.3, help="스텁 모델의 첫 토큰 지연(초)")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="스텁 모델의 토큰 간격(초)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    set_tracing_disabled(True)
+    install_stub_model(args.latency, args.token_interval)
+
+    reports = []
+    print(f"{'동시성':>6} {'한도':>4} {'완료':>5} {'거절':>5} {'p50(s)':>8} {'p99(s)':>8} {'처리량(rps)':>12}")
+    for max_in_flight in [int(v) for v in args.max_in_flight.split(",")]:
+        for concurrency in [int(v) for v in args.concurrency.split(",")]:
+            report = await run_config(concurrency, args.requests, max_in_flight, args.rate, args.sessions)
+            reports.append(report)
+            print(f"{concurrency:>6} {max_in_flight:>4} {report['completed']:>5} {report['rejected']:>5} "
+                  f"{report['p50_s']:>8.3f} {report['p99_s']:>8.3f} {report['throughput_rps']:>12.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    sys.exit(0)
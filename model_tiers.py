@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+에이전트별 모델 티어 설정
+가드레일, 분류처럼 단순한 단계에는 작고 빠른 모델을, 답변 단계에는 큰 모델을 지정할 수 있습니다.
+
+설정 우선순위:
+1. 환경 변수 AGENT_MODEL_<KEY> (예: AGENT_MODEL_TRIAGE=gpt-4.1-mini)
+   AGENT_MODEL_SETTINGS_<KEY> (예: AGENT_MODEL_SETTINGS_TRIAGE={"temperature": 0})
+2. AGENT_MODELS_CONFIG가 가리키는 JSON 파일
+   {"triage": {"model": "gpt-4.1-mini", "settings": {"temperature": 0}}, ...}
+3. 코드에 지정된 기본값 (없으면 SDK 기본 모델)
+
+KEY: content_check, triage, summary, programming, language, history, web_search, browser
+"""
+
+import os
+import json
+import logging
+
+from agents import ModelSettings
+from prompt_cache import PROMPT_CACHE_KEY_PREFIX
+
+AGENT_MODELS_CONFIG = os.getenv("AGENT_MODELS_CONFIG", "agent_models.json")
+
+
+def load_tier_config(path=AGENT_MODELS_CONFIG):
+    """JSON 설정 파일을 읽습니다. 파일이 없으면 빈 설정을 반환합니다."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"모델 티어 설정 로드 실패 ({path}): {e}")
+        return {}
+
+
+tier_config = load_tier_config()
+
+
+def tier_for(key, default_model=None):
+    """
+    에이전트의 (모델 이름, 모델 설정 딕셔너리)를 반환합니다.
+
+    Args:
+        key: 에이전트 키 (예: "triage")
+        default_model: 설정이 없을 때 사용할 모델
+    """
+    entry = tier_config.get(key, {})
+    model = os.getenv(f"AGENT_MODEL_{key.upper()}") or entry.get("model") or default_model
+    settings = dict(entry.get("settings", {}))
+    env_settings = os.getenv(f"AGENT_MODEL_SETTINGS_{key.upper()}")
+    if env_settings:
+        settings.update(json.loads(env_settings))
+    return model, settings
+
+
+def model_kwargs(key, default_model=None):
+    """
+    Agent 생성자에 넘길 model/model_settings 인자를 반환합니다.
+    지정된 값이 없으면 빈 딕셔너리를 반환하여 SDK 기본값을 그대로 사용합니다.
+    PROMPT_CACHE_KEY_PREFIX가 설정되어 있으면 에이전트별 prompt_cache_key를 함께 넣습니다.
+
+    Args:
+        key: 에이전트 키
+        default_model: 설정이 없을 때 사용할 모델
+    """
+    model, settings = tier_for(key, default_model)
+    if PROMPT_CACHE_KEY_PREFIX:
+        settings.setdefault("extra_args", {}).setdefault("prompt_cache_key", f"{PROMPT_CACHE_KEY_PREFIX}{key}")
+    kwargs = {}
+    if model:
+        kwargs["model"] = model
+    if settings:
+        kwargs["model_settings"] = ModelSettings(**settings)
+    return kwargs
+
+
+def apply_tiers(agents_by_key, assignment):
+    """
+    실행 중인 에이전트에 티어 지정을 적용합니다. 지정되지 않은 에이전트는 바꾸지 않습니다.
+
+    Args:
+        agents_by_key: 키별 에이전트
+        assignment: 키별 {"model": ..., "settings": {...}} 또는 모델 이름 문자열
+    """
+    for key, value in assignment.items():
+        agent = agents_by_key.get(key)
+        if agent is None:
+            raise KeyError(f"알 수 없는 에이전트 키: {key}")
+        if isinstance(value, str):
+            value = {"model": value}
+        if value.get("model"):
+            agent.model = value["model"]
+        if value.get("settings"):
+            agent.model_settings = ModelSettings(**value["settings"])
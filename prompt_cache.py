@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+프롬프트 캐시 적중 통계
+서버 측 프롬프트 캐시는 요청 앞부분(instructions, 도구 정의, 이전 대화)이 바이트 단위로
+같을 때만 적중합니다. 각 모델 호출의 usage에서 캐시된 입력 토큰과 캐시되지 않은 입력 토큰을
+에이전트별로 모아, 고정된 내용을 앞에 두는 요청 구성이 실제로 효과가 있는지 확인합니다.
+"""
+
+import os
+import threading
+
+# 설정하면 에이전트별 prompt_cache_key("<접두사><에이전트 키>")를 요청에 넣어
+# 같은 접두부를 가진 요청이 같은 캐시로 전달되도록 함 (OpenAI 모델에서만 사용)
+PROMPT_CACHE_KEY_PREFIX = os.getenv("PROMPT_CACHE_KEY_PREFIX", "")
+
+
+def cached_tokens(usage):
+    """usage의 입력 토큰 중 캐시에서 읽은 토큰 수 (정보가 없으면 0)"""
+    details = getattr(usage, "input_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+class PromptCacheStats:
+    """에이전트별 모델 호출 수, 입력 토큰, 캐시된 입력 토큰"""
+
+    def __init__(self):
+        self.agents = {}
+        self.lock = threading.Lock()
+
+    def record(self, agent_name, usage):
+        """
+        모델 호출 한 번의 usage를 기록합니다.
+
+        Args:
+            agent_name: 호출한 에이전트 이름
+            usage: input_tokens와 input_tokens_details.cached_tokens가 있는 usage 객체
+        """
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        cached = cached_tokens(usage)
+        with self.lock:
+            entry = self.agents.setdefault(agent_name, {"requests": 0, "input_tokens": 0, "cached_tokens": 0})
+            entry["requests"] += 1
+            entry["input_tokens"] += input_tokens
+            entry["cached_tokens"] += cached
+        return input_tokens, cached
+
+    def record_run(self, result, start_agent_name):
+        """
+        Runner 실행 결과의 모델 호출을 에이전트별로 기록합니다.
+        handoff가 있었다면 첫 호출은 시작 에이전트, 나머지는 마지막 에이전트의 호출로 셉니다.
+
+        Returns:
+            (입력 토큰 합계, 캐시된 입력 토큰 합계)
+        """
+        totals = [0, 0]
+        last_agent_name = result.last_agent.name
+        for index, response in enumerate(result.raw_responses):
+            agent_name = start_agent_name if index == 0 or start_agent_name == last_agent_name else last_agent_name
+            input_tokens, cached = self.record(agent_name, response.usage)
+            totals[0] += input_tokens
+            totals[1] += cached
+        return tuple(totals)
+
+    def snapshot(self):
+        """에이전트별 통계와 캐시 적중률(캐시된 입력 토큰 비율)"""
+        with self.lock:
+            agents = {name: dict(entry) for name, entry in self.agents.items()}
+        for entry in agents.values():
+            entry["cached_ratio"] = entry["cached_tokens"] / entry["input_tokens"] if entry["input_tokens"] else 0.0
+        return agents
+
+    def summary(self):
+        return ", ".join(f"{name} {entry['cached_ratio']:.0%} ({entry['cached_tokens']}/{entry['input_tokens']}토큰, "
+                         f"{entry['requests']}회)" for name, entry in sorted(self.snapshot().items())) or "기록 없음"
+
+
+prompt_cache_stats = PromptCacheStats()
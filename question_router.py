@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+학습 도우미 로컬 질문 라우터
+전문 에이전트의 handoff_description/instructions에서 만든 키워드 사전과
+triage_agent의 라우팅 기록으로 학습한 나이브 베이즈 분류기로 질문을 점수화합니다.
+확신할 수 있는 질문은 triage_agent를 거치지 않고 전문 에이전트로 바로 보냅니다.
+
+사용법:
+    python question_router.py train      # 라우팅 기록으로 분류기 학습
+    python question_router.py evaluate   # 라우팅 기록 대비 정확도와 절약 시간 평가
+"""
+
+import os
+import re
+import json
+import math
+import random
+import logging
+import argparse
+from collections import Counter, defaultdict
+
+from guardrail_cache import normalize_question
+
+# 라우터 설정
+ROUTING_LOG_PATH = os.getenv("ROUTING_LOG_PATH", "routing_log.jsonl")
+ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", "router_model.json")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.7"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.3"))
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+# 분류기가 같은 에이전트를 고르지 않으면 키워드가 이 개수 이상 맞아야 triage를 생략
+ROUTER_MIN_KEYWORD_HITS = int(os.getenv("ROUTER_MIN_KEYWORD_HITS", "2"))
+
+# 키워드 사전에서 제외할 일반 단어
+STOPWORDS = {
+    "질문", "처리", "처리하는", "전문", "에이전트", "관련", "당신은", "전문가입니다", "다음", "대한", "답변",
+    "답변할", "있습니다", "설명", "설명해주세요", "명확한", "제공", "제공하세요", "사용자의", "필요한", "특히",
+    "함께", "정확한", "다양한", "관한", "언어", "특정", "수준에", "맞게", "쉽고", "명확하게", "바탕으로",
+    # 어느 분야의 질문에도 나올 수 있는 단어
+    "관리", "도움", "사용자", "경우", "결과", "위해", "이해", "주요", "사실", "현재",
+    # 에이전트 설명에만 있고 질문의 주제를 구분하지 못하는 단어 ("딥러닝 모델 학습", "현대자동차", "사회적 거리두기")
+    "학습", "학습자", "수준", "가이드", "교정", "표현", "개발", "버전", "주석", "단계별로",
+    "현대", "사회", "문화", "경제적", "관점", "균형있게", "그들", "맥락에서", "사건", "인물", "시대", "시대별",
+    "영향", "의미", "특징", "주제", "데이터", "정보", "출처", "이슈", "구체적인", "신뢰성", "충분하지", "필요함",
+}
+# 서술어로 보고 키워드에서 제외할 어미
+VERB_ENDINGS = ("세요", "니다", "하는", "하기", "하여", "하고", "할", "않을", "같은", "때는")
+# 키워드 끝에서 떼어낼 조사
+PARTICLES = ("에서", "에게", "와", "과", "에", "의", "나", "을", "를", "은", "는", "이", "가", "및")
+
+
+def tokenize(text):
+    """한글 단어와 영문/기호 토큰을 추출합니다."""
+    return re.findall(r"[a-z][a-z0-9+#.]*|[가-힣]+", text.lower())
+
+
+def strip_particle(word):
+    for particle in PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) >= 2:
+            return word[:-len(particle)]
+    return word
+
+
+def question_terms(text):
+    """키워드 사전과 비교할 질문의 단어 (조사와 문장 끝 마침표 제거)"""
+    return [strip_particle(word).rstrip(".") for word in tokenize(text)]
+
+
+def term_matches(term, words):
+    """
+    키워드가 단어 경계에서 시작하는지 확인합니다.
+    영문 키워드는 단어 전체가 같아야 하고("go"는 "chicago"에 맞지 않음),
+    한글 키워드는 어미가 붙을 수 있으므로 단어의 앞부분이 같으면 맞는 것으로 봅니다.
+    """
+    if term.isascii():
+        return term in words
+    return any(word.startswith(term) for word in words)
+
+
+def build_lexicons(agents):
+    """
+    전문 에이전트 설명에서 에이전트별 키워드 사전을 만듭니다.
+    여러 에이전트에 공통으로 나오는 단어는 구분력이 없으므로 제외합니다.
+
+    Args:
+        agents: 전문 에이전트 목록
+    """
+    lexicons = {}
+    for agent in agents:
+        text = f"{agent.handoff_description or ''} {agent.instructions if isinstance(agent.instructions, str) else ''}"
+        terms = set()
+        for word in tokenize(text):
+            term = strip_particle(word)
+            if term in STOPWORDS or term.endswith(VERB_ENDINGS) or (len(term) < 2 and term not in ("go",)):
+                continue
+            terms.add(term)
+        lexicons[agent.name] = terms
+
+    shared = Counter(term for terms in lexicons.values() for term in terms)
+    return {name: {term for term in terms if shared[term] == 1} for name, terms in lexicons.items()}
+
+
+def features(text):
+    """분류기 입력 특징: 단어 토큰과 문자 2-gram"""
+    compact = text.replace(" ", "")
+    return tokenize(text) + [compact[i:i + 2] for i in range(len(compact) - 1)]
+
+
+class NaiveBayesClassifier:
+    """라우팅 기록으로 학습하는 다항 나이브 베이즈 분류기"""
+
+    def __init__(self, class_counts=None, feature_counts=None):
+        self.class_counts = class_counts or {}
+        self.feature_counts = feature_counts or {}
+
+    @classmethod
+    def train(cls, examples):
+        """
+        Args:
+            examples: (질문, 에이전트 이름) 목록
+        """
+        class_counts = Counter()
+        feature_counts = defaultdict(Counter)
+        for question, label in examples:
+            class_counts[label] += 1
+            feature_counts[label].update(features(normalize_question(question)))
+        return cls(dict(class_counts), {label: dict(counts) for label, counts in feature_counts.items()})
+
+    def predict_proba(self, question):
+        if not self.class_counts:
+            return {}
+        tokens = features(normalize_question(question))
+        vocabulary = {f for counts in self.feature_counts.values() for f in counts}
+        total_examples = sum(self.class_counts.values())
+        log_scores = {}
+        for label, count in self.class_counts.items():
+            counts = self.feature_counts.get(label, {})
+            denominator = sum(counts.values()) + len(vocabulary) + 1
+            score = math.log(count / total_examples)
+            for token in tokens:
+                score += math.log((counts.get(token, 0) + 1) / denominator)
+            log_scores[label] = score
+        top = max(log_scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"class_counts": self.class_counts, "feature_counts": self.feature_counts}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["class_counts"], data["feature_counts"])
+
+
+class QuestionRouter:
+    """키워드 사전과 분류기 점수를 결합해 질문을 전문 에이전트에 배정합니다."""
+
+    def __init__(self, specialists, classifier=None,
+                 min_confidence=ROUTER_MIN_CONFIDENCE, min_margin=ROUTER_MIN_MARGIN):
+        self.specialists = {agent.name: agent for agent in specialists}
+        self.lexicons = build_lexicons(specialists)
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+
+    @classmethod
+    def from_triage(cls, triage_agent, model_path=ROUTER_MODEL_PATH):
+        """triage_agent의 handoff 대상으로 라우터를 만들고, 학습된 분류기가 있으면 불러옵니다."""
+        classifier = None
+        if os.path.exists(model_path):
+            try:
+                classifier = NaiveBayesClassifier.load(model_path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.error(f"라우터 분류기 로드 실패: {e}")
+        return cls(triage_agent.handoffs, classifier)
+
+    def lexicon_counts(self, question):
+        """에이전트 이름별로 키워드가 맞은 질문 단어 수 ("역사적"이 "역사"와 "역사적"에 맞아도 한 번)"""
+        words = set(question_terms(normalize_question(question)))
+        return {name: sum(1 for word in words if any(term_matches(term, [word]) for term in terms))
+                for name, terms in self.lexicons.items()}
+
+    def lexicon_scores(self, question):
+        counts = self.lexicon_counts(question)
+        total = sum(counts.values())
+        if not total:
+            return {}
+        return {name: count / total for name, count in counts.items()}
+
+    def score(self, question):
+        """에이전트 이름별 점수(합계 1)를 반환합니다. 판단 근거가 없으면 빈 딕셔너리."""
+        lexicon = self.lexicon_scores(question)
+        learned = self.classifier.predict_proba(question) if self.classifier else {}
+        if not lexicon or not learned:
+            return lexicon or learned
+        return {name: (lexicon.get(name, 0.0) + learned.get(name, 0.0)) / 2 for name in self.specialists}
+
+    def route(self, question):
+        """
+        확신할 수 있으면 (에이전트 이름, 신뢰도)를, 아니면 (None, 신뢰도)를 반환합니다.
+        점수가 높아도 그 에이전트의 키워드가 ROUTER_MIN_KEYWORD_HITS개 이상 맞거나
+        분류기도 같은 에이전트를 골라야 확신하는 것으로 봅니다 (키워드 하나로는 triage 생략 안 함).
+
+        Args:
+            question: 사용자 질문
+        """
+        scores = self.score(question)
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_name, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best < self.min_confidence or best - runner_up < self.min_margin or best_name not in self.specialists:
+            return None, best
+        if self.lexicon_counts(question).get(best_name, 0) >= ROUTER_MIN_KEYWORD_HITS:
+            return best_name, best
+        learned = self.classifier.predict_proba(question) if self.classifier else {}
+        if learned and max(learned, key=learned.get) == best_name:
+            return best_name, best
+        return None, best
+
+    def choose(self, question, last_agent=None):
+        """
+        질문을 triage 없이 보낼 전문 에이전트를 고릅니다.
+
+        Args:
+            question: 사용자 질문
+            last_agent: 같은 대화에서 직전에 답변한 전문 에이전트 이름. 라우터가 확신하지 못하는
+                후속 질문은, 질문에 다른 주제의 단서가 없을 때만 이 에이전트로 보냄
+
+        Returns:
+            (에이전트 이름, "router" 또는 "followup"), triage가 필요하면 (None, None)
+        """
+        if ROUTER_ENABLED:
+            name, confidence = self.route(question)
+            if name is not None:
+                logging.info(f"로컬 라우터: {name} (신뢰도 {confidence:.2f}), triage 생략")
+                return name, "router"
+        if last_agent in self.specialists:
+            # 키워드 사전에서 다른 에이전트의 주제어가 더 많이 보이면 주제가 바뀐 것으로 봄
+            scores = self.lexicon_scores(question)
+            if scores and max(scores, key=scores.get) != last_agent:
+                logging.info(f"주제 변경 감지 (직전 에이전트 {last_agent}), triage로 전달")
+                return None, None
+            logging.info(f"후속 질문: 직전 에이전트 {last_agent}로 전달, triage 생략")
+            return last_agent, "followup"
+        return None, None
+
+    def agent_for(self, triage_agent, name):
+        """
+        시작 에이전트를 반환합니다. 전문 에이전트로 바로 보낼 때는
+        triage_agent의 입력 가드레일을 그대로 적용한 복사본을 반환합니다.
+        """
+        if name is None:
+            return triage_agent
+        return self.specialists[name].clone(input_guardrails=triage_agent.input_guardrails)
+
+    def select_agent(self, triage_agent, question, last_agent=None):
+        """
+        질문을 처리할 시작 에이전트를 고릅니다 (choose 참고).
+
+        Args:
+            triage_agent: 분류 에이전트
+            question: 사용자 질문
+            last_agent: 같은 대화에서 직전에 답변한 전문 에이전트 이름
+        """
+        name, _ = self.choose(question, last_agent)
+        return self.agent_for(triage_agent, name)
+
+
+def log_routing_decision(question, agent_name, latency, model_calls, path=ROUTING_LOG_PATH):
+    """
+    triage_agent의 라우팅 결과를 분류기 학습/평가용 JSONL 파일에 기록합니다.
+
+    Args:
+        question: 사용자 질문
+        agent_name: 최종 응답한 에이전트 이름
+        latency: 전체 실행 시간(초)
+        model_calls: 실행 중 모델 호출 수
+    """
+    record = {"question": question, "agent": agent_name, "latency_s": round(latency, 3), "model_calls": model_calls}
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logging.error(f"라우팅 기록 저장 실패: {e}")
+
+
+def load_routing_log(path=ROUTING_LOG_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(records, specialists, folds=5, seed=0):
+    """
+    라우팅 기록에 대해 k-fold 교차 검증으로 라우터를 평가합니다.
+
+    Args:
+        records: 라우팅 기록 목록
+        specialists: 전문 에이전트 목록
+    """
+    records = list(records)
+    random.Random(seed).shuffle(records)
+    folds = max(1, min(folds, len(records)))
+    routed = correct = 0
+    for fold in range(folds):
+        test = records[fold::folds]
+        train = [r for i, r in enumerate(records) if i % folds != fold]
+        classifier = NaiveBayesClassifier.train([(r["question"], r["agent"]) for r in train]) if train else None
+        router = QuestionRouter(specialists, classifier)
+        for record in test:
+            name, _ = router.route(record["question"])
+            if name is not None:
+                routed += 1
+                correct += name == record["agent"]
+
+    # triage 한 단계의 지연 시간은 기록된 실행 시간을 모델 호출 수로 나눈 값으로 추정
+    hop_latencies = [r["latency_s"] / r["model_calls"] for r in records if r.get("model_calls")]
+    hop_latency = sum(hop_latencies) / len(hop_latencies) if hop_latencies else 0.0
+    total = len(records) or 1
+    return {
+        "questions": len(records),
+        "coverage": routed / total,
+        "accuracy_on_routed": correct / routed if routed else 0.0,
+        "misrouted": routed - correct,
+        "estimated_triage_latency_s": hop_latency,
+        "estimated_latency_saved_s": correct * hop_latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="학습 도우미 로컬 질문 라우터")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--log", default=ROUTING_LOG_PATH, help="라우팅 기록 JSONL 파일")
+    parser.add_argument("--model", default=ROUTER_MODEL_PATH, help="분류기 저장 경로")
+    parser.add_argument("--folds", type=int, default=5, help="교차 검증 fold 수")
+    args = parser.parse_args()
+
+    from learning_assistant_agents import triage_agent
+
+    records = load_routing_log(args.log)
+    if args.command == "train":
+        classifier = NaiveBayesClassifier.train([(r["question"], r["agent"]) for r in records])
+        classifier.save(args.model)
+        print(f"{len(records)}개 기록으로 분류기를 학습하여 {args.model}에 저장했습니다.")
+        return
+
+    report = evaluate(records, triage_agent.handoffs, folds=args.folds)
+    print(f"평가 질문 수: {report['questions']}")
+    print(f"로컬 라우팅 비율: {report['coverage']:.1%}")
+    print(f"로컬 라우팅 정확도: {report['accuracy_on_routed']:.1%} (오분류 {report['misrouted']}건)")
+    print(f"triage 단계 추정 지연: {report['estimated_triage_latency_s']:.2f}초")
+    print(f"절약된 추정 시간: {report['estimated_latency_saved_s']:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Site profiles for browser sessions.
+
+A site profile says where a task should start and how to load that site:
+matching rules (keywords or domains in the task), start URL, resource-blocking
+rules, settle hints (load state, a selector to wait for, extra delay) and the
+default browser profile (see browser_profiles.py), and the result links to
+prefetch in background tabs (see cua_tabs.py). Sites marked "prewarm" are
+kept loaded in a pool of warm pages so a task can start without navigating.
+
+The built-in table can be extended or overridden with SITE_PROFILES_PATH:
+
+    {"sites": [
+      {"name": "naver", "browser_profile": "naver"},
+      {"name": "coupang", "keywords": ["쿠팡", "coupang"], "start_url": "https://www.coupang.com",
+       "block_resources": ["media"], "settle": {"selector": "#headerSearchKeyword"}, "prewarm": true}
+    ]}
+"""
+
+import os
+import json
+import logging
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+
+SITE_PROFILES_PATH = os.getenv("SITE_PROFILES_PATH", "site_profiles.json")
+# Warm pages kept per prewarmed site (0 disables the pool)
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "1"))
+# Comma-separated site names to prewarm (default: sites with "prewarm": true)
+WARM_SITES = [name.strip() for name in os.getenv("WARM_SITES", "").split(",") if name.strip()]
+# Warm pages older than this are reloaded before use (seconds)
+WARM_PAGE_MAX_AGE = float(os.getenv("WARM_PAGE_MAX_AGE", "600"))
+
+# Requests to ad/tracker hosts are never needed for a task
+AD_URL_PATTERNS = ["*doubleclick.net*", "*googlesyndication.com*", "*google-analytics.com*", "*adservice.google.*"]
+
+DEFAULT_SITE_PROFILES = [
+    {
+        "name": "naver",
+        "keywords": ["네이버", "naver"],
+        "domains": ["naver.com"],
+        "start_url": "https://www.naver.com",
+        "block_resources": ["media"],
+        "block_url_patterns": AD_URL_PATTERNS + ["*veta.naver.com*", "*nam.veta.naver.com*"],
+        "settle": {"wait_until": "domcontentloaded", "selector": "#query", "settle_ms": 300},
+        # Result links opened in background tabs on a results page (see cua_tabs.py)
+        "prefetch_selector": "a.title_link, a.news_tit, a.link_tit",
+        "browser_profile": None,
+        "prewarm": True,
+    },
+    {
+        "name": "bing",
+        "keywords": ["bing", "빙에서"],
+        "domains": ["bing.com"],
+        "start_url": "https://www.bing.com",
+        "block_resources": ["media"],
+        "block_url_patterns": AD_URL_PATTERNS,
+        "settle": {"wait_until": "domcontentloaded", "selector": "#sb_form_q", "settle_ms": 300},
+        "prefetch_selector": "#b_results h2 a",
+        "browser_profile": None,
+        "prewarm": False,
+    },
+    {
+        "name": "google",
+        "keywords": ["구글", "google"],
+        "domains": ["google.com"],
+        "start_url": os.getenv("DEFAULT_START_URL", "https://www.google.com"),
+        "block_resources": ["media"],
+        "block_url_patterns": AD_URL_PATTERNS,
+        "settle": {"wait_until": "domcontentloaded", "selector": "textarea[name=q]", "settle_ms": 300},
+        "prefetch_selector": "#search a:has(h3)",
+        "browser_profile": None,
+        "prewarm": True,
+        # Used when no other site matches the task
+        "default": True,
+    },
+]
+
+
+def load_site_profiles(path=SITE_PROFILES_PATH):
+    """Return the built-in site table merged with the overrides file (matched by name)."""
+    sites = {site["name"]: dict(site) for site in DEFAULT_SITE_PROFILES}
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                overrides = json.load(f).get("sites", [])
+        except (OSError, ValueError) as e:
+            logging.error(f"사이트 프로필 로드 실패 ({path}): {e}")
+            overrides = []
+        for override in overrides:
+            sites.setdefault(override["name"], {}).update(override)
+    # Specific sites are matched before the default one
+    return sorted(sites.values(), key=lambda site: site.get("default", False))
+
+
+site_profiles = load_site_profiles()
+
+
+def default_site(sites=None):
+    sites = sites or site_profiles
+    return next((site for site in sites if site.get("default")), sites[-1])
+
+
+def match_site(task, sites=None):
+    """
+    Pick the site profile for a task: the first site whose keywords or domains appear
+    in the task text, otherwise the default site.
+
+    Returns:
+        (site profile, True if a rule matched)
+    """
+    sites = sites or site_profiles
+    text = task.lower()
+    for site in sites:
+        if site.get("default"):
+            continue
+        if any(keyword.lower() in text for keyword in site.get("keywords", [])) or \
+                any(domain in text for domain in site.get("domains", [])):
+            return site, True
+    return default_site(sites), False
+
+
+def site_for_url(url, sites=None):
+    """The site profile whose domains include the URL's host, or None."""
+    sites = sites or site_profiles
+    host = urlparse(url).hostname or ""
+    for site in sites:
+        if any(host == domain or host.endswith("." + domain) for domain in site.get("domains", [])):
+            return site
+    return None
+
+
+def prewarm_sites(sites=None):
+    """Site profiles to keep in the warm page pool."""
+    sites = sites or site_profiles
+    if WARM_SITES:
+        return [site for site in sites if site["name"] in WARM_SITES]
+    return [site for site in sites if site.get("prewarm")]
+
+
+def should_block(site, resource_type, url):
+    """True if a request should be aborted under the site's resource-blocking rules."""
+    if resource_type in site.get("block_resources", []):
+        return True
+    return any(fnmatch(url, pattern) for pattern in site.get("block_url_patterns", []))
+
+
+def settle_hints(site):
+    settle = site.get("settle", {})
+    return settle.get("wait_until", "load"), settle.get("selector"), settle.get("settle_ms", 0)
+
+
+class PrewarmStats:
+    """Warm page pool hit rate and the navigation time it saved."""
+
+    def __init__(self):
+        self.counts = {"hits": 0, "misses": 0, "stale": 0, "warmed": 0, "outdated": 0}
+        self.navigation_saved = 0.0
+
+    def hit(self, navigation_seconds, stale=False):
+        self.counts["hits"] += 1
+        if stale:
+            self.counts["stale"] += 1
+        else:
+            self.navigation_saved += navigation_seconds
+
+    def miss(self):
+        self.counts["misses"] += 1
+
+    def hit_rate(self):
+        total = self.counts["hits"] + self.counts["misses"]
+        return self.counts["hits"] / total if total else 0.0
+
+    def summary(self):
+        return (f"pre-warm hits {self.counts['hits']}/{self.counts['hits'] + self.counts['misses']} "
+                f"({self.hit_rate():.0%}), stale reloads {self.counts['stale']}, "
+                f"pages warmed {self.counts['warmed']}, closed for a newer profile {self.counts['outdated']}, navigation saved {self.navigation_saved:.1f}s")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+function_tool용 결과 캐시 데코레이터
+같은 인자로 반복 호출되는 도구의 결과를 TTL과 최대 크기(LRU) 안에서 재사용하고,
+동시에 들어온 같은 호출은 하나의 실행으로 합칩니다. 동기/비동기 도구를 모두 지원합니다.
+
+사용 예:
+    @function_tool
+    @cached_tool(ttl=600)
+    def get_current_weather(location: str) -> str:
+        ...
+"""
+
+import os
+import json
+import time
+import asyncio
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+
+# 캐시 키에서 제외할 실행 컨텍스트 인자 이름
+CONTEXT_PARAMS = ("ctx", "context")
+
+# 도구 이름별 캐시 (통계 조회용)
+tool_caches = {}
+
+
+class ToolCache:
+    """TTL과 LRU 제한이 있는 도구 결과 저장소"""
+
+    def __init__(self, name, ttl, max_size):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def get(self, key):
+        """캐시된 값을 (찾음 여부, 값)으로 반환합니다."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return False, None
+            self.entries.move_to_end(key)
+            return True, value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """저장된 결과를 모두 지웁니다 (예: 페이지 이동 후)."""
+        with self.lock:
+            self.entries.clear()
+
+
+def make_key(signature, args, kwargs):
+    """실행 컨텍스트를 제외한 인자로 캐시 키를 만듭니다."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name not in CONTEXT_PARAMS}
+    return json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def cached_tool(ttl=60, max_size=128, cache_if=None, side_effects=False):
+    """
+    도구 함수의 결과를 캐시하는 데코레이터입니다. @function_tool 아래에 적용합니다.
+
+    Args:
+        ttl: 결과 유지 시간(초), None이면 만료되지 않음
+        max_size: 도구별 최대 저장 개수 (넘으면 가장 오래 사용하지 않은 항목부터 제거)
+        cache_if: 결과를 받아 저장 여부를 반환하는 함수 (예: 오류 메시지는 저장하지 않음)
+        side_effects: True이면 부작용이 있는 도구로 보고 캐시하지 않음
+    """
+    def decorator(func):
+        if side_effects or not TOOL_CACHE_ENABLED:
+            # 캐시하지 않는 도구도 호출하는 쪽에서 cache.clear()를 쓸 수 있도록 빈 캐시를 붙임
+            func.cache = ToolCache(func.__name__, ttl, 0)
+            return func
+
+        cache = ToolCache(func.__name__, ttl, max_size)
+        tool_caches[func.__name__] = cache
+        signature = inspect.signature(func)
+
+        def should_store(result):
+            return cache_if is None or cache_if(result)
+
+        if inspect.iscoroutinefunction(func):
+            in_flight = {}
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(signature, args, kwargs)
+                found, value = cache.get(key)
+                if found:
+                    cache.stats["hits"] += 1
+                    return value
+                if key in in_flight:
+                    cache.stats["coalesced"] += 1
+                    return await asyncio.shield(in_flight[key])
+
+                cache.stats["misses"] += 1
+                future = asyncio.get_running_loop().create_future()
+                in_flight[key] = future
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                        # 기다리는 호출이 없을 때 "exception never retrieved" 경고를 막음
+                        future.exception()
+                    else:
+                        future.cancel()
+                    raise
+                finally:
+                    in_flight.pop(key, None)
+                if should_store(result):
+                    cache.put(key, result)
+                future.set_result(result)
+                return result
+
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        key_locks = {}
+        key_locks_guard = threading.Lock()
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            key = make_key(signature, args, kwargs)
+            found, value = cache.get(key)
+            if found:
+                cache.stats["hits"] += 1
+                return value
+
+            with key_locks_guard:
+                key_lock = key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                # 같은 키를 먼저 실행한 스레드가 저장한 결과가 있으면 재사용
+                found, value = cache.get(key)
+                if found:
+                    cache.stats["coalesced"] += 1
+                    return value
+                cache.stats["misses"] += 1
+                try:
+                    result = func(*args, **kwargs)
+                    # 잠금을 놓기 전에 저장해야 기다리던 스레드가 결과를 재사용함
+                    if should_store(result):
+                        cache.put(key, result)
+                finally:
+                    with key_locks_guard:
+                        key_locks.pop(key, None)
+                return result
+
+        sync_wrapper.cache = cache
+        return sync_wrapper
+
+    return decorator
+
+
+def tool_cache_stats():
+    """도구별 적중/미스/합쳐진 호출 수를 반환합니다."""
+    return {name: dict(cache.stats) for name, cache in tool_caches.items()}